@@ -0,0 +1,150 @@
+import json
+import os
+import queue
+import socket
+import stat
+import threading
+
+import pytest
+
+import video_sorter as vs
+
+
+class ThreadQueue:
+    """Stands in for UiQueue: runs posted callbacks in order on one thread"""
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def post(self, func, *args):
+        self._queue.put((func, args))
+    
+    def _run(self):
+        while True:
+            func, args = self._queue.get()
+            func(*args)
+
+
+@pytest.fixture
+def server(tmp_path):
+    position = [0]
+    
+    def step(by=1):
+        position[0] += by
+        return position[0]
+    
+    server = vs.ControlServer(ThreadQueue(), {'next': step, 'fail': lambda: 1 / 0}, str(tmp_path / "ctl.sock"))
+    server.start()
+    yield server
+    server.close()
+
+
+def connect(server):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(10)
+    client.connect(server.path)
+    return client, client.makefile('rb')
+
+
+def test_pipelined_requests_all_get_replies_in_order(server):
+    client, replies = connect(server)
+    count = 20000
+    sender = threading.Thread(target=client.sendall, args=(b''.join(
+        json.dumps({'id': i, 'method': 'next'}).encode() + b'\n' for i in range(count)),))
+    sender.start()
+    for i in range(count):
+        reply = json.loads(replies.readline())
+        assert reply == {'jsonrpc': '2.0', 'id': i, 'result': i + 1}
+    sender.join()
+    client.close()
+
+
+def test_batch_errors_and_notifications(server):
+    client, replies = connect(server)
+    client.sendall(json.dumps([
+        {'id': 'a', 'method': 'next', 'params': {'by': 2}},
+        {'method': 'next'},
+        {'id': 'b', 'method': 'nope'},
+        {'id': 'c', 'method': 'next', 'params': {'bogus': 1}},
+        {'id': 'd', 'method': 'fail'},
+        {'id': 'e', 'method': 'next', 'params': [10]},
+    ]).encode() + b'\nnot json\n')
+    batch = json.loads(replies.readline())
+    assert [reply['id'] for reply in batch] == ['a', 'b', 'c', 'd', 'e']
+    assert batch[0]['result'] == 2
+    assert [reply['error']['code'] for reply in batch[1:4]] == [-32601, -32602, -32000]
+    assert batch[4]['result'] == 13  # the notification in between still ran
+    assert json.loads(replies.readline())['error']['code'] == -32700
+    client.close()
+
+
+def test_notifications_never_get_a_reply(server):
+    client, replies = connect(server)
+    notifications = [
+        {'method': 'next', 'params': {'bogus': 1}},
+        {'method': 'next', 'params': 'not params'},
+        {'method': 'nope'},
+        {'method': 'fail'},
+        {'params': []},
+    ]
+    client.sendall(b''.join(json.dumps(n).encode() + b'\n' for n in notifications)
+                   + json.dumps(notifications).encode() + b'\n'
+                   + json.dumps({'id': 1, 'method': 'next'}).encode() + b'\n')
+    assert json.loads(replies.readline()) == {'jsonrpc': '2.0', 'id': 1, 'result': 1}
+    client.close()
+
+
+def test_subscribers_get_published_events(server):
+    client, replies = connect(server)
+    client.sendall(b'{"id": 1, "method": "subscribe", "params": {"events": ["video"]}}\n')
+    assert json.loads(replies.readline())['result'] == ['video']
+    done = threading.Event()
+    
+    def publish():
+        server.publish('time', time=1)  # not subscribed to
+        server.publish('video', path='/a.mp4')
+        done.set()
+    
+    server.ui_queue.post(publish)
+    done.wait(5)
+    assert json.loads(replies.readline()) == {'event': 'video', 'path': '/a.mp4'}
+    client.close()
+
+
+def test_socket_is_owner_only(server):
+    assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+
+
+def test_other_files_are_left_alone(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(OSError):
+        vs.ControlServer(ThreadQueue(), {}, str(path)).start()
+    assert path.read_text() == "keep me"
+
+
+def test_stale_socket_is_replaced_and_live_one_refused(tmp_path):
+    path = str(tmp_path / "ctl.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = vs.ControlServer(ThreadQueue(), {}, path)
+    server.start()
+    try:
+        with pytest.raises(OSError):
+            vs.ControlServer(ThreadQueue(), {}, path).start()
+    finally:
+        server.close()
+    assert not os.path.exists(path)
+
+
+def test_endless_line_disconnects(server, monkeypatch):
+    monkeypatch.setattr(vs, 'CONTROL_MAX_BUFFER', 1000)
+    client, replies = connect(server)
+    try:
+        client.sendall(b'x' * 5000)
+    except OSError:
+        pass
+    assert replies.readline() == b''
+    client.close()
@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import threading
+
+import video_sorter as vs
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_groups_identical_files_from_a_thread(tmp_path):
+    big = os.urandom(3 * vs.DUPLICATE_EDGE_SIZE)
+    # Same edges, different middle: only the full hash tells them apart
+    other = big[:vs.DUPLICATE_EDGE_SIZE] + os.urandom(vs.DUPLICATE_EDGE_SIZE) + big[-vs.DUPLICATE_EDGE_SIZE:]
+    paths = [write(tmp_path / "a.mp4", big), write(tmp_path / "b.mp4", big), write(tmp_path / "c.mp4", other),
+             write(tmp_path / "d.mp4", b"small"), write(tmp_path / "e.mp4", b"small")]
+    os.link(paths[0], tmp_path / "a-link.mp4")
+    paths.append(str(tmp_path / "a-link.mp4"))
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    groups = []
+    worker = threading.Thread(target=lambda: groups.extend(vs.find_duplicates(paths, index, workers=2)))
+    worker.start()
+    worker.join(60)
+    assert groups == [(len(big), paths[:2]), (5, paths[3:5])]
+    
+    # Cached by device as well as inode, a rerun hashes nothing
+    keys = [row for row in index.db.execute("SELECT dev, inode FROM hashes")]
+    assert {dev for dev, inode in keys} == {os.stat(tmp_path).st_dev}
+    stages = []
+    assert vs.find_duplicates(paths, index, progress=lambda *args: stages.append(args)) == groups
+    assert stages == []
+
+
+def test_hash_cache_without_device_is_dropped(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE hashes (inode INTEGER, size INTEGER, mtime REAL, edges BLOB, full BLOB, "
+               "PRIMARY KEY (inode, size, mtime))")
+    db.execute("INSERT INTO hashes VALUES (1, 2, 3.0, x'00', x'00')")
+    db.commit()
+    db.close()
+    index = vs.LibraryIndex(db_path)
+    assert index.get_hashes([(5, 1, 2, 3.0)]) == {}
+    index.set_hashes({(5, 1, 2, 3.0): [b'e', b'f']})
+    assert index.get_hashes([(5, 1, 2, 3.0), (6, 1, 2, 3.0)]) == {(5, 1, 2, 3.0): [b'e', b'f']}
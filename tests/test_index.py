@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+
+import video_sorter as vs
+
+
+def test_history_table_is_migrated_once(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    db = sqlite3.connect(db_path)
+    db.executescript(vs.LibraryIndex.SCHEMA)
+    db.execute("INSERT INTO history (path, opened) VALUES ('/videos/old', 1.0)")
+    db.commit()
+    db.close()
+    index = vs.LibraryIndex(db_path)
+    assert index.profiles() == [('/videos/old', ['/videos/old'])]
+    
+    index.forget_profile('/videos/old')
+    index.db.execute("INSERT INTO history (path, opened) VALUES ('/videos/old', 1.0)")
+    index.db.commit()
+    assert vs.LibraryIndex(db_path).profiles() == []
+
+
+def test_history_file_is_imported_once(tmp_path):
+    history_file = tmp_path / "history"
+    history_file.write_text("/videos/new\n/videos/old\n")
+    db_path = str(tmp_path / "index.db")
+    index = vs.LibraryIndex(db_path)
+    index.import_history_file(str(history_file))
+    assert [name for name, roots in index.profiles()] == ['/videos/new', '/videos/old']
+    
+    # Forgetting every profile does not bring the old history back
+    for name in ['/videos/new', '/videos/old']:
+        index.forget_profile(name)
+    index = vs.LibraryIndex(db_path)
+    index.import_history_file(str(history_file))
+    assert index.profiles() == []
+
+
+def test_subtree_queries_match_whole_folder_names(tmp_path):
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    for path in ('/videos/a.mp4', '/videos/sub/b.mp4', '/videos2/c.mp4', '/d.mp4'):
+        index.set_metadata(path, {'duration': 1000, 'width': 1, 'height': 1, 'codec': 'h264'})
+    assert sorted(path for path, info in index.file_metadata('/videos')) == ['/videos/a.mp4', '/videos/sub/b.mp4']
+    assert len(list(index.file_metadata('/'))) == 4
+    index.forget_subtree('/videos')
+    assert sorted(path for path, info in index.file_metadata('/')) == ['/d.mp4', '/videos2/c.mp4']
+
+
+def test_temporary_index_is_shared_between_threads():
+    index = vs.LibraryIndex.temporary()
+    index.save_profile('films', ['/films'])
+    seen = []
+    worker = threading.Thread(target=lambda: seen.extend(index.profiles()))
+    worker.start()
+    worker.join()
+    assert seen == [('films', ['/films'])]
+
+
+def test_forget_files_in_one_batch(tmp_path):
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    for path in ('/videos/a.mp4', '/videos/b.mp4', '/videos/c.mp4'):
+        index.set_metadata(path, {'duration': 1000, 'width': 1, 'height': 1, 'codec': 'h264'})
+    index.forget_files(['/videos/a.mp4', '/videos/c.mp4', '/videos/never.mp4'])
+    assert [path for path, info in index.file_metadata('/videos')] == ['/videos/b.mp4']
+
+
+def test_unchanged_folder_answered_without_excluded_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(vs, 'INDEX_MTIME_SLACK_NS', 0)
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    for name in ('a.mp4', 'sample.mp4'):
+        (folder / name).write_bytes(b'x')
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    assert [os.path.basename(p) for p in index.scan(str(folder), exclude=('sample*',))] == ['a.mp4']
+    # Answered from the index now, without the excluded file in it
+    monkeypatch.setattr(vs, 'list_folder', None)
+    assert [os.path.basename(p) for p in index.scan(str(folder), exclude=('sample*',))] == ['a.mp4']
+    monkeypatch.undo()
+    # Other patterns list the folder again
+    assert sorted(os.path.basename(p) for p in index.scan(str(folder), exclude=())) == ['a.mp4', 'sample.mp4']
+
+
+def test_dirs_of_older_versions_gain_the_exclude_column(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE dirs (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER, scanned_ns INTEGER)")
+    db.execute("INSERT INTO dirs VALUES ('/videos', '/', 1, 3000000000)")
+    db.commit()
+    db.close()
+    index = vs.LibraryIndex(db_path)
+    assert index.db.execute("SELECT exclude FROM dirs WHERE path = '/videos'").fetchone() == (None,)
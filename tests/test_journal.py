@@ -0,0 +1,47 @@
+import video_sorter as vs
+
+
+def test_replay_after_a_crash(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = vs.DecisionJournal(path)
+    journal.open_folder(['/videos', '/more'], True)
+    journal.decide('/videos/a.mp4', 'trash')
+    journal.decide('/videos/b.mp4', 'move', '/sorted')
+    journal.decide('/videos/c.mp4', 'keep')
+    journal.decide('/videos/a.mp4', 'delete')
+    journal.record_position(3, '/videos/c.mp4')
+    # No close(): the process died, and the last line was torn
+    with open(path, 'a') as f:
+        f.write('{"op": "decide", "pa')
+    
+    replayed = vs.DecisionJournal(path)
+    assert replayed.load()
+    assert replayed.roots == ['/videos', '/more'] and replayed.recursive
+    assert replayed.position == (3, '/videos/c.mp4')
+    assert replayed.pending() == [('/videos/b.mp4', 'move', '/sorted'), ('/videos/a.mp4', 'delete', None)]
+    # Undo goes back through the decisions, a path decided again counts as its latest decision
+    assert [replayed.undo() for _ in range(4)] == ['/videos/a.mp4', '/videos/c.mp4', '/videos/b.mp4', None]
+    replayed.close()
+    undone = vs.DecisionJournal(path)
+    undone.load()
+    assert undone.decisions == {}
+
+
+def test_long_journal_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(vs, 'JOURNAL_COMPACT_LINES', 100)
+    path = str(tmp_path / "journal")
+    journal = vs.DecisionJournal(path)
+    journal.open_folder(['/videos'], False)
+    for i in range(1000):
+        journal.decide(f'/videos/{i % 10}.mp4', 'trash')
+        journal.record_position(i, f'/videos/{i % 10}.mp4')
+    journal.close()
+    with open(path) as f:
+        assert sum(1 for line in f) < 100
+    
+    replayed = vs.DecisionJournal(path)
+    replayed.load()
+    assert replayed.decisions == journal.decisions
+    assert list(replayed.decisions) == list(journal.decisions)
+    assert replayed.position == (999, '/videos/9.mp4')
+    assert replayed.roots == ['/videos']
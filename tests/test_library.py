@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+import video_sorter as vs
+
+
+@pytest.fixture
+def library():
+    library = vs.Library(capacity=2)
+    rows = library.add(['/v/a.mp4', '/v/b.mp4', '/v/sub/c.mkv', '/w/d.avi'])
+    library.set_stats(rows, [2 * 1024**3, 100 * 1024**2, 700 * 1024**2, -1],
+                      [time.time() - 30 * 86400, time.time() - 86400, time.time(), float('nan')])
+    for row, (duration, height) in zip(rows, [(3600000, 1080), (20000, 480), (600000, 720)]):
+        library.set_metadata(row, {'duration': duration, 'width': height * 16 // 9, 'height': height, 'codec': 'h264'})
+    return library
+
+
+def paths(library, rows):
+    return [library.path(row) for row in rows]
+
+
+def test_rows_are_found_again_and_kept(library):
+    assert [library.row_of(p) for p in ('/v/a.mp4', '/v/sub/c.mkv', '/nope.mp4')] == [0, 2, -1]
+    # Adding again gives the same rows, a gone file comes back in its row
+    library.discard('/v/b.mp4')
+    assert library.add(['/v/b.mp4', '/v/e.mp4']) == [1, 4]
+    assert library.rename('/v/a.mp4', '/w/a2.mp4') == 0
+    assert library.row_of('/w/a2.mp4') == 0 and library.row_of('/v/a.mp4') == -1
+    assert library.path(0) == '/w/a2.mp4'
+
+
+def test_many_rows_through_the_sorted_index():
+    library = vs.Library()
+    names = [f"/videos/{n // 1000}/{n}.mp4" for n in range(100000)]
+    rows = library.add(names)
+    assert rows == list(range(100000))
+    assert all(library.row_of(name) == row for row, name in list(enumerate(names))[::997])
+    assert library.add(names[::1000]) == rows[::1000]
+
+
+def test_queries(library):
+    assert paths(library, library.query(*vs.parse_query("size>500M largest"))) == ['/v/a.mp4', '/v/sub/c.mkv']
+    assert paths(library, library.query(*vs.parse_query("duration<15m longest"))) == ['/v/sub/c.mkv', '/v/b.mp4']
+    assert paths(library, library.query(*vs.parse_query("height>=720, age<7"))) == ['/v/sub/c.mkv']
+    # Unknown values never match and sort last
+    assert paths(library, library.query(*vs.parse_query("oldest"))) == ['/v/a.mp4', '/v/b.mp4', '/v/sub/c.mkv', '/w/d.avi']
+    assert paths(library, library.query(*vs.parse_query("sort:-size"))) == ['/v/a.mp4', '/v/sub/c.mkv', '/v/b.mp4', '/w/d.avi']
+    library.discard('/v/a.mp4')
+    assert paths(library, library.query(*vs.parse_query("size>500M"))) == ['/v/sub/c.mkv']
+
+
+def test_parse_query():
+    assert vs.parse_query("size>=1.5g duration<90s newest") == (
+        [('size', '>=', 1.5 * 1024**3), ('duration', '<', 90000)], 'mtime', True)
+    assert vs.parse_query("duration>1h sort:height") == ([('duration', '>', 3600000)], 'height', False)
+    filters, sort, descending = vs.parse_query("age>7")
+    assert filters[0][:2] == ('mtime', '<') and abs(filters[0][2] - (time.time() - 7 * 86400)) < 5
+    for bad in ("size>big", "bitrate>5", "sort:name", "large"):
+        with pytest.raises(ValueError):
+            vs.parse_query(bad)
+
+
+def test_trim_keeps_rows_findable():
+    library = vs.Library()
+    names = [f"/videos/{n}.mp4" for n in range(5000)]
+    library.add(names)
+    library.trim()
+    assert all(len(column) == 5000 for column in library.columns.values()) and not library._recent
+    assert library.row_of(names[1234]) == 1234
+    assert library.add(['/videos/new.mp4', names[0]]) == [5000, 0]
+
+
+def test_metadata_out_of_range(library):
+    library.set_metadata(0, {'duration': 2**40, 'width': 100000, 'height': -5, 'codec': 'av1'})
+    assert library.metadata(0) == {'duration': 2**31 - 1, 'width': 2**15 - 1, 'height': None, 'codec': 'av1'}
+    library.codecs.extend(['x'] * (2**15 - len(library.codecs)))
+    with pytest.raises(OverflowError):
+        library.set_metadata(1, {'duration': 1, 'width': 1, 'height': 1, 'codec': 'vp9'})
+    # Codecs already known still fit
+    library.set_metadata(1, {'duration': 1, 'width': 1, 'height': 1, 'codec': 'h264'})
+
+
+def test_names_past_their_columns_raise(library):
+    class Huge(bytearray):
+        def __len__(self):
+            return 2**32 - 4
+    
+    with pytest.raises(OverflowError):
+        library.add(['/v/' + 'x' * 70000 + '.mp4'])
+    library._names = Huge(library._names)
+    with pytest.raises(OverflowError):
+        library.add(['/v/new.mp4'])
+    with pytest.raises(OverflowError):
+        library.rename('/v/a.mp4', '/v/renamed.mp4')
+    assert len(library) == 4 and library.row_of('/v/a.mp4') == 0 and library.row_of('/v/new.mp4') == -1
+
+
+def test_discard_files(library):
+    rows = library.discard_files(['/v/a.mp4', '/nope.mp4', '/w/d.avi'])
+    assert rows.tolist() == [0, -1, 3]
+    assert paths(library, library.query()) == ['/v/b.mp4', '/v/sub/c.mkv']
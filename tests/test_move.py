@@ -0,0 +1,110 @@
+import errno
+import os
+import threading
+
+import pytest
+
+import video_sorter as vs
+
+
+@pytest.fixture
+def folders(tmp_path):
+    src_dir, dest_dir = tmp_path / "src", tmp_path / "dest"
+    src_dir.mkdir()
+    dest_dir.mkdir()
+    src = src_dir / "a.mp4"
+    src.write_bytes(b"new" * 1000)
+    return str(src), str(dest_dir)
+
+
+def cross_device(monkeypatch, src):
+    """Make linking src anywhere fail as if the destination were on another mount"""
+    link = os.link
+    
+    def fake_link(source, dest, **kwargs):
+        if source == src:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return link(source, dest, **kwargs)
+    
+    monkeypatch.setattr(vs.os, 'link', fake_link)
+
+
+def test_move_never_replaces_a_file_that_appears_meanwhile(folders, monkeypatch):
+    src, dest_dir = folders
+    taken = os.path.join(dest_dir, "a.mp4")
+    pick = vs.unique_destination
+    
+    def racy_pick(folder, name):
+        # Someone else creates the file right after the name was picked
+        dest = pick(folder, name)
+        if not os.path.exists(taken):
+            with open(taken, 'wb') as f:
+                f.write(b"old")
+        return dest
+    
+    monkeypatch.setattr(vs, 'unique_destination', racy_pick)
+    dest = vs.move_file(src, dest_dir)
+    assert dest == os.path.join(dest_dir, "a (2).mp4")
+    assert open(taken, 'rb').read() == b"old"
+    assert open(dest, 'rb').read() == b"new" * 1000
+    assert not os.path.exists(src)
+
+
+def test_move_without_hard_links(folders, monkeypatch):
+    src, dest_dir = folders
+    open(os.path.join(dest_dir, "a.mp4"), 'wb').close()
+    
+    def no_links(*args, **kwargs):
+        raise OSError(errno.EPERM, "Operation not permitted")
+    
+    monkeypatch.setattr(vs.os, 'link', no_links)
+    assert vs.move_file(src, dest_dir) == os.path.join(dest_dir, "a (2).mp4")
+    assert sorted(os.listdir(dest_dir)) == ["a (2).mp4", "a.mp4"]
+
+
+def test_cross_device_move_is_copied_and_verified(folders, monkeypatch):
+    src, dest_dir = folders
+    cross_device(monkeypatch, src)
+    reports = []
+    dest = vs.move_file(src, dest_dir, lambda copied, total: reports.append((copied, total)))
+    assert open(dest, 'rb').read() == b"new" * 1000
+    assert os.listdir(dest_dir) == ["a.mp4"]
+    assert reports == [(3000, 3000)]
+    assert not os.path.exists(src)
+
+
+def test_cancelled_copy_leaves_no_part_file(folders, monkeypatch):
+    src, dest_dir = folders
+    cross_device(monkeypatch, src)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(OSError) as raised:
+        vs.move_file(src, dest_dir, cancel=cancel)
+    assert raised.value.errno == errno.ECANCELED
+    assert os.listdir(dest_dir) == []
+    assert os.path.exists(src)
+
+
+def test_shutdown_cancels_a_copy_that_runs_too_long(folders, monkeypatch):
+    src, dest_dir = folders
+    cross_device(monkeypatch, src)
+    monkeypatch.setattr(vs, 'COPY_CHUNK_SIZE', 1000)
+    started = threading.Event()
+    
+    def slow_progress(copied, total):
+        started.set()
+        threading.Event().wait(0.2)
+    
+    class Posted:
+        def post(self, func, *args):
+            func(*args)
+    
+    mover = vs.FileOperations(Posted())
+    errors = []
+    mover.submit(vs.move_file, src, dest_dir, slow_progress, mover.cancel, on_error=errors.append)
+    started.wait(5)
+    mover.shutdown(0.05)
+    assert not mover.thread.is_alive()
+    assert [error.errno for error in errors] == [errno.ECANCELED]
+    assert os.listdir(dest_dir) == []
+    assert os.path.exists(src)
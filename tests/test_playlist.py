@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+import video_sorter as vs
+
+
+class Model:
+    """The playlist as a plain list: paths in order, the current one and where removed paths were"""
+    def __init__(self):
+        self.paths = []
+        self.current = None
+        self.keys = {}  # path -> sort key, the order paths were added in
+        self.next_key = 0
+    
+    def extend(self, paths):
+        for path in paths:
+            if path not in self.paths:
+                self.keys[path] = self.next_key
+                self.next_key += 1
+                self.paths.append(path)
+    
+    def advance(self):
+        if self.paths:
+            i = self.paths.index(self.current) + 1 if self.current in self.paths else 0
+            self.current = self.paths[i % len(self.paths)]
+    
+    def back(self):
+        if self.paths:
+            i = self.paths.index(self.current) - 1 if self.current in self.paths else -1
+            self.current = self.paths[i]
+    
+    def remove(self, path):
+        i = self.paths.index(path)
+        self.paths.remove(path)
+        if path == self.current:
+            self.current = self.paths[min(i, len(self.paths) - 1)] if self.paths else None
+    
+    def restore(self, path):
+        # Back between the paths added before and after it
+        self.paths.append(path)
+        self.paths.sort(key=self.keys.__getitem__)
+    
+    def compacted(self):
+        # Slots are renumbered, a path restored after this goes to the end
+        self.keys = {path: key for key, path in enumerate(self.paths)}
+        self.next_key = len(self.paths)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sequential_playlist_matches_a_list(seed, monkeypatch):
+    monkeypatch.setattr(vs.Playlist, 'COMPACT_MIN', 8)
+    rng = random.Random(seed)
+    playlist = vs.Playlist(vs.Library())
+    model = Model()
+    removed = {}  # path -> slot it was removed from
+    added = 0
+    for _ in range(1000):
+        op = rng.random()
+        if op < 0.1 or not model.paths:
+            paths = [f"/videos/{n}.mp4" for n in range(added, added + rng.randint(1, 5))]
+            added += len(paths)
+            playlist.extend(paths)
+            model.extend(paths)
+        elif op < 0.4:
+            playlist.advance()
+            model.advance()
+        elif op < 0.55:
+            playlist.back()
+            model.back()
+        elif op < 0.75:
+            path = model.current if rng.random() < 0.5 and model.current else rng.choice(model.paths)
+            dead = playlist.dead
+            removed[path] = playlist.slot_of(path)
+            assert playlist.remove(removed[path]) == path
+            model.remove(path)
+            if playlist.dead < dead:
+                model.compacted()
+                removed = {path: -1 for path in removed}
+        elif op < 0.85 and removed:
+            path = rng.choice(sorted(removed))
+            old_slot = removed.pop(path)
+            slot = playlist.restore(old_slot, path)
+            assert playlist[slot] == path
+            if old_slot < 0:
+                # Compacted away, appended at the end
+                model.keys[path] = model.next_key
+                model.next_key += 1
+            model.restore(path)
+        else:
+            position = rng.randint(1, len(model.paths))
+            slot = playlist.select(position)
+            assert playlist[slot] == model.paths[position - 1]
+            playlist.jump(slot)
+            model.current = model.paths[position - 1]
+        
+        assert list(playlist) == model.paths
+        assert len(playlist) == len(model.paths)
+        assert playlist.current_path == model.current
+        if model.current:
+            assert playlist.position(playlist.current) == model.paths.index(model.current) + 1
+
+
+def test_shuffle_plays_every_video_once_per_cycle_and_goes_back():
+    paths = [f"/videos/{n}.mp4" for n in range(50)]
+    playlist = vs.Playlist(vs.Library(), paths, shuffle=True, seed=3)
+    played = [playlist[playlist.advance()] for _ in range(50)]
+    assert sorted(played) == sorted(paths)
+    for path in reversed(played[:-1]):
+        assert playlist[playlist.back()] == path
+    # Forward again through the history, not new draws
+    assert [playlist[playlist.advance()] for _ in range(49)] == played[1:]
+
+
+def test_peek_next_is_what_advance_moves_to():
+    playlist = vs.Playlist(vs.Library(), [f"/videos/{n}.mp4" for n in range(20)], shuffle=True, seed=1)
+    for _ in range(40):
+        expected = playlist.peek_next()
+        assert playlist.advance() == expected
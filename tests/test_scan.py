@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import video_sorter as vs
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Three roots of nested folders with videos, other files and excluded folders"""
+    roots = []
+    for r in range(3):
+        root = tmp_path / f"root{r}"
+        for d in range(4):
+            for s in range(3):
+                folder = root / f"d{d}" / f"s{s}"
+                folder.mkdir(parents=True)
+                for n in range(30):
+                    (folder / f"v{n}.mp4").touch()
+                (folder / "notes.txt").touch()
+            (root / f"d{d}" / "top.mkv").touch()
+        (root / "@eaDir").mkdir()
+        (root / "@eaDir" / "hidden.mp4").touch()
+        (root / "copy.mp4.part").touch()
+        roots.append(str(root))
+    return roots
+
+
+def test_one_root_in_the_same_order_as_a_plain_walk(tree, tmp_path):
+    expected = list(vs.scan_video_files(tree[0], recursive=True))
+    assert len(expected) == 4 * (3 * 30 + 1)
+    assert not [path for path in expected if '@eaDir' in path or path.endswith('.part')]
+    for _ in range(3):
+        assert list(vs.scan_roots([tree[0]], recursive=True, workers_per_mount=3)) == expected
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    assert list(vs.scan_roots([tree[0]], index, recursive=True)) == expected
+    # Listed from the index the second time
+    assert list(vs.scan_roots([tree[0]], index, recursive=True)) == expected
+
+
+def test_several_roots_keep_their_own_order(tree):
+    per_root = {root: list(vs.scan_video_files(root, recursive=True)) for root in tree}
+    found = list(vs.scan_roots(tree, recursive=True))
+    for root, expected in per_root.items():
+        assert [path for path in found if path.startswith(root + os.sep)] == expected
+    # A root inside another is not listed twice
+    found = list(vs.scan_roots(tree + [os.path.join(tree[0], "d1")], recursive=True))
+    assert len(found) == len(set(found)) == sum(map(len, per_root.values()))
+
+
+def test_depth_limit_and_stopping(tree):
+    assert sorted(vs.scan_roots(tree[:1], recursive=True, max_depth=1)) == sorted(
+        os.path.join(tree[0], f"d{d}", "top.mkv") for d in range(4))
+    assert list(vs.scan_roots(tree[:1])) == []
+    scan = vs.scan_roots(tree, recursive=True)
+    assert next(scan)
+    scan.close()
@@ -0,0 +1,32 @@
+import numpy as np
+
+import video_sorter as vs
+
+
+def test_similar_videos_are_grouped_and_failures_retried(tmp_path):
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 255, (32, 32, 3)).astype(np.uint8) for _ in vs.SIMILAR_POSITIONS]
+    other = [rng.integers(0, 255, (32, 32, 3)).astype(np.uint8) for _ in vs.SIMILAR_POSITIONS]
+    paths = []
+    for name, size in (("big.mp4", 300), ("small.mp4", 100), ("other.mp4", 200), ("broken.mp4", 50)):
+        (tmp_path / name).write_bytes(b"x" * size)
+        paths.append(str(tmp_path / name))
+    signed = []
+    
+    def signer(path):
+        signed.append(path)
+        if path.endswith("broken.mp4"):
+            return None
+        # A re-encode: same frames a little darker
+        source = other if path.endswith("other.mp4") else frames
+        darker = path.endswith("small.mp4")
+        return vs.video_signature([frame * 0.9 if darker else frame for frame in source]), 60000
+    
+    index = vs.LibraryIndex(str(tmp_path / "index.db"))
+    groups = vs.find_similar(paths, signer, index)
+    assert groups == [(100, [paths[0], paths[1]])]
+    
+    # Signatures come from the cache, the file that failed is tried again
+    signed.clear()
+    assert vs.find_similar(paths, signer, index) == groups
+    assert signed == [paths[3]]
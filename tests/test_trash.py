@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import video_sorter as vs
+
+
+@pytest.fixture
+def trash(tmp_path, monkeypatch):
+    trash = tmp_path / "Trash"
+    monkeypatch.setattr(vs, 'HOME_TRASH', str(trash))
+    return trash
+
+
+def test_trash_and_restore(tmp_path, trash):
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    first, second = videos / "a.mp4", videos / "a b.mp4"
+    first.write_bytes(b"first")
+    second.write_bytes(b"second")
+    
+    trashed = vs.move_to_trash(str(first))
+    assert not first.exists()
+    assert open(trashed.trashed, 'rb').read() == b"first"
+    assert os.path.dirname(trashed.trashed) == str(trash / "files")
+    info = open(trashed.info).read()
+    assert info.startswith("[Trash Info]\n") and "DeletionDate=" in info
+    assert "Path=" + str(first) in info
+    # Names in the trash never collide, the path is URL-encoded
+    first.write_bytes(b"again")
+    again = vs.move_to_trash(str(first))
+    assert os.path.basename(again.trashed) == "a.2.mp4"
+    assert "Path=" + str(videos).replace(" ", "%20") + "/a%20b.mp4" in open(vs.move_to_trash(str(second)).info).read()
+    
+    vs.restore_from_trash(trashed)
+    assert first.read_bytes() == b"first"
+    assert not os.path.exists(trashed.trashed) and not os.path.exists(trashed.info)
+    # Something new at the original path is never overwritten
+    with pytest.raises(FileExistsError):
+        vs.restore_from_trash(again)
+    assert os.path.exists(again.trashed)
@@ -1,542 +1,3364 @@
 #!/usr/bin/env python3
-# pip install python-vlc
+# pip install python-vlc numpy
 import os
 import sys
-import tkinter as tk
-from tkinter import filedialog
-import vlc
+import atexit
+import collections
+import ctypes
+import errno
+import hashlib
+import inspect
+import json
+import mmap
+import multiprocessing
+import operator
+import bisect
+import itertools
+import random
+import queue
+import select
+import selectors
+import shutil
+import socket
+import stat
+import sqlite3
+import struct
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fnmatch import fnmatch
+from urllib.parse import quote
+import numpy as np
 import time
 
-class VideoSorter:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Video File Sorter")
-        self.root.geometry("800x600")
-        
-        # Set up VLC instance and player (with reduced verbosity)
-        self.instance = vlc.Instance('--quiet', '--no-xlib')
-        self.player = self.instance.media_player_new()
-        self.is_fullscreen = False
-        self.is_muted = False
-        self.previous_volume = 70  # Default volume
-        self.is_repeat = False  # Repeat mode flag
-        self.is_auto_play = False  # Auto play mode flag
-        self.is_random = False  # Random mode flag
-        
-        # Create a frame for embedding the video
-        self.video_frame = tk.Frame(root, bg="black")
-        self.video_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Create a timer to update the time display
-        self.update_timer_id = None
-        
-        # Control panel at the bottom
-        self.control_panel = tk.Frame(root, height=80)  # Increased height for 3 rows
-        self.control_panel.pack(fill=tk.X, side=tk.BOTTOM)
-        
-        # Create buttons - first row (playback controls)
-        button_frame1 = tk.Frame(self.control_panel)
-        button_frame1.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
-        
-        self.play_pause_button = tk.Button(button_frame1, text="Play/Pause", command=self.toggle_play)
-        self.play_pause_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.replay_button = tk.Button(button_frame1, text="Replay", command=self.replay_video)
-        self.replay_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.skip_back_button = tk.Button(button_frame1, text="<< 15s", command=self.skip_backward)
-        self.skip_back_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.skip_forward_button = tk.Button(button_frame1, text="15s >>", command=self.skip_forward)
-        self.skip_forward_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.skip_forward_long_button = tk.Button(button_frame1, text="45s >>", command=self.skip_forward_long)
-        self.skip_forward_long_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Second row (navigation and mode buttons)
-        button_frame2 = tk.Frame(self.control_panel)
-        button_frame2.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
-        
-        self.prev_button = tk.Button(button_frame2, text="Previous", command=self.prev_video)
-        self.prev_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.next_button = tk.Button(button_frame2, text="Next", command=self.next_video)
-        self.next_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.repeat_button = tk.Button(button_frame2, text="Repeat: Off", command=self.toggle_repeat)
-        self.repeat_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.auto_play_button = tk.Button(button_frame2, text="Auto: Off", command=self.toggle_auto_play)
-        self.auto_play_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.random_button = tk.Button(button_frame2, text="Random: Off", command=self.toggle_random)
-        self.random_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Third row (file operations and system buttons)
-        button_frame3 = tk.Frame(self.control_panel)
-        button_frame3.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
-        
-        self.delete_button = tk.Button(button_frame3, text="Delete", command=self.delete_video)
-        self.delete_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.fullscreen_button = tk.Button(button_frame3, text="Fullscreen", command=self.toggle_fullscreen)
-        self.fullscreen_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Add folder selection button
-        self.select_folder_button = tk.Button(button_frame3, text="Select Folder", command=self.select_folder)
-        self.select_folder_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Add exit button
-        self.exit_button = tk.Button(button_frame3, text="Exit", command=self.on_close, bg="#ffcccc")
-        self.exit_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Fourth row with volume controls
-        volume_frame = tk.Frame(self.control_panel)
-        volume_frame.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
-        
-        self.mute_button = tk.Button(volume_frame, text="Mute", command=self.toggle_mute, width=5)
-        self.mute_button.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        volume_label = tk.Label(volume_frame, text="Volume:")
-        volume_label.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        self.volume_scale = tk.Scale(volume_frame, from_=0, to=100, orient=tk.HORIZONTAL, 
-                                     command=self.set_volume, length=200)
-        self.volume_scale.set(70)  # Default volume level
-        self.volume_scale.pack(side=tk.LEFT, padx=5, pady=2)
-        
-        # Add timer label in volume frame
-        self.time_label = tk.Label(volume_frame, text="00:00 / 00:00", 
-                                  fg="black", bg="#dddddd", padx=5, pady=2,
-                                  font=("Arial", 10), relief=tk.GROOVE)
-        self.time_label.pack(side=tk.LEFT, padx=10, pady=2)
-        
-        # Status label
-        self.status_label = tk.Label(volume_frame, text="No folder selected")
-        self.status_label.pack(side=tk.RIGHT, padx=10, pady=2)
-        
-        # Video list and current position
-        self.video_files = []
-        self.current_index = -1
-        
-        # Load folder history
-        self.history_file = os.path.expanduser("~/.video_sorter_history")
-        self.folder_history = self.load_folder_history()
-        
-        # Bind the window close event
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
-        
-        # Set up key bindings
-        self.root.bind("<space>", lambda e: self.toggle_play())
-        self.root.bind("r", lambda e: self.replay_video())
-        self.root.bind("l", lambda e: self.toggle_repeat())  # 'l' for loop
-        self.root.bind("a", lambda e: self.toggle_auto_play())  # 'a' for auto
-        self.root.bind("s", lambda e: self.toggle_random())  # 's' for shuffle
-        self.root.bind("<Delete>", lambda e: self.delete_video())
-        self.root.bind("<Right>", lambda e: self.skip_forward())
-        self.root.bind("<Left>", lambda e: self.skip_backward())
-        self.root.bind("<Up>", lambda e: self.next_video())
-        self.root.bind("<Down>", lambda e: self.prev_video())
-        self.root.bind("<F11>", lambda e: self.toggle_fullscreen())
-        self.root.bind("<Escape>", lambda e: self.exit_fullscreen())
-        self.root.bind("m", lambda e: self.toggle_mute())
-    
-    def load_folder_history(self):
-        """Load folder history from file"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    return [line.strip() for line in f.readlines() if line.strip()]
-        except:
-            pass
+# Common video file extensions
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v')
+
+# Recursive scan limits
+SCAN_MAX_DEPTH = 4
+SCAN_EXCLUDE = ('@eaDir', '#recycle', '$RECYCLE.BIN', 'System Volume Information', '*.part')
+
+# Library index, shared by every folder that has been opened
+INDEX_FILE = os.path.expanduser("~/.video_sorter.db")
+
+# A folder listing is only trusted if the folder's mtime is at least this much
+# older than the listing, otherwise a change in the same mtime tick could be missed
+INDEX_MTIME_SLACK_NS = 2 * 10**9
+
+# Freedesktop trash in the home folder, other mounts get their own .Trash-<uid>
+HOME_TRASH = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "Trash")
+
+# How long a recent folder may take to answer before it is shown as not responding
+FOLDER_CHECK_TIMEOUT = 1.5  # seconds
+
+# Cross-device moves are copied in chunks of this size
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# errno values of os.link on a file system without hard links
+NO_HARD_LINK_ERRORS = (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.EMLINK)
+# How long shutdown waits for a cancelled file operation to clean up
+FILE_OPS_CANCEL_TIMEOUT = 2.0  # seconds
+# Minimum time between progress reports from the mover
+PROGRESS_INTERVAL = 0.25  # seconds
+
+# Local control socket (--control), scripts send one JSON request per line
+CONTROL_SOCKET = os.path.expanduser("~/.video_sorter.sock")
+CONTROL_TURN_TIME = 0.02  # seconds of commands run at a time on the UI thread
+CONTROL_MAX_BUFFER = 16 * 1024 * 1024  # bytes a client may leave unread, or send without a newline
+
+# Triage decisions are logged here until they are applied
+JOURNAL_FILE = os.path.expanduser("~/.video_sorter_journal")
+JOURNAL_SYNC_INTERVAL = 1.0  # seconds between fsyncs of the journal
+JOURNAL_COMPACT_LINES = 10000  # lines after which the journal is rewritten with just its current state
+
+# Duplicate detection reads this much from each end of a file before hashing all of it
+DUPLICATE_EDGE_SIZE = 64 * 1024
+# Hashing processes are started fresh rather than forked from a process with threads running
+DUPLICATE_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Near duplicates: a perceptual hash of a frame at each of these fractions of a video
+SIMILAR_POSITIONS = (0.15, 0.35, 0.55, 0.75)
+SIMILAR_FRAME_SIZE = (32, 32)  # width, height the frames are decoded at
+SIMILAR_MAX_DISTANCE = 32  # differing bits (of 64 per frame) that still count as alike
+SIMILAR_MAX_BUCKET = 64  # videos sharing a chunk value beyond which it is ignored
+SIMILAR_DURATION_SLACK = (0.02, 2000)  # durations may differ by 2% or 2 s, whichever is more
+
+# How many matches a scan worker collects before handing them to the UI
+SCAN_BATCH_SIZE = 500
+SCAN_BATCH_INTERVAL = 0.1  # seconds
+# Folders listed at the same time on each mount, a library can span several
+SCAN_WORKERS_PER_MOUNT = 4
+# Folders opened on their own are kept as profiles named after the folder, this many of them
+RECENT_FOLDERS = 10
+
+# Filter queries
+QUERY_OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '=': operator.eq}
+QUERY_UNITS = {'k': 1024, 'm': 1024**2, 'g': 1024**3, 't': 1024**4}
+QUERY_SORTS = {
+    'newest': ('mtime', True), 'oldest': ('mtime', False),
+    'largest': ('size', True), 'smallest': ('size', False),
+    'longest': ('duration', True), 'shortest': ('duration', False),
+}
+
+# Sizes and mtimes are handed from the index to the library in batches this big
+STATS_BATCH_SIZE = 10000
+
+# Following changes to the opened folder
+WATCH_DEBOUNCE = 0.3  # seconds of quiet before collected changes are handed over
+WATCH_MAX_DELAY = 1.0  # seconds changes wait at most during a long burst
+WATCH_POLL_INTERVAL = 5.0  # seconds between listings where inotify is not available
+
+# Metrics histogram buckets: latencies in seconds (0.5 ms up to about 16 s), queue depths
+METRIC_LATENCY_BUCKETS = tuple(0.0005 * 2**i for i in range(16))
+METRIC_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Contact sheets: frames taken at these fractions of a video, laid out in a grid
+THUMBNAIL_DIR = os.path.expanduser("~/.cache/video_sorter/thumbnails")
+THUMBNAIL_CACHE_BYTES = 1024**3  # least recently used sheets are removed past this
+THUMBNAIL_POSITIONS = (0.1, 0.35, 0.6, 0.85)
+THUMBNAIL_FRAME_SIZE = (96, 54)  # width, height of each frame
+THUMBNAIL_COLUMNS = 2
+
+# Skim mode reads this much at each upcoming seek point so the seek finds it cached
+PREFETCH_SIZE = 4 * 1024 * 1024
+
+
+def list_folder(path):
+    """Yield (entry, is_dir) for the video files and subfolders directly inside path
+
+    Uses os.scandir so the file/directory check comes from the cached d_type
+    instead of a stat() per entry. Dot files are skipped. Raises OSError if
+    path itself cannot be listed.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            try:
+                if entry.is_file():
+                    if name.lower().endswith(VIDEO_EXTENSIONS):
+                        yield entry, False
+                elif entry.is_dir(follow_symlinks=False):
+                    yield entry, True
+            except OSError:
+                # Entry vanished or is unreadable, skip it
+                continue
+
+
+def is_excluded(name, exclude):
+    """Check a file or folder name against the exclude patterns"""
+    return any(fnmatch(name, pattern) for pattern in exclude)
+
+
+def list_video_folder(path, exclude=SCAN_EXCLUDE):
+    """Yield the video file paths directly inside path, returns its subfolders
+
+    Names matching one of the exclude patterns are skipped. An unreadable
+    folder yields nothing and has no subfolders.
+    """
+    subfolders = []
+    try:
+        for entry, is_dir in list_folder(path):
+            if exclude and is_excluded(entry.name, exclude):
+                continue
+            if is_dir:
+                subfolders.append(entry.path)
+            else:
+                yield entry.path
+    except OSError:
         return []
+    return subfolders
+
+
+def scan_video_files(folder_path, recursive=False, max_depth=SCAN_MAX_DEPTH, exclude=SCAN_EXCLUDE,
+                     stop_event=None):
+    """Yield video file paths under folder_path as they are listed
+
+    Names matching one of the exclude patterns are skipped. With
+    recursive=True subfolders are walked depth first, up to max_depth levels
+    below folder_path.
+    """
+    pending = [(folder_path, 0)]
+    while pending:
+        if stop_event is not None and stop_event.is_set():
+            return
+        path, depth = pending.pop()
+        subfolders = yield from list_video_folder(path, exclude)
+        if recursive and depth < max_depth:
+            # Reversed so subfolders are visited in listing order
+            pending.extend((subfolder, depth + 1) for subfolder in reversed(subfolders))
+
+
+def mount_of(path):
+    """Device a folder lives on, None if it cannot be reached"""
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+def scan_roots(roots, index=None, recursive=False, max_depth=SCAN_MAX_DEPTH, exclude=SCAN_EXCLUDE,
+               stop_event=None, workers_per_mount=SCAN_WORKERS_PER_MOUNT):
+    """Yield the video file paths under several folders, listed concurrently
+
+    Each mount (device of a root) gets its own bounded pool of listing
+    threads, shared by the roots on it, so listings on different mounts
+    overlap and a share that stalls only holds up its own roots. Within a
+    root, subfolders are listed ahead on the pool but paths come out in
+    the same depth-first listing order as scan_video_files, the first ones
+    of a folder straight away, so a root's order is the same every run.
+    Roots are interleaved as their paths arrive. Goes through the index
+    (see LibraryIndex.scan) when one is given. Paths under more than one
+    root are yielded once.
+    """
+    results = queue.Queue()  # lists of paths, None when a root is done
+    stop = threading.Event()
+    pools = {}  # device -> ThreadPoolExecutor
+    pools_lock = threading.Lock()
+    
+    def stopped():
+        return stop.is_set() or (stop_event is not None and stop_event.is_set())
     
-    def save_folder_history(self):
-        """Save folder history to file"""
+    def list_one(path, listing):
+        # Runs on a mount's pool: puts batches of paths on listing, then ('done', subfolders)
+        subfolders = []
         try:
-            with open(self.history_file, 'w') as f:
-                for folder in self.folder_history:
-                    f.write(folder + '\n')
-        except:
-            pass
+            if index:
+                try:
+                    subfolders = stream(index.scan_folder(path, exclude), listing)
+                    return
+                except sqlite3.Error:
+                    # Index unusable, list the folder directly (paths already sent are skipped)
+                    pass
+            subfolders = stream(list_video_folder(path, exclude), listing)
+        finally:
+            listing.put(('done', subfolders))
     
-    def add_to_history(self, folder_path):
-        """Add folder to history, moving it to top if it exists"""
-        if folder_path in self.folder_history:
-            self.folder_history.remove(folder_path)
-        self.folder_history.insert(0, folder_path)
-        # Keep only last 10 folders
-        self.folder_history = self.folder_history[:10]
-        self.save_folder_history()
-    
-    def select_folder(self):
-        # Create a popup menu for folder selection
-        import tkinter.messagebox as messagebox
-        
-        if self.folder_history:
-            # Create a simple dialog with history
-            choice_window = tk.Toplevel(self.root)
-            choice_window.title("Select Folder")
-            choice_window.geometry("500x300")
-            choice_window.transient(self.root)
-            choice_window.grab_set()
-            
-            tk.Label(choice_window, text="Recent folders:", font=("Arial", 12, "bold")).pack(pady=5)
-            
-            # Create listbox for history
-            listbox_frame = tk.Frame(choice_window)
-            listbox_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-            
-            scrollbar = tk.Scrollbar(listbox_frame)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            self.history_listbox = tk.Listbox(listbox_frame, yscrollcommand=scrollbar.set)
-            self.history_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.config(command=self.history_listbox.yview)
-            
-            # Populate listbox with history
-            for folder in self.folder_history:
-                if os.path.exists(folder):  # Only show existing folders
-                    self.history_listbox.insert(tk.END, folder)
-            
-            # Button frame
-            button_frame = tk.Frame(choice_window)
-            button_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            def use_selected():
-                selection = self.history_listbox.curselection()
-                if selection:
-                    folder_path = self.history_listbox.get(selection[0])
-                    choice_window.destroy()
-                    self.add_to_history(folder_path)
-                    self.load_videos_from_folder(folder_path)
-            
-            def browse_new():
-                choice_window.destroy()
-                self.browse_for_folder()
-            
-            tk.Button(button_frame, text="Use Selected", command=use_selected).pack(side=tk.LEFT, padx=5)
-            tk.Button(button_frame, text="Browse New Folder", command=browse_new).pack(side=tk.LEFT, padx=5)
-            tk.Button(button_frame, text="Cancel", command=choice_window.destroy).pack(side=tk.RIGHT, padx=5)
+    def stream(paths, listing):
+        batch = []
+        first = True
+        while True:
+            try:
+                batch.append(next(paths))
+            except StopIteration as done:
+                listing.put(('paths', batch))
+                return done.value or []
+            if first or len(batch) >= SCAN_BATCH_SIZE:
+                listing.put(('paths', batch))
+                batch = []
+                first = False
+    
+    def walk(root):
+        # One thread per root: hands its folders to the mount's pool and passes
+        # their paths on in depth-first order
+        try:
+            device = mount_of(root)
+            with pools_lock:
+                if stopped():
+                    return
+                pool = pools.get(device)
+                if pool is None:
+                    pool = pools[device] = ThreadPoolExecutor(workers_per_mount, thread_name_prefix="folder-scan")
             
-            # Double-click to select
-            self.history_listbox.bind("<Double-Button-1>", lambda e: use_selected())
+            def submit(path):
+                listing = queue.Queue()
+                pool.submit(list_one, path, listing)
+                return listing
             
+            pending = [(submit(root), 0)]
+            while pending and not stopped():
+                listing, depth = pending.pop()
+                while not stopped():
+                    try:
+                        kind, value = listing.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if kind == 'paths':
+                        results.put(value)
+                        continue
+                    if recursive and depth < max_depth:
+                        # Start listing the subfolders now, reversed on the stack so
+                        # their paths are passed on in listing order
+                        subfolders = [(submit(subfolder), depth + 1) for subfolder in value]
+                        pending.extend(reversed(subfolders))
+                    break
+        except RuntimeError:
+            # Pool shut down because the scan was abandoned
+            pass
+        finally:
+            results.put(None)
+    
+    roots = [os.path.normpath(root) for root in roots]
+    for root in roots:
+        threading.Thread(target=walk, args=(root,), name="folder-scan-root", daemon=True).start()
+    seen = set()
+    remaining = len(roots)
+    try:
+        while remaining and not stopped():
+            try:
+                batch = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if batch is None:
+                remaining -= 1
+                continue
+            for path in batch:
+                if path not in seen:
+                    seen.add(path)
+                    yield path
+    finally:
+        stop.set()
+        with pools_lock:
+            for pool in pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LibraryIndex:
+    """On-disk SQLite index of every folder and video file seen so far
+
+    Each folder is stored with its mtime when it was last listed, so a later
+    scan only re-lists folders whose mtime has changed and reads everything
+    else straight from the index. Per file it keeps size, mtime, inode and,
+    once known, duration, resolution and codec. The recently opened folders
+    list, the bucket folders and the last session live here too.
+
+    Connections are per thread, so the scan worker and the Tk thread can use
+    the same LibraryIndex.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY,
+            parent TEXT,
+            mtime_ns INTEGER,
+            scanned_ns INTEGER,
+            exclude TEXT
+        );
+        CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            dir TEXT NOT NULL,
+            size INTEGER,
+            mtime REAL,
+            inode INTEGER,
+            duration INTEGER,
+            width INTEGER,
+            height INTEGER,
+            codec TEXT
+        );
+        CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+        CREATE TABLE IF NOT EXISTS history (
+            path TEXT PRIMARY KEY,
+            opened REAL
+        );
+        CREATE TABLE IF NOT EXISTS profiles (
+            name TEXT PRIMARY KEY,
+            roots TEXT NOT NULL,
+            opened REAL
+        );
+        CREATE TABLE IF NOT EXISTS buckets (
+            slot INTEGER PRIMARY KEY,
+            path TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS hashes (
+            dev INTEGER,
+            inode INTEGER,
+            size INTEGER,
+            mtime REAL,
+            edges BLOB,
+            full BLOB,
+            PRIMARY KEY (dev, inode, size, mtime)
+        );
+        CREATE TABLE IF NOT EXISTS signatures (
+            dev INTEGER,
+            inode INTEGER,
+            size INTEGER,
+            mtime REAL,
+            signature BLOB,
+            duration INTEGER,
+            PRIMARY KEY (dev, inode, size, mtime)
+        );
+    """
+    
+    # Rows per transaction when back-filling file stats
+    COMMIT_EVERY = 5000
+    
+    def __init__(self, db_path=INDEX_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._drop_stale_cache('hashes', 'dev')
+        self._drop_stale_cache('signatures', 'dev')
+        self.db.executescript(self.SCHEMA)
+        self._migrate_dirs()
+        self._migrate_history()
+    
+    def _drop_stale_cache(self, table, column):
+        # Cache tables are rebuilt rather than migrated when their key gains a column
+        db = self.db
+        columns = [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+        if columns and column not in columns:
+            db.execute(f"DROP TABLE {table}")
+            db.commit()
+    
+    def _migrate_dirs(self):
+        # Folders listed by older versions have no exclude patterns recorded and are listed again
+        db = self.db
+        if 'exclude' not in [row[1] for row in db.execute("PRAGMA table_info(dirs)")]:
+            db.execute("ALTER TABLE dirs ADD COLUMN exclude TEXT")
+            db.commit()
+    
+    def _migrate_history(self):
+        # The folder history of older versions becomes one profile per folder, once:
+        # recorded in settings so forgetting every profile later does not bring it back
+        db = self.db
+        if db.execute("SELECT 1 FROM settings WHERE key = 'history_migrated'").fetchone():
+            return
+        rows = db.execute("SELECT path, opened FROM history").fetchall()
+        db.executemany("INSERT OR IGNORE INTO profiles (name, roots, opened) VALUES (?, ?, ?)",
+                       [(path, json.dumps([path]), opened) for path, opened in rows])
+        db.execute("DELETE FROM history")
+        db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('history_migrated', 'true')")
+        db.commit()
+    
+    @property
+    def db(self):
+        """The calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @classmethod
+    def temporary(cls):
+        """Index in a fresh temporary folder that is removed on exit, for when the home folder is not writable"""
+        folder = tempfile.mkdtemp(prefix="video_sorter-")
+        atexit.register(shutil.rmtree, folder, True)
+        return cls(os.path.join(folder, "index.db"))
+    
+    @staticmethod
+    def _subtree_range(path):
+        # Everything below path sorts between "path/" and "path0" ('0' follows '/'),
+        # the root "/" already ends in the separator
+        prefix = path if path.endswith(os.sep) else path + os.sep
+        return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+    
+    def forget_subtree(self, path):
+        """Drop a folder and everything below it"""
+        low, high = self._subtree_range(path)
+        db = self.db
+        db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+        db.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (path, low, high))
+    
+    def invalidate(self, path):
+        """Have the next scan list every folder under path again, keeping what is known about the files"""
+        low, high = self._subtree_range(path)
+        self.db.execute("UPDATE dirs SET mtime_ns = NULL WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+        self.db.commit()
+    
+    def scan(self, folder_path, recursive=False, max_depth=SCAN_MAX_DEPTH, exclude=SCAN_EXCLUDE,
+             stop_event=None):
+        """Yield video file paths under folder_path, like scan_video_files
+
+        Folders whose mtime matches the index are answered from the index
+        without listing them. Changed folders are re-listed and their index
+        entries replaced (see scan_folder).
+        """
+        pending = [(os.path.normpath(folder_path), 0)]
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                return
+            path, depth = pending.pop()
+            subfolders = yield from self.scan_folder(path, exclude)
+            if recursive and depth < max_depth:
+                # Reversed so subfolders are visited in listing order
+                pending.extend((subfolder, depth + 1) for subfolder in reversed(subfolders))
+    
+    def scan_folder(self, path, exclude=SCAN_EXCLUDE):
+        """Yield the video file paths directly inside path, returns its subfolders
+
+        Answered from the index if the folder's mtime and the exclude
+        patterns have not changed since it was listed, otherwise the folder
+        is listed and its entries are replaced. Excluded files are left out
+        of the index when listing, so an unchanged folder is answered
+        without matching names again. Sizes and mtimes of new files are left
+        empty here and filled in by fill_missing_stats, so listing stays
+        stat()-free.
+
+        Known files keep their size and mtime as long as their inode is the
+        same. A file rewritten in place does not change its folder's mtime,
+        so its stats stay stale until the FolderWatcher of an open folder
+        reports the write.
+        """
+        db = self.db
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            # Folder is gone or unreachable
+            self.forget_subtree(path)
+            db.commit()
+            return []
+
+        patterns = json.dumps(sorted(exclude or ()))
+        row = db.execute("SELECT mtime_ns, scanned_ns, exclude FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == mtime_ns and row[1] - mtime_ns >= INDEX_MTIME_SLACK_NS and row[2] == patterns:
+            # Unchanged since the last listing
+            for (file_path,) in db.execute("SELECT path FROM files WHERE dir = ?", (path,)):
+                yield file_path
+            subfolders = [p for (p,) in db.execute("SELECT path FROM dirs WHERE parent = ?", (path,))]
         else:
-            # No history, go straight to browser
-            self.browse_for_folder()
-    
-    def browse_for_folder(self):
-        # Set initial directory to last used folder if available
-        initial_dir = self.folder_history[0] if self.folder_history else None
-        if initial_dir and not os.path.exists(initial_dir):
-            initial_dir = os.path.dirname(initial_dir) if initial_dir else None
-        
-        folder_path = filedialog.askdirectory(
-            title="Select Folder Containing Videos",
-            initialdir=initial_dir,
-            mustexist=True
-        )
-        
-        if folder_path:
-            self.add_to_history(folder_path)
-            self.load_videos_from_folder(folder_path)
+            scanned_ns = time.time_ns()
+            files = {}
+            subfolders = []
+            try:
+                for entry, is_dir in list_folder(path):
+                    if is_dir:
+                        subfolders.append(entry.path)
+                        continue
+                    if not exclude or not is_excluded(entry.name, exclude):
+                        files[entry.path] = entry.inode()
+                        yield entry.path
+            except OSError:
+                return []
+            
+            # Replace this folder's entries, keeping what we know about files that are still there
+            known = {p: inode for p, inode in db.execute("SELECT path, inode FROM files WHERE dir = ?", (path,))}
+            gone = [(p,) for p in known if p not in files]
+            db.executemany("DELETE FROM files WHERE path = ?", gone)
+            db.executemany("INSERT OR REPLACE INTO files (path, dir, inode) VALUES (?, ?, ?)",
+                           [(p, path, inode) for p, inode in files.items() if known.get(p, -1) != inode])
+            known_subfolders = [p for (p,) in db.execute("SELECT path FROM dirs WHERE parent = ?", (path,))]
+            for subfolder in set(known_subfolders) - set(subfolders):
+                self.forget_subtree(subfolder)
+            db.executemany("INSERT OR IGNORE INTO dirs (path, parent) VALUES (?, ?)",
+                           [(p, path) for p in subfolders])
+            db.execute("INSERT INTO dirs (path, parent, mtime_ns, scanned_ns, exclude) VALUES (?, ?, ?, ?, ?) "
+                       "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, scanned_ns = excluded.scanned_ns, "
+                       "exclude = excluded.exclude",
+                       (path, os.path.dirname(path), mtime_ns, scanned_ns, patterns))
+            # Commit per folder so other threads are never kept waiting on the write lock
+            db.commit()
+        return [p for p in subfolders if not exclude or not is_excluded(os.path.basename(p), exclude)]
     
-    def load_videos_from_folder(self, folder_path):
-        # Common video file extensions
-        video_extensions = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v')
-        
-        # Get all video files (skip dot files)
-        self.video_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                           if os.path.isfile(os.path.join(folder_path, f)) and 
-                           not f.startswith('.') and
-                           f.lower().endswith(video_extensions)]
-        
-        if not self.video_files:
-            self.status_label.config(text="No video files found in folder")
+    def fill_missing_stats(self, folder_path, stop_event=None):
+        """Stat files under folder_path that were indexed without size/mtime"""
+        db = self.db
+        folder_path = os.path.normpath(folder_path)
+        low, high = self._subtree_range(folder_path)
+        rows = db.execute("SELECT path FROM files WHERE size IS NULL AND (dir = ? OR (dir >= ? AND dir < ?))",
+                          (folder_path, low, high)).fetchall()
+        updates = []
+        for (path,) in rows:
+            if stop_event is not None and stop_event.is_set():
+                break
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            updates.append((st.st_size, st.st_mtime, st.st_ino, path))
+            if len(updates) >= self.COMMIT_EVERY:
+                db.executemany("UPDATE files SET size = ?, mtime = ?, inode = ? WHERE path = ?", updates)
+                db.commit()
+                updates = []
+        db.executemany("UPDATE files SET size = ?, mtime = ?, inode = ? WHERE path = ?", updates)
+        db.commit()
+    
+    def file_stats(self, folder_path):
+        """Yield (path, size, mtime) for the files under folder_path, -1/None where unknown"""
+        folder_path = os.path.normpath(folder_path)
+        low, high = self._subtree_range(folder_path)
+        yield from self.db.execute("SELECT path, IFNULL(size, -1), mtime FROM files "
+                                   "WHERE dir = ? OR (dir >= ? AND dir < ?)", (folder_path, low, high))
+    
+    def file_metadata(self, folder_path):
+        """Yield (path, info) for the probed files under folder_path, info as from get_metadata"""
+        folder_path = os.path.normpath(folder_path)
+        low, high = self._subtree_range(folder_path)
+        for path, duration, width, height, codec in self.db.execute(
+                "SELECT path, duration, width, height, codec FROM files "
+                "WHERE duration IS NOT NULL AND (dir = ? OR (dir >= ? AND dir < ?))", (folder_path, low, high)):
+            yield path, {'duration': duration, 'width': width, 'height': height, 'codec': codec}
+    
+    def profiles(self):
+        """Library profiles as (name, roots), most recently opened first"""
+        return [(name, json.loads(roots)) for name, roots in
+                self.db.execute("SELECT name, roots FROM profiles ORDER BY opened DESC")]
+    
+    def profile(self, name):
+        """The roots of the named profile, None if there is no such profile"""
+        row = self.db.execute("SELECT roots FROM profiles WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_profile(self, name, roots, opened=None):
+        """Create or update a profile and mark it as just opened
+
+        A folder opened on its own is saved as a profile named after it;
+        only the RECENT_FOLDERS most recent of those are kept.
+        """
+        db = self.db
+        db.execute("INSERT OR REPLACE INTO profiles (name, roots, opened) VALUES (?, ?, ?)",
+                   (name, json.dumps(list(roots)), time.time() if opened is None else opened))
+        folders = [n for n, roots in self.profiles() if roots == [n]]
+        db.executemany("DELETE FROM profiles WHERE name = ?", [(n,) for n in folders[RECENT_FOLDERS:]])
+        db.commit()
+    
+    def forget_profile(self, name):
+        self.db.execute("DELETE FROM profiles WHERE name = ?", (name,))
+        self.db.commit()
+    
+    def forget_file(self, path):
+        """Drop a single file, e.g. after it was deleted"""
+        self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        self.db.commit()
+    
+    def forget_files(self, paths):
+        """Drop many files in one transaction, e.g. after a triage batch was applied"""
+        db = self.db
+        db.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+        db.commit()
+    
+    def apply_changes(self, changes):
+        """Apply the add/remove/rename changes reported by a FolderWatcher"""
+        db = self.db
+        for change in changes:
+            op, path = change[0], change[1]
+            if op == 'add':
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                # Probe results only stay valid if the file is unchanged
+                db.execute("INSERT INTO files (path, dir, size, mtime, inode) VALUES (?, ?, ?, ?, ?) "
+                           "ON CONFLICT(path) DO UPDATE SET duration = CASE WHEN size IS excluded.size "
+                           "AND mtime IS excluded.mtime THEN duration END, "
+                           "size = excluded.size, mtime = excluded.mtime, inode = excluded.inode",
+                           (path, os.path.dirname(path), st.st_size, st.st_mtime, st.st_ino))
+            elif op == 'remove':
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+            elif op == 'rename':
+                new_path = change[2]
+                # Keep what is known about the file under its new name
+                db.execute("DELETE FROM files WHERE path = ?", (new_path,))
+                db.execute("UPDATE files SET path = ?, dir = ? WHERE path = ?",
+                           (new_path, os.path.dirname(new_path), path))
+            elif op == 'remove_dir':
+                self.forget_subtree(path)
+        db.commit()
+    
+    def get_hashes(self, keys):
+        """Cached content hashes as {(dev, inode, size, mtime): [edges, full]}"""
+        cached = {}
+        db = self.db
+        for key in keys:
+            row = db.execute("SELECT edges, full FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime = ?",
+                             key).fetchone()
+            if row:
+                cached[key] = list(row)
+        return cached
+    
+    def set_hashes(self, hashes):
+        """Store {(dev, inode, size, mtime): [edges, full]}"""
+        self.db.executemany("INSERT OR REPLACE INTO hashes (dev, inode, size, mtime, edges, full) VALUES (?, ?, ?, ?, ?, ?)",
+                            [key + tuple(value) for key, value in hashes.items()])
+        self.db.commit()
+    
+    def get_signatures(self, keys):
+        """Cached perceptual signatures as {(dev, inode, size, mtime): (signature, duration)}"""
+        cached = {}
+        db = self.db
+        for key in keys:
+            row = db.execute("SELECT signature, duration FROM signatures "
+                             "WHERE dev = ? AND inode = ? AND size = ? AND mtime = ?", key).fetchone()
+            if row:
+                cached[key] = (row[0], row[1])
+        return cached
+    
+    def set_signatures(self, signatures):
+        """Store {(dev, inode, size, mtime): (signature, duration)}"""
+        self.db.executemany("INSERT OR REPLACE INTO signatures (dev, inode, size, mtime, signature, duration) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", [key + tuple(value) for key, value in signatures.items()])
+        self.db.commit()
+    
+    def get_buckets(self):
+        """Destination folders bound to the number keys, as {slot: path}"""
+        return dict(self.db.execute("SELECT slot, path FROM buckets"))
+    
+    def set_bucket(self, slot, folder_path):
+        self.db.execute("INSERT OR REPLACE INTO buckets (slot, path) VALUES (?, ?)", (slot, folder_path))
+        self.db.commit()
+    
+    def get_setting(self, key, default=None):
+        """JSON value stored under key"""
+        row = self.db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def set_setting(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        self.db.commit()
+    
+    def get_metadata(self, path):
+        """Cached probe result for path, or None if it has not been probed"""
+        row = self.db.execute("SELECT duration, width, height, codec FROM files WHERE path = ?", (path,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        return {'duration': row[0], 'width': row[1], 'height': row[2], 'codec': row[3]}
+    
+    def set_metadata(self, path, info):
+        """Store a probe result (duration -1 marks a file that could not be parsed)"""
+        self.db.execute("INSERT INTO files (path, dir, duration, width, height, codec) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(path) DO UPDATE SET duration = excluded.duration, width = excluded.width, "
+                        "height = excluded.height, codec = excluded.codec",
+                        (path, os.path.dirname(path), info['duration'], info['width'], info['height'], info['codec']))
+        self.db.commit()
+    
+    def import_history_file(self, history_file):
+        """One-time import of the old plain text history file, one profile per folder"""
+        if self.get_setting('history_file_imported'):
             return
+        # Indexes from before the import was recorded have profiles once it has run
+        if not self.db.execute("SELECT 1 FROM profiles LIMIT 1").fetchone() and os.path.exists(history_file):
+            with open(history_file, 'r') as f:
+                folders = [line.strip() for line in f.readlines() if line.strip()]
+            # File is newest first, give each entry a timestamp that keeps that order
+            now = time.time()
+            for age, folder in enumerate(folders[:RECENT_FOLDERS]):
+                self.save_profile(folder, [folder], opened=now - age)
+        self.set_setting('history_file_imported', True)
+
+
+class FolderScanner:
+    """Runs a scan of one or more folders on background threads
+
+    The roots are listed concurrently by scan_roots, going through the
+    LibraryIndex when one is given so unchanged folders are not listed
+    again. Matches from all roots are handed to on_batch in batches through
+    ui_queue.post() as they arrive, and on_done is called once every root
+    is listed. With an index, sizes and mtimes follow in batches of
+    (path, size, mtime) to on_stats.
+    """
+    def __init__(self, ui_queue, roots, on_batch, on_done, index=None, on_stats=None, **scan_options):
+        self.ui_queue = ui_queue
+        self.roots = list(roots)
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.on_stats = on_stats
+        self.index = index
+        self.scan_options = scan_options
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="folder-scan", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def cancel(self):
+        """Stop scanning, nothing more is posted to the UI after this"""
+        self.stop_event.set()
+    
+    def _post(self, func, *args):
+        if not self.stop_event.is_set():
+            self.ui_queue.post(self._deliver, func, args)
+    
+    def _deliver(self, func, args):
+        # Checked again on the Tk thread in case the scan was cancelled meanwhile
+        if not self.stop_event.is_set():
+            func(*args)
+    
+    def _run(self):
+        batch = []
+        last_post = time.monotonic()
+        first = True
+        for path in scan_roots(self.roots, self.index, stop_event=self.stop_event, **self.scan_options):
+            batch.append(path)
+            now = time.monotonic()
+            # Hand over the first match right away so playback can start
+            if first or len(batch) >= SCAN_BATCH_SIZE or now - last_post >= SCAN_BATCH_INTERVAL:
+                self._post(self.on_batch, batch)
+                batch = []
+                last_post = now
+                first = False
+        if batch:
+            self._post(self.on_batch, batch)
+        self._post(self.on_done)
         
-        self.current_index = 0
-        self.status_label.config(text=f"Found {len(self.video_files)} videos")
-        self.play_current_video()
+        # Sizes and mtimes of newly indexed files are collected once playback is going
+        if self.index and not self.stop_event.is_set():
+            try:
+                for root in self.roots:
+                    self.index.fill_missing_stats(root, self.stop_event)
+                    if self.on_stats:
+                        stats = self.index.file_stats(root)
+                        while not self.stop_event.is_set():
+                            batch = list(itertools.islice(stats, STATS_BATCH_SIZE))
+                            if not batch:
+                                break
+                            self._post(self.on_stats, batch)
+            except sqlite3.Error:
+                pass
+
+
+class Inotify:
+    """Minimal ctypes binding to the Linux inotify API
+
+    Raises OSError where inotify is not available.
+    """
+    CLOSE_WRITE = 0x00000008
+    MOVED_FROM = 0x00000040
+    MOVED_TO = 0x00000080
+    CREATE = 0x00000100
+    DELETE = 0x00000200
+    DELETE_SELF = 0x00000400
+    MOVE_SELF = 0x00000800
+    Q_OVERFLOW = 0x00004000
+    IGNORED = 0x00008000
+    ONLYDIR = 0x01000000
+    ISDIR = 0x40000000
+    NONBLOCK = os.O_NONBLOCK
+    CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+    
+    EVENT = struct.Struct('iIII')  # wd, mask, cookie, length of the name that follows
+    
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(self.NONBLOCK | self.CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+    
+    def rm_watch(self, wd):
+        # Fails harmlessly if the kernel already dropped the watch
+        self._libc.inotify_rm_watch(self.fd, wd)
+    
+    def read(self, timeout):
+        """Wait up to timeout seconds for events, returns [(wd, mask, cookie, name)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, cookie, os.fsdecode(name)))
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Follows changes to an opened folder on a background thread
+
+    Uses inotify on Linux and otherwise (or when inotify runs out of
+    watches) lists the folder again every poll_interval seconds, which with
+    an index only re-lists folders whose mtime changed. Changes are a list
+    of ('add', path), ('remove', path), ('rename', old, new),
+    ('remove_dir', path) and, after the kernel dropped events,
+    ('sync', set of every path), in the order they happened. They are
+    collected until the folder has been quiet for WATCH_DEBOUNCE and handed
+    to on_changes in one go, so a burst of thousands of new files is a
+    single update. The index is updated on the watcher thread.
+    """
+    MASK = (Inotify.CLOSE_WRITE | Inotify.MOVED_FROM | Inotify.MOVED_TO | Inotify.CREATE | Inotify.DELETE
+            | Inotify.DELETE_SELF | Inotify.MOVE_SELF | Inotify.ONLYDIR)
     
-    def play_current_video(self):
-        if not self.video_files or self.current_index < 0 or self.current_index >= len(self.video_files):
+    def __init__(self, ui_queue, folder_path, on_changes, index=None, recursive=False,
+                 max_depth=SCAN_MAX_DEPTH, exclude=SCAN_EXCLUDE, poll_interval=WATCH_POLL_INTERVAL):
+        self.ui_queue = ui_queue
+        self.folder_path = os.path.normpath(folder_path)
+        self.on_changes = on_changes
+        self.index = index
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.exclude = exclude
+        self.poll_interval = poll_interval
+        self.watches = {}  # wd -> (folder path, depth below folder_path)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="folder-watch", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def cancel(self):
+        """Stop watching, nothing more is posted to the UI after this"""
+        self.stop_event.set()
+    
+    def _post(self, func, *args):
+        if not self.stop_event.is_set():
+            self.ui_queue.post(self._deliver, func, args)
+    
+    def _deliver(self, func, args):
+        # Checked again on the Tk thread in case the watch was cancelled meanwhile
+        if not self.stop_event.is_set():
+            func(*args)
+    
+    def _list(self):
+        """Every video under the folder right now"""
+        options = dict(recursive=self.recursive, max_depth=self.max_depth, exclude=self.exclude,
+                       stop_event=self.stop_event)
+        if self.index:
+            try:
+                return set(self.index.scan(self.folder_path, **options))
+            except sqlite3.Error:
+                pass
+        return set(scan_video_files(self.folder_path, **options))
+    
+    def _run(self):
+        try:
+            inotify = Inotify()
+        except OSError:
+            self._poll()
             return
+        try:
+            self._watch_tree(inotify, self.folder_path, 0)
+            if self.watches:
+                self._follow(inotify)
+                return
+        except OSError:
+            # Out of watches, listing every now and then still works
+            pass
+        finally:
+            inotify.close()
+        if not self.stop_event.is_set():
+            self._poll()
+    
+    def _poll(self):
+        known = self._list()
+        while not self.stop_event.wait(self.poll_interval):
+            present = self._list()
+            changes = [('remove', path) for path in known - present]
+            changes += [('add', path) for path in sorted(present - known)]
+            known = present
+            if changes:
+                self._post(self.on_changes, changes)
+    
+    def _watch_tree(self, inotify, path, depth):
+        """Watch path and, when recursive, the folders below it"""
+        pending = [(path, depth)]
+        while pending:
+            path, depth = pending.pop()
+            try:
+                wd = inotify.add_watch(path, self.MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise
+                # Folder vanished or is unreadable
+                continue
+            self.watches[wd] = (path, depth)
+            if self.recursive and depth < self.max_depth:
+                try:
+                    pending.extend((entry.path, depth + 1) for entry, is_dir in list_folder(path)
+                                   if is_dir and not (self.exclude and is_excluded(entry.name, self.exclude)))
+                except OSError:
+                    continue
+    
+    def _unwatch_tree(self, inotify, path):
+        prefix = path + os.sep
+        for wd, (watched, depth) in list(self.watches.items()):
+            if watched == path or watched.startswith(prefix):
+                inotify.rm_watch(wd)
+                del self.watches[wd]
+    
+    def _follow(self, inotify):
+        changes = []
+        first_change = None
+        while not self.stop_event.is_set():
+            events = inotify.read(WATCH_DEBOUNCE if changes else 0.5)
+            now = time.monotonic()
+            if events:
+                if not self._handle(inotify, events, changes):
+                    break
+                if changes and first_change is None:
+                    first_change = now
+            # Hand over once things are quiet, or anyway after WATCH_MAX_DELAY
+            if changes and (not events or now - first_change >= WATCH_MAX_DELAY):
+                self._flush(changes)
+                changes = []
+                first_change = None
+        if changes:
+            self._flush(changes)
+    
+    def _flush(self, changes):
+        if self.index:
+            try:
+                self.index.apply_changes(changes)
+            except sqlite3.Error:
+                pass
+        self._post(self.on_changes, changes)
+    
+    def _handle(self, inotify, events, changes):
+        """Turn inotify events into changes, returns False once the folder itself is gone"""
+        moved_away = {}  # cookie -> index in changes of the remove a rename would replace
+        for wd, mask, cookie, name in events:
+            if mask & Inotify.Q_OVERFLOW:
+                # Events were dropped, compare against a full listing instead
+                changes.append(('sync', self._list()))
+                continue
+            if mask & Inotify.IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+            folder, depth = self.watches[wd]
+            if mask & (Inotify.DELETE_SELF | Inotify.MOVE_SELF):
+                if folder == self.folder_path:
+                    changes.append(('remove_dir', folder))
+                    return False
+                # Subfolders are handled through their parent's event
+                continue
+            if not name or name.startswith('.') or (self.exclude and is_excluded(name, self.exclude)):
+                continue
+            path = os.path.join(folder, name)
+            
+            if mask & Inotify.ISDIR:
+                if not self.recursive or depth >= self.max_depth:
+                    continue
+                if mask & (Inotify.CREATE | Inotify.MOVED_TO):
+                    # Files may have landed before the watch was in place, list them too
+                    try:
+                        self._watch_tree(inotify, path, depth + 1)
+                    except OSError:
+                        pass
+                    changes.extend(('add', p) for p in scan_video_files(
+                        path, recursive=True, max_depth=self.max_depth - depth - 1, exclude=self.exclude))
+                elif mask & (Inotify.DELETE | Inotify.MOVED_FROM):
+                    self._unwatch_tree(inotify, path)
+                    changes.append(('remove_dir', path))
+                continue
+            
+            if not name.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            if mask & Inotify.MOVED_FROM:
+                # A remove unless the matching MOVED_TO turns it into a rename
+                moved_away[cookie] = len(changes)
+                changes.append(('remove', path))
+            elif mask & Inotify.MOVED_TO:
+                if cookie in moved_away:
+                    i = moved_away.pop(cookie)
+                    changes[i] = ('rename', changes[i][1], path)
+                else:
+                    changes.append(('add', path))
+            elif mask & Inotify.CLOSE_WRITE:
+                # Added once fully written, not on CREATE
+                changes.append(('add', path))
+            elif mask & Inotify.DELETE:
+                changes.append(('remove', path))
+        return True
+
+
+def check_paths_exist(paths, timeout=FOLDER_CHECK_TIMEOUT):
+    """Check which paths exist without hanging on a stalled network mount
+
+    Every path is checked on its own daemon thread. Returns a dict mapping
+    each path to True/False, or None if its check had not finished after
+    timeout seconds.
+    """
+    results = {}
+    
+    def check(path):
+        results[path] = os.path.exists(path)
+    
+    threads = [threading.Thread(target=check, args=(path,), name="path-check", daemon=True) for path in paths]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+    return {path: results.get(path) for path in paths}
+
+
+# A file moved to the trash: where it came from, where it is now and its .trashinfo
+TrashedFile = collections.namedtuple('TrashedFile', 'original trashed info')
+
+
+def find_trash_dir(path):
+    """Trash folder for path, on the same device whenever possible
+
+    Uses the home trash for files on the home device, otherwise
+    <mount point>/.Trash-<uid> as described in the freedesktop trash spec,
+    falling back to the home trash if that cannot be created.
+    """
+    device = os.stat(path).st_dev
+    os.makedirs(HOME_TRASH, exist_ok=True)
+    if os.stat(HOME_TRASH).st_dev == device:
+        return HOME_TRASH
+    # Walk up to the mount point
+    top = os.path.dirname(os.path.abspath(path))
+    while top != os.path.dirname(top) and os.stat(os.path.dirname(top)).st_dev == device:
+        top = os.path.dirname(top)
+    trash = os.path.join(top, f".Trash-{os.getuid()}") if hasattr(os, 'getuid') else None
+    if trash:
+        try:
+            os.makedirs(trash, mode=0o700, exist_ok=True)
+            return trash
+        except OSError:
+            pass
+    return HOME_TRASH
+
+
+def move_to_trash(path):
+    """Move path into the trash, returns a TrashedFile for restore_from_trash"""
+    path = os.path.abspath(path)
+    trash = find_trash_dir(path)
+    files_dir = os.path.join(trash, "files")
+    info_dir = os.path.join(trash, "info")
+    os.makedirs(files_dir, exist_ok=True)
+    os.makedirs(info_dir, exist_ok=True)
+    
+    # Reserve a unique name by creating its .trashinfo exclusively
+    name = os.path.basename(path)
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while True:
+        info_path = os.path.join(info_dir, name + ".trashinfo")
+        try:
+            fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            break
+        except FileExistsError:
+            counter += 1
+            name = f"{stem}.{counter}{ext}"
+    with os.fdopen(fd, 'w') as f:
+        f.write("[Trash Info]\n")
+        f.write(f"Path={quote(path)}\n")
+        f.write(f"DeletionDate={time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
+    
+    trashed = os.path.join(files_dir, name)
+    try:
+        # A plain rename on the same device, a copy otherwise
+        shutil.move(path, trashed)
+    except OSError:
+        os.remove(info_path)
+        raise
+    return TrashedFile(path, trashed, info_path)
+
+
+def restore_from_trash(trashed):
+    """Move a TrashedFile back to where it came from"""
+    if os.path.exists(trashed.original):
+        raise FileExistsError(f"{trashed.original} already exists")
+    shutil.move(trashed.trashed, trashed.original)
+    try:
+        os.remove(trashed.info)
+    except OSError:
+        pass
+    return trashed
+
+
+def format_size(size):
+    """Human readable byte count"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def prefetch_ranges(path, fractions, size=PREFETCH_SIZE):
+    """Read size bytes at each fraction of path into the page cache
+
+    Byte offsets only approximate where a playback position lies, which is
+    close enough for a seek on a slow mount to find its data already read.
+    Errors are ignored, it is only a hint.
+    """
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            length = os.fstat(f.fileno()).st_size
+            for fraction in fractions:
+                f.seek(max(0, min(int(length * fraction), length - size)))
+                remaining = size
+                while remaining > 0:
+                    chunk = f.read(min(remaining, COPY_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+    except OSError:
+        pass
+
+
+def hash_file_edges(path):
+    """Hash of the first and last DUPLICATE_EDGE_SIZE bytes of path (runs in a worker process)"""
+    try:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            h.update(f.read(DUPLICATE_EDGE_SIZE))
+            size = os.fstat(f.fileno()).st_size
+            if size > DUPLICATE_EDGE_SIZE:
+                f.seek(max(DUPLICATE_EDGE_SIZE, size - DUPLICATE_EDGE_SIZE))
+                h.update(f.read(DUPLICATE_EDGE_SIZE))
+        return h.digest()
+    except OSError:
+        return None
+
+
+def hash_file_full(path):
+    """Hash of the whole of path through a memory map (runs in a worker process)"""
+    try:
+        h = hashlib.blake2b(digest_size=32)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            h.update(m)
+        return h.digest()
+    except (OSError, ValueError):
+        return None
+
+
+def find_duplicates(paths, index=None, workers=None, progress=None):
+    """Group paths whose contents are identical
+
+    Files are grouped by size first, then by a hash of their first and last
+    DUPLICATE_EDGE_SIZE bytes, and only files that still collide are
+    hashed in full. Hashing runs in a process pool started through a
+    forkserver, as this is usually called from a worker thread, and results
+    are cached in the LibraryIndex by (device, inode, size, mtime), so a
+    rerun only hashes new or changed files. Hard links to the same file count once.
+    progress(stage, done, total) is called as hashing goes.
+
+    Returns (size, [paths]) groups, most reclaimable space first.
+    """
+    by_size = collections.defaultdict(list)
+    seen_files = set()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size == 0 or (st.st_dev, st.st_ino) in seen_files:
+            continue
+        seen_files.add((st.st_dev, st.st_ino))
+        by_size[st.st_size].append((path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime)))
+    
+    candidates = [file for group in by_size.values() if len(group) > 1 for file in group]
+    cached = index.get_hashes([key for path, key in candidates]) if index else {}
+    fresh = {}
+    
+    def hash_stage(pool, files, slot, func, stage):
+        """Fill in hash slot (0 edges, 1 full) for files, from the cache where possible"""
+        missing = [(path, key) for path, key in files if not (cached.get(key) or [None, None])[slot]]
+        results = pool.map(func, [path for path, key in missing], chunksize=8)
+        for done, ((path, key), digest) in enumerate(zip(missing, results), 1):
+            if digest is not None:
+                entry = cached.setdefault(key, [None, None])
+                entry[slot] = digest
+                fresh[key] = entry
+            if progress:
+                progress(stage, done, len(missing))
+        return [(path, key) for path, key in files if (cached.get(key) or [None, None])[slot]]
+    
+    def regroup(files, slot):
+        groups = collections.defaultdict(list)
+        for path, key in files:
+            groups[(key[2], cached[key][slot])].append((path, key))
+        return [group for group in groups.values() if len(group) > 1]
+    
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(DUPLICATE_START_METHOD)) as pool:
+        hashed = hash_stage(pool, candidates, 0, hash_file_edges, "edges")
+        edge_groups = regroup(hashed, 0)
         
-        # Get the current video file
-        video_path = self.video_files[self.current_index]
-        
-        # Update the window title with the filename
-        filename = os.path.basename(video_path)
-        self.root.title(f"Video File Sorter - {filename}")
-        
-        # Stop any current playback and mute before loading new video to prevent audio artifacts
-        self.player.audio_set_mute(True)
-        self.player.stop()
-        
-        # Create a new media with options
-        media = self.instance.media_new(str(video_path))
+        # Files no bigger than both edges together are already hashed completely
+        for group in edge_groups:
+            for path, key in group:
+                if key[2] <= 2 * DUPLICATE_EDGE_SIZE and cached[key][1] is None:
+                    cached[key][1] = cached[key][0]
+                    fresh[key] = cached[key]
+        hashed = hash_stage(pool, [file for group in edge_groups for file in group], 1, hash_file_full, "full")
+        full_groups = regroup(hashed, 1)
+    
+    if index and fresh:
+        index.set_hashes(fresh)
+    
+    groups = [(group[0][1][2], sorted(path for path, key in group)) for group in full_groups]
+    # Most space to win first
+    groups.sort(key=lambda group: group[0] * (len(group[1]) - 1), reverse=True)
+    return groups
+
+
+def print_duplicate_report(groups, out=sys.stdout):
+    """Headless duplicate report with the total space that could be reclaimed"""
+    reclaimable = 0
+    for size, paths in groups:
+        reclaimable += size * (len(paths) - 1)
+        print(f"{len(paths)} copies, {format_size(size)} each:", file=out)
+        for path in paths:
+            print(f"  {path}", file=out)
+    print(f"Reclaimable: {format_size(reclaimable)} ({reclaimable} bytes) in {len(groups)} groups", file=out)
+    return reclaimable
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, rows are frequencies"""
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def phash(frame):
+    """64-bit perceptual hash of a 32x32 RGB (or grayscale) frame
+
+    Bit i tells whether the i-th of the 8x8 lowest frequencies of the
+    frame's DCT is above their median, which survives re-encoding, scaling
+    and small colour changes.
+    """
+    gray = frame @ np.array([0.299, 0.587, 0.114]) if frame.ndim == 3 else frame.astype(np.float64)
+    low = (_DCT_32 @ gray @ _DCT_32.T)[:8, :8].ravel()
+    # The DC term is just the brightness, leave it out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def video_signature(frames):
+    """Perceptual hashes of a video's frames (at SIMILAR_POSITIONS) as bytes"""
+    return b"".join(phash(frame).to_bytes(8, 'big') for frame in frames)
+
+
+# Set bits of every byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], np.uint8)
+
+
+def find_similar(paths, signer, index=None, workers=None, progress=None, max_distance=SIMILAR_MAX_DISTANCE):
+    """Group videos that look alike: re-encodes, other resolutions, re-muxes
+
+    signer(path) returns (video_signature, duration in ms) or None; it
+    decodes frames, so it needs libvlc and is left to the caller. It runs
+    on a thread pool, and signatures are cached in the LibraryIndex by
+    (device, inode, size, mtime); files that could not be signed are tried
+    again next time.
+
+    Candidates come from a multi-index lookup: each signature is cut into
+    16-bit chunks and videos sharing a chunk at the same place are paired,
+    without comparing all pairs. By pigeonhole a pair differing in fewer
+    bits than there are chunks shares at least one chunk, and most pairs a
+    little further apart do too. Chunk values shared by more than
+    SIMILAR_MAX_BUCKET videos (black frames, test cards) are skipped as too
+    common to say anything, so a pair whose only shared chunks are such
+    values is missed even when it is that close. Candidates then need at
+    most max_distance differing bits and durations that agree.
+    progress(stage, done, total) is called as signing goes.
+
+    Returns (reclaimable bytes, [paths]) groups, most reclaimable first,
+    each group's biggest file first.
+    """
+    files = []
+    seen_files = set()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size == 0 or (st.st_dev, st.st_ino) in seen_files:
+            continue
+        seen_files.add((st.st_dev, st.st_ino))
+        files.append((path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime)))
+    
+    cached = index.get_signatures([key for path, key in files]) if index else {}
+    missing = [(path, key) for path, key in files if key not in cached]
+    fresh = {}
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+        results = pool.map(signer, [path for path, key in missing])
+        for done, ((path, key), result) in enumerate(zip(missing, results), 1):
+            cached[key] = result or (None, -1)
+            if result:
+                fresh[key] = result
+            if progress:
+                progress("frames", done, len(missing))
+    if index and fresh:
+        index.set_signatures(fresh)
+    
+    signed = [(path, key) for path, key in files if cached[key][0] is not None]
+    if len(signed) < 2:
+        return []
+    signatures = np.frombuffer(b"".join(cached[key][0] for path, key in signed), np.uint8).reshape(len(signed), -1)
+    durations = np.array([cached[key][1] for path, key in signed], np.int64)
+    
+    # Pairs sharing a chunk: sort each chunk column, equal neighbours d apart are pairs
+    chunks = signatures.view('>u2')
+    firsts, seconds = [], []
+    for column in range(chunks.shape[1]):
+        values = chunks[:, column]
+        unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+        usable = np.flatnonzero((counts[inverse] > 1) & (counts[inverse] <= SIMILAR_MAX_BUCKET))
+        order = usable[np.argsort(values[usable], kind='stable')]
+        ordered = values[order]
+        for d in range(1, SIMILAR_MAX_BUCKET):
+            same = ordered[:-d] == ordered[d:]
+            if not same.any():
+                break
+            firsts.append(order[:-d][same])
+            seconds.append(order[d:][same])
+    if not firsts:
+        return []
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    pairs = np.unique(np.minimum(first, second) * len(signed) + np.maximum(first, second))
+    first, second = np.divmod(pairs, len(signed))
+    
+    # Check the whole signature and the durations of each candidate pair
+    distance = _POPCOUNT[signatures[first] ^ signatures[second]].sum(axis=1)
+    slack, slack_ms = SIMILAR_DURATION_SLACK
+    longer = np.maximum(durations[first], durations[second])
+    known = (durations[first] > 0) & (durations[second] > 0)
+    close = ~known | (np.abs(durations[first] - durations[second]) <= np.maximum(slack * longer, slack_ms))
+    keep = (distance <= max_distance) & close
+    
+    parent = list(range(len(signed)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in zip(first[keep].tolist(), second[keep].tolist()):
+        parent[find(i)] = find(j)
+    
+    grouped = collections.defaultdict(list)
+    for i, (path, key) in enumerate(signed):
+        grouped[find(i)].append((key[2], path))
+    groups = []
+    for members in grouped.values():
+        if len(members) > 1:
+            members.sort(reverse=True)
+            sizes = [size for size, path in members]
+            groups.append((sum(sizes) - sizes[0], [path for size, path in members]))
+    groups.sort(key=lambda group: group[0], reverse=True)
+    return groups
+
+
+def unique_destination(dest_dir, name):
+    """Path for name inside dest_dir that does not exist yet"""
+    stem, ext = os.path.splitext(name)
+    dest = os.path.join(dest_dir, name)
+    counter = 1
+    while os.path.lexists(dest):
+        counter += 1
+        dest = os.path.join(dest_dir, f"{stem} ({counter}){ext}")
+    return dest
+
+
+def link_into_place(src, dest_dir, name):
+    """Give src a free name in dest_dir without ever replacing a file there, returns the new path
+
+    The name from unique_destination may be taken by the time src gets it,
+    so src is hard linked (which fails rather than replaces) and then
+    unlinked. Where the file system has no hard links, the name is held
+    with an empty file created exclusively and src renamed over it.
+    """
+    while True:
+        dest = unique_destination(dest_dir, name)
+        try:
+            os.link(src, dest, follow_symlinks=False)
+        except FileExistsError:
+            # Taken since it was picked, try the next one
+            continue
+        except OSError as e:
+            if e.errno not in NO_HARD_LINK_ERRORS:
+                raise
+            try:
+                os.close(os.open(dest, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                continue
+            try:
+                os.replace(src, dest)
+            except BaseException:
+                os.remove(dest)
+                raise
+            return dest
+        os.unlink(src)
+        return dest
+
+
+def copy_verified(src, dest_dir, progress=None, cancel=None):
+    """Copy src into dest_dir in chunks, fsync it and check it reads back identical, returns the new path
+
+    The copy is written to a '.part' file and only given its name (see
+    link_into_place) once verified; it is read back from the disk, not the
+    page cache, where posix_fadvise can drop the cached pages.
+    progress(copied, total) is called after every chunk. Setting the
+    cancel event stops the copy and removes the '.part' file.
+    """
+    name = os.path.basename(src)
+    total = os.path.getsize(src)
+    src_hash = hashlib.blake2b(digest_size=16)
+    copied = 0
+    while True:
+        part = unique_destination(dest_dir, name + '.part')
+        try:
+            fout = open(part, 'xb')
+            break
+        except FileExistsError:
+            continue
+    try:
+        with open(src, 'rb') as fin, fout:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise OSError(errno.ECANCELED, f"Copy of {name} cancelled")
+                chunk = fin.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                src_hash.update(chunk)
+                fout.write(chunk)
+                copied += len(chunk)
+                if progress:
+                    progress(copied, total)
+            fout.flush()
+            os.fsync(fout.fileno())
+            if hasattr(os, 'posix_fadvise'):
+                # Written back by the fsync, so the cached pages can go
+                os.posix_fadvise(fout.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
         
-        # Set media to player
-        self.player.set_media(media)
+        dest_hash = hashlib.blake2b(digest_size=16)
+        with open(part, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                dest_hash.update(chunk)
+        if copied != total or dest_hash.digest() != src_hash.digest():
+            raise OSError(errno.EIO, f"Copy of {name} does not match the original")
         
-        # On Linux, you need to give the ID of the window to embed the video
-        if sys.platform.startswith('linux'):
-            self.player.set_xwindow(self.video_frame.winfo_id())
-        elif sys.platform == "win32":
-            self.player.set_hwnd(self.video_frame.winfo_id())
-        elif sys.platform == "darwin":
-            self.player.set_nsobject(self.video_frame.winfo_id())
+        shutil.copystat(src, part)
+        dest = link_into_place(part, dest_dir, name)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    # Make the rename itself durable before the original goes away
+    try:
+        dir_fd = os.open(os.path.dirname(dest), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except (OSError, AttributeError):
+        pass
+    return dest
+
+
+def move_file(src, dest_dir, progress=None, cancel=None):
+    """Move src into dest_dir, returns the new path
+
+    A rename when both are on the same device, otherwise a verified chunked
+    copy (see copy_verified) followed by removing the original. A file
+    already in dest_dir is never replaced, src gets a numbered name instead.
+    """
+    try:
+        return link_into_place(src, dest_dir, os.path.basename(src))
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    dest = copy_verified(src, dest_dir, progress, cancel)
+    os.remove(src)
+    return dest
+
+
+class DecisionJournal:
+    """Append-only log of triage decisions, replayed after a crash
+
+    Every keep/trash/delete/move decision, folder change and playlist
+    position is appended as one JSON line and flushed straight away, so the
+    log survives the process dying; it is fsynced at most once per
+    JOURNAL_SYNC_INTERVAL. Nothing on disk is touched until the decisions
+    are applied. Decisions are keyed by absolute path, the last one for a
+    path wins. Once the log has JOURNAL_COMPACT_LINES lines and more than
+    half of them are superseded, it is rewritten with just the current
+    state.
+    """
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.decisions = {}  # path -> (action, target), in the order they were decided, for undo
+        self.roots = None  # folders of the library being triaged
+        self.recursive = False
+        self.position = None  # (index, path) last played
+        self._file = None
+        self._last_sync = 0.0
+        self._lines = 0  # lines in the journal file
+    
+    def load(self):
+        """Replay the journal file, returns True if there was one"""
+        if not os.path.exists(self.path):
+            return False
+        torn = False
+        with open(self.path, 'r') as f:
+            for line in f:
+                self._lines += 1
+                try:
+                    self._replay(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # Torn last line from a crash
+                    torn = True
+        if torn:
+            # Written out again, or the next record would be appended to the torn line
+            self.compact()
+        return True
+    
+    def _replay(self, record):
+        op = record['op']
+        if op == 'folder':
+            # Journals from before libraries had several roots only have 'path'
+            self.roots = record.get('roots') or [record['path']]
+            self.recursive = record.get('recursive', False)
+        elif op == 'decide':
+            path = record['path']
+            # Deciding again moves the path to the end
+            self.decisions.pop(path, None)
+            self.decisions[path] = (record['action'], record.get('target'))
+        elif op == 'undo':
+            self.decisions.pop(record['path'], None)
+        elif op == 'position':
+            self.position = (record['index'], record['path'])
+    
+    def _append(self, record):
+        self._replay(record)
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        self._lines += 1
+        if self._lines >= JOURNAL_COMPACT_LINES and self._lines > 2 * (len(self.decisions) + 2):
+            self.compact()
+            return
+        now = time.monotonic()
+        if now - self._last_sync >= JOURNAL_SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+    
+    def open_folder(self, roots, recursive):
+        self._append(self._folder_record(roots, recursive))
+    
+    @staticmethod
+    def _folder_record(roots, recursive):
+        return {'op': 'folder', 'roots': list(roots), 'path': roots[0], 'recursive': recursive}
+    
+    def decide(self, path, action, target=None):
+        """Record a decision: 'keep', 'trash', 'delete' or 'move' (to folder target)"""
+        self._append({'op': 'decide', 'path': path, 'action': action, 'target': target})
+    
+    def undo(self):
+        """Forget the most recent decision, returns its path or None"""
+        path = next(reversed(self.decisions), None)
+        if path is None:
+            return None
+        self._append({'op': 'undo', 'path': path})
+        return path
+    
+    def record_position(self, index, path):
+        if self.position != (index, path):
+            self._append({'op': 'position', 'index': index, 'path': path})
+    
+    def pending(self):
+        """Decisions that change something on disk, as (path, action, target)"""
+        return [(path, action, target) for path, (action, target) in self.decisions.items() if action != 'keep']
+    
+    def counts(self):
+        return collections.Counter(action for action, target in self.decisions.values())
+    
+    def rewrite(self, decisions):
+        """Replace the journal with just the given decisions (e.g. the ones that failed to apply)"""
+        self.decisions = {path: (action, target) for path, action, target in decisions}
+        self.compact()
+    
+    def compact(self):
+        """Replace the journal with the folder, position and decisions it currently holds"""
+        self.close()
+        records = []
+        if self.roots:
+            records.append(self._folder_record(self.roots, self.recursive))
+        if self.position:
+            records.append({'op': 'position', 'index': self.position[0], 'path': self.position[1]})
+        records.extend({'op': 'decide', 'path': path, 'action': action, 'target': target}
+                       for path, (action, target) in self.decisions.items())
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines = len(records)
+    
+    def clear(self):
+        """Everything has been applied, remove the journal"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.decisions = {}
+        self.position = None
+        self._lines = 0
+    
+    def discard(self):
+        """Set the journal aside (kept as .bak) and start empty"""
+        self.close()
+        if os.path.exists(self.path):
+            os.replace(self.path, self.path + '.bak')
+        self.decisions = {}
+        self.roots = None
+        self.position = None
+        self._lines = 0
+    
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+def apply_decisions(decisions, progress=None, on_result=None, cancel=None):
+    """Carry out triage decisions in bulk, returns [(decision, result, error)]
+
+    Operations are grouped by the device they write to: trash/delete by the
+    file's own device, moves by the destination's. Same-device renames run
+    back to back and cross-device copies stream to one disk at a time.
+    progress(done, total) is called after each operation, and
+    on_result(decision, result, error) as soon as it is known. Setting the
+    cancel event stops the copy under way and leaves the rest undone.
+    """
+    devices = {}
+    
+    def device_of(path):
+        folder = os.path.dirname(path) if os.path.isfile(path) else path
+        if folder not in devices:
+            try:
+                devices[folder] = os.stat(folder).st_dev
+            except OSError:
+                devices[folder] = -1
+        return devices[folder]
+    
+    def group_key(decision):
+        path, action, target = decision
+        if action == 'move':
+            # Renames (same device) before copies
+            return (device_of(target), device_of(target) != device_of(path), target, path)
+        return (device_of(path), False, action, path)
+    
+    results = []
+    ordered = sorted(decisions, key=group_key)
+    for done, decision in enumerate(ordered, 1):
+        if cancel is not None and cancel.is_set():
+            break
+        path, action, target = decision
+        try:
+            if action == 'trash':
+                result = move_to_trash(path)
+            elif action == 'delete':
+                result = os.remove(path)
+            elif action == 'move':
+                result = move_file(path, target, cancel=cancel)
+            else:
+                raise ValueError(f"Unknown action {action}")
+            results.append((decision, result, None))
+        except Exception as e:
+            results.append((decision, None, e))
+        if on_result:
+            on_result(*results[-1])
+        if progress:
+            progress(done, len(ordered))
+    return results
+
+
+class Metrics:
+    """Latency histograms, counters and gauges, dumped as JSON or Prometheus text
+
+    Histograms have fixed buckets, so an observation is a bisect and a few
+    additions under a lock; workers may record from any thread. Code that
+    records checks `if metrics:` first and metrics is None when they are
+    off, so a disabled hot path pays a single truth test.
+    """
+    PREFIX = "video_sorter_"
+    # name -> (help text, buckets)
+    HISTOGRAMS = {
+        'switch_seconds': ("Time from asking for a video to VLC reporting it playing", METRIC_LATENCY_BUCKETS),
+        'switch_step_seconds': ("Tk thread time spent in each step of a switch", METRIC_LATENCY_BUCKETS),
+        'first_frame_seconds': ("Time from asking for a video to its first frame being shown", METRIC_LATENCY_BUCKETS),
+        'event_delay_seconds': ("Time a VLC event waited before the Tk thread handled it", METRIC_LATENCY_BUCKETS),
+        'tk_stall_seconds': ("How late the Tk loop ran a periodic timer, i.e. how long it was blocked", METRIC_LATENCY_BUCKETS),
+        'ui_queue_drain_seconds': ("Tk thread time spent running callbacks posted by workers", METRIC_LATENCY_BUCKETS),
+        'scan_seconds': ("Time to list a folder, by stage (first match, listed)", METRIC_LATENCY_BUCKETS),
+        'file_op_seconds': ("Time a background file operation took", METRIC_LATENCY_BUCKETS),
+        'file_op_queue_depth': ("Operations waiting in a file worker's queue when one is added", METRIC_DEPTH_BUCKETS),
+    }
+    COUNTERS = {
+        'scan_files_total': "Video files found by folder scans",
+        'switches_total': "Video switches, by kind (cold or prerolled)",
+    }
+    GAUGES = {
+        'scan_files_per_second': "Throughput of the last finished folder scan",
+        'file_op_pending': "Operations queued or running in a file worker",
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> [bucket counts..., overflow count, sum]
+        self.counters = collections.Counter()  # (name, labels) -> total
+        self.gauges = {}  # (name, labels) -> value
+    
+    def observe(self, name, value, **labels):
+        buckets = self.HISTOGRAMS[name][1]
+        i = bisect.bisect_left(buckets, value)
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            counts = self.histograms.get(key)
+            if counts is None:
+                counts = self.histograms[key] = [0] * (len(buckets) + 2)
+            counts[i] += 1
+            counts[-1] += value
+    
+    def count(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+    
+    def set_gauge(self, name, value, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+    
+    def quantile(self, name, q, **labels):
+        """Upper bound of the bucket holding the q-quantile, None without observations
+
+        Labels given must match, histograms with other labels are added in.
+        """
+        buckets = self.HISTOGRAMS[name][1]
+        total = [0] * (len(buckets) + 1)
+        with self.lock:
+            for (key_name, key_labels), counts in self.histograms.items():
+                if key_name == name and all(item in key_labels for item in labels.items()):
+                    total = [a + b for a, b in zip(total, counts)]
+        seen, wanted = 0, q * sum(total)
+        if not wanted:
+            return None
+        for bound, count in zip(buckets + (float('inf'),), total):
+            seen += count
+            if seen >= wanted:
+                return bound
+    
+    def snapshot(self):
+        """Everything recorded so far as plain data (the JSON dump)"""
+        with self.lock:
+            histograms = [{'name': name, 'labels': dict(labels), 'buckets': list(self.HISTOGRAMS[name][1]),
+                           'counts': counts[:-1], 'count': sum(counts[:-1]), 'sum': counts[-1]}
+                          for (name, labels), counts in sorted(self.histograms.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        gauges = [{'name': name, 'labels': dict(labels), 'value': value}
+                  for (name, labels), value in sorted(self.gauges.items())]
+        return {'histograms': histograms, 'counters': counters, 'gauges': gauges}
+    
+    def prometheus(self):
+        """Everything recorded so far in the Prometheus text format"""
+        def series(name, labels, extra=()):
+            items = list(labels) + list(extra)
+            text = ",".join(f'{key}="{value}"' for key, value in items)
+            return f"{self.PREFIX}{name}{{{text}}}" if text else f"{self.PREFIX}{name}"
         
-        # Set volume to match the scale
-        self.player.audio_set_volume(self.volume_scale.get())
+        snapshot = self.snapshot()
+        lines = []
+        described = set()
         
-        # Start playing
-        self.player.play()
+        def describe(name, kind, help_text):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {self.PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {self.PREFIX}{name} {kind}")
         
-        # Setup a timer to restore audio and start timer updates as soon as the player is ready
-        def check_and_restore():
-            # Once media is parsed and playing, restore audio
-            state = self.player.get_state()
-            if state in (vlc.State.Playing, vlc.State.Paused):
-                # Restore audio state after a short delay
-                self.root.after(50, self.restore_audio)
-                # Start updating the timer
-                self.start_time_updates()
+        for histogram in snapshot['histograms']:
+            name, labels = histogram['name'], sorted(histogram['labels'].items())
+            describe(name, 'histogram', self.HISTOGRAMS[name][0])
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'] + ['+Inf'], histogram['counts']):
+                cumulative += count
+                lines.append(f"{series(name + '_bucket', labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{series(name + '_sum', labels)} {histogram['sum']}")
+            lines.append(f"{series(name + '_count', labels)} {histogram['count']}")
+        for counter in snapshot['counters']:
+            describe(counter['name'], 'counter', self.COUNTERS[counter['name']])
+            lines.append(f"{series(counter['name'], sorted(counter['labels'].items()))} {counter['value']}")
+        for gauge in snapshot['gauges']:
+            describe(gauge['name'], 'gauge', self.GAUGES[gauge['name']])
+            lines.append(f"{series(gauge['name'], sorted(gauge['labels'].items()))} {gauge['value']}")
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, path):
+        """Write to path, in Prometheus text for .prom/.txt and JSON otherwise"""
+        if path.endswith(('.prom', '.txt')):
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=1)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class StepTimer:
+    """Times consecutive steps of one operation into a histogram labelled by step"""
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.last = time.perf_counter() if metrics else 0.0
+    
+    def mark(self, step):
+        """The step that started at the previous mark (or creation) is done"""
+        if self.metrics:
+            now = time.perf_counter()
+            self.metrics.observe(self.name, now - self.last, step=step)
+            self.last = now
+
+
+class FileOperations:
+    """Runs file operations one at a time on a background thread
+
+    submit() returns straight away; on_done(result) or on_error(exception)
+    is called on the UI thread through ui_queue.post() once the operation
+    has finished, so a slow or stalled disk never blocks the UI. With
+    metrics set, queue depth and operation times are recorded under name.
+    Long operations can be passed the cancel event, which shutdown() sets
+    when they run past its timeout.
+    """
+    def __init__(self, ui_queue, name="file-ops", metrics=None):
+        self.ui_queue = ui_queue
+        self.name = name
+        self.metrics = metrics
+        self._queue = queue.Queue()
+        self.pending = 0  # Submitted but not finished yet
+        self.cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+    
+    def submit(self, func, *args, on_done=None, on_error=None):
+        """Queue func(*args)"""
+        if self.metrics:
+            self.metrics.observe('file_op_queue_depth', self.pending, queue=self.name)
+            self.metrics.set_gauge('file_op_pending', self.pending + 1, queue=self.name)
+        self.pending += 1
+        self._queue.put((func, args, on_done, on_error))
+    
+    def delete(self, path, **callbacks):
+        self.submit(os.remove, path, **callbacks)
+    
+    def trash(self, path, **callbacks):
+        self.submit(move_to_trash, path, **callbacks)
+    
+    def restore(self, trashed, **callbacks):
+        self.submit(restore_from_trash, trashed, **callbacks)
+    
+    def shutdown(self, timeout=10):
+        """Let queued operations finish, waiting up to timeout seconds, then cancel the rest"""
+        self._queue.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            # A copy cleans up its .part file once it sees this
+            self.cancel.set()
+            self.thread.join(FILE_OPS_CANCEL_TIMEOUT)
+    
+    def _finished(self, callback, value):
+        self.pending -= 1
+        if self.metrics:
+            self.metrics.set_gauge('file_op_pending', self.pending, queue=self.name)
+        if callback:
+            callback(value)
+    
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            func, args, on_done, on_error = job
+            started = time.perf_counter()
+            try:
+                result = func(*args)
+            except Exception as e:
+                self.ui_queue.post(self._finished, on_error, e)
             else:
-                # Check again in 100ms
-                self.root.after(100, check_and_restore)
-                
-        # Start the check timer
-        self.root.after(100, check_and_restore)
-        
-        # Update status
-        self.status_label.config(text=f"Playing {self.current_index+1}/{len(self.video_files)}")
+                self.ui_queue.post(self._finished, on_done, result)
+            if self.metrics:
+                self.metrics.observe('file_op_seconds', time.perf_counter() - started, queue=self.name)
+
+
+class ControlClient:
+    """One connection to the ControlServer"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbox = b''  # Bytes read that do not make a full line yet
+        self.outbox = bytearray()  # Replies and events not sent yet
+        self.pending = collections.deque()  # [requests, replies, is_batch] waiting for the UI thread
+        self.scheduled = False  # A turn is queued on the UI thread
+        self.events = None  # Event names pushed to this client, ALL for every one
+        self.closed = False
+
+
+class ControlServer:
+    """Line protocol server on a Unix socket, for driving the player from scripts
+
+    Every line is a JSON-RPC 2.0 request, {"id": 1, "method": "next",
+    "params": {...}}, or a JSON array of them for a batch. The reply is one
+    line, {"id": 1, "result": ...} or {"id": 1, "error": {...}}, an array
+    for a batch; requests without an id get no reply. Clients can pipeline
+    as many lines as they like: the socket is read on a background thread
+    and each client's requests run in order on the UI thread through
+    ui_queue.post(), in turns of at most CONTROL_TURN_TIME so a flood of
+    commands never holds up the UI. on_turn_start/on_turn_end are called
+    around each turn, so the UI can put off expensive work (e.g. starting
+    playback) until the last command of a burst.
+
+    commands maps method names to functions called with the params as
+    keyword arguments (or positional ones for a list). "subscribe" with
+    {"events": [names]} (every event when left out) has publish()ed events
+    pushed to the client as {"event": name, ...} lines, "unsubscribe" stops
+    them. A client that lets more than CONTROL_MAX_BUFFER bytes pile up is
+    disconnected, as is one that sends that much without a newline.
+    """
+    ALL = 'all'
     
-    def replay_video(self):
-        """Restart the current video from the beginning"""
-        if not self.video_files or self.current_index < 0 or self.current_index >= len(self.video_files):
+    def __init__(self, ui_queue, commands, path=CONTROL_SOCKET, on_turn_start=None, on_turn_end=None):
+        self.ui_queue = ui_queue
+        self.commands = commands
+        self.path = path
+        self.on_turn_start = on_turn_start
+        self.on_turn_end = on_turn_end
+        self.subscribers = []  # Clients with events, only used on the UI thread
+        self._signatures = {}  # method -> inspect.Signature, to tell bad params from errors
+        self._lock = threading.Lock()  # Guards the clients' pending, outbox and closed
+        self._clients = {}  # socket -> ControlClient, server thread only
+        self._stop = threading.Event()
+        self._wakeup_pending = threading.Event()
+        self._read_fd = self._write_fd = None
+        self._listener = None
+        self.thread = threading.Thread(target=self._run, name="control", daemon=True)
+    
+    def start(self):
+        """Bind the socket and start serving, raises OSError if it is in use"""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError(errno.EAFNOSUPPORT, "Unix sockets are not available on this platform")
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            if not stat.S_ISSOCK(mode):
+                raise OSError(errno.EEXIST, "Not a socket, leaving it alone", self.path)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                # Left behind by a process that died
+                os.unlink(self.path)
+            else:
+                raise OSError(errno.EADDRINUSE, "Another instance is listening", self.path)
+            finally:
+                probe.close()
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Anyone who can connect can delete files, so the socket is created owner-only
+        umask = os.umask(0o177)
+        try:
+            self._listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        self._listener.listen(16)
+        self._listener.setblocking(False)
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        self.thread.start()
+    
+    def close(self):
+        """Disconnect everyone and remove the socket"""
+        if self._listener is None:
             return
-        
-        # Stop the player
-        self.player.stop()
-        
-        # Small delay to ensure stop is processed
-        self.root.after(100, self._restart_video)
+        self._stop.set()
+        self._wake()
+        self.thread.join(5)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
     
-    def _restart_video(self):
-        """Helper method to restart video after stop"""
-        # Start playing again
-        self.player.play()
-        
-        # Wait for player to be ready, then seek to beginning (0 seconds)
-        def check_and_seek():
-            state = self.player.get_state()
-            if state in (vlc.State.Playing, vlc.State.Paused):
-                self.player.set_time(0)  # Start from beginning
-                self.start_time_updates()
+    def publish(self, event, **data):
+        """Push an event to the clients subscribed to it (UI thread)"""
+        if not self.subscribers:
+            return
+        line = None
+        for client in self.subscribers:
+            if client.events is self.ALL or event in client.events:
+                if line is None:
+                    line = json.dumps({'event': event, **data}).encode() + b'\n'
+                self._send(client, line)
+    
+    def _wake(self):
+        # Only one wake-up in flight, like UiQueue
+        if not self._wakeup_pending.is_set():
+            self._wakeup_pending.set()
+            try:
+                os.write(self._write_fd, b'x')
+            except OSError:
+                pass
+    
+    def _send(self, client, data):
+        with self._lock:
+            if client.closed:
+                return
+            client.outbox += data
+        self._wake()
+    
+    # Server thread
+    
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ)
+        selector.register(self._read_fd, selectors.EVENT_READ)
+        try:
+            while not self._stop.is_set():
+                for key, mask in selector.select():
+                    if key.fileobj is self._listener:
+                        self._accept(selector)
+                    elif key.fileobj == self._read_fd:
+                        # Empty the pipe before clearing the flag, a wake-up in between then
+                        # writes a new byte instead of being lost (the flush below sends its data)
+                        try:
+                            while os.read(self._read_fd, 4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                        self._wakeup_pending.clear()
+                    else:
+                        client = self._clients.get(key.fileobj)
+                        if client and mask & selectors.EVENT_READ:
+                            self._receive(selector, client)
+                # Replies and events posted since, or that did not fit last time
+                for client in list(self._clients.values()):
+                    self._flush(selector, client)
+        finally:
+            for client in list(self._clients.values()):
+                self._disconnect(selector, client)
+            selector.close()
+            self._listener.close()
+            os.close(self._read_fd)
+            os.close(self._write_fd)
+    
+    def _accept(self, selector):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self._clients[sock] = ControlClient(sock)
+        selector.register(sock, selectors.EVENT_READ)
+    
+    def _disconnect(self, selector, client):
+        with self._lock:
+            client.closed = True
+            client.pending.clear()
+        self._clients.pop(client.sock, None)
+        selector.unregister(client.sock)
+        client.sock.close()
+        if client.events is not None:
+            self.ui_queue.post(self._unsubscribe, client)
+    
+    def _receive(self, selector, client):
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._disconnect(selector, client)
+            return
+        lines = (client.inbox + data).split(b'\n')
+        client.inbox = lines.pop()
+        if len(client.inbox) > CONTROL_MAX_BUFFER:
+            # A line that never ends, drop the client rather than buffer it
+            self._disconnect(selector, client)
+            return
+        entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                entries.append([collections.deque(), [self._error(None, -32700, "Parse error")], False])
+                continue
+            if isinstance(request, list):
+                if request:
+                    entries.append([collections.deque(request), [], True])
+                else:
+                    entries.append([collections.deque(), [self._error(None, -32600, "Empty batch")], False])
             else:
-                self.root.after(100, check_and_seek)
-        
-        self.root.after(100, check_and_seek)
-    
-    def format_time(self, ms):
-        """Format milliseconds to MM:SS format"""
-        seconds = ms // 1000
-        minutes = seconds // 60
-        seconds %= 60
-        return f"{minutes:02d}:{seconds:02d}"
-    
-    def update_time_display(self):
-        """Update the time display"""
-        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
-            current = self.player.get_time()
-            duration = self.player.get_length()
-            
-            if current >= 0 and duration > 0:
-                self.time_label.config(text=f"{self.format_time(current)} / {self.format_time(duration)}")
-            
-            # Schedule next update
-            self.update_timer_id = self.root.after(500, self.update_time_display)
-        elif self.player.get_state() == vlc.State.Ended:
-            # Video ended, check what to do next
-            if self.is_repeat:
-                # Repeat current video
-                self.replay_video()
-            elif self.is_auto_play:
-                # Move to next video automatically
-                if self.is_random:
-                    self.random_video()
+                entries.append([collections.deque([request]), [], False])
+        if not entries:
+            return
+        with self._lock:
+            client.pending.extend(entries)
+            schedule = not client.scheduled
+            client.scheduled = True
+        if schedule:
+            self.ui_queue.post(self._turn, client)
+    
+    def _flush(self, selector, client):
+        with self._lock:
+            if not client.outbox:
+                return
+            if len(client.outbox) > CONTROL_MAX_BUFFER:
+                # Not reading its replies or events, let it go rather than pile up memory
+                overflow = True
+            else:
+                overflow = False
+                try:
+                    sent = client.sock.send(client.outbox)
+                except BlockingIOError:
+                    sent = 0
+                except OSError:
+                    overflow = True
                 else:
-                    self.next_video()
+                    del client.outbox[:sent]
+            waiting = bool(client.outbox)
+        if overflow:
+            self._disconnect(selector, client)
+            return
+        # Wait for room in the socket buffer before trying again
+        selector.modify(client.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0))
+    
+    # UI thread
+    
+    def _turn(self, client):
+        """Run the client's queued requests until they are done or the turn is used up"""
+        deadline = time.perf_counter() + CONTROL_TURN_TIME
+        if self.on_turn_start:
+            self.on_turn_start()
+        try:
+            while True:
+                with self._lock:
+                    if not client.pending:
+                        client.scheduled = False
+                        return
+                    entry = client.pending[0]
+                requests, replies, is_batch = entry
+                while requests:
+                    reply = self._call(client, requests.popleft())
+                    if reply is not None:
+                        replies.append(reply)
+                    if time.perf_counter() >= deadline:
+                        break
+                if not requests:
+                    with self._lock:
+                        if client.pending and client.pending[0] is entry:
+                            client.pending.popleft()
+                    if replies:
+                        reply = replies if is_batch else replies[0]
+                        self._send(client, json.dumps(reply).encode() + b'\n')
+                if time.perf_counter() >= deadline:
+                    # Let Tk catch up, the rest runs in a later turn
+                    self.ui_queue.post(self._turn, client)
+                    return
+        finally:
+            if self.on_turn_end:
+                self.on_turn_end()
+    
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+    
+    def _call(self, client, request):
+        """Run one request, returns the reply or None for a notification
+
+        A request without an id is a notification: it is run, but nothing
+        is sent back, not even an error.
+        """
+        reply = self._dispatch(client, request)
+        if isinstance(request, dict) and 'id' not in request:
+            return None
+        return reply
+    
+    def _dispatch(self, client, request):
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, -32600, "Invalid request")
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params', {})
+        if not isinstance(params, (dict, list)):
+            return self._error(request_id, -32602, "params must be an object or an array")
+        args, kwargs = (params, {}) if isinstance(params, list) else ((), params)
+        try:
+            if method == 'subscribe':
+                result = self._subscribe(client, *args, **kwargs)
+            elif method == 'unsubscribe':
+                result = self._unsubscribe(client)
             else:
-                # Just keep checking for state changes
-                self.update_timer_id = self.root.after(500, self.update_time_display)
-        else:
-            # Check again in case state changes
-            self.update_timer_id = self.root.after(500, self.update_time_display)
-    
-    def start_time_updates(self):
-        """Start updating the time display"""
-        # Cancel any existing timer
-        if self.update_timer_id:
-            self.root.after_cancel(self.update_timer_id)
+                func = self.commands.get(method)
+                if func is None:
+                    return self._error(request_id, -32601, f"Unknown method {method}")
+                signature = self._signatures.get(method)
+                if signature is None:
+                    signature = self._signatures[method] = inspect.signature(func)
+                try:
+                    signature.bind(*args, **kwargs)
+                except TypeError as e:
+                    return self._error(request_id, -32602, str(e))
+                result = func(*args, **kwargs)
+        except Exception as e:
+            return self._error(request_id, -32000, str(e))
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+    
+    def _subscribe(self, client, events=None):
+        client.events = self.ALL if events is None else set(events)
+        if client not in self.subscribers:
+            self.subscribers.append(client)
+        return sorted(client.events) if events is not None else self.ALL
+    
+    def _unsubscribe(self, client):
+        client.events = None
+        if client in self.subscribers:
+            self.subscribers.remove(client)
+        return True
+
+
+class ThumbnailCache:
+    """Contact sheets of videos on disk, least recently used ones evicted past max_bytes
+
+    A sheet is keyed by the file's device, inode, size and mtime, so a
+    renamed file keeps its sheet and a rewritten one gets a new one. Sheets
+    are binary PPM files, which Tk shows without any imaging library. Using
+    a sheet sets its mtime, which is what orders the cache for eviction,
+    also across restarts. Safe to use from several threads.
+    """
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # file name -> size, least recently used first
+        self.total = 0
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.ppm'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(found):
+            self.entries[name] = size
+            self.total += size
+    
+    @staticmethod
+    def key(path):
+        """Cache key of path, raises OSError if it cannot be stat'ed"""
+        st = os.stat(path)
+        return f"{st.st_dev:x}-{st.st_ino:x}-{st.st_size:x}-{st.st_mtime.hex()}"
+    
+    def get(self, key):
+        """Path of the sheet stored under key, or None"""
+        name = key + '.ppm'
+        with self.lock:
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back (another instance evicted it)
+            with self.lock:
+                self.total -= self.entries.pop(name, 0)
+            return None
+        except OSError:
+            pass
+        return path
+    
+    def put(self, key, frames):
+        """Store frames (height x width x 3 uint8 arrays, None for a missing one) as a sheet
+
+        Returns the sheet's path.
+        """
+        width, height = THUMBNAIL_FRAME_SIZE
+        rows = -(-len(frames) // THUMBNAIL_COLUMNS)
+        sheet = np.zeros((rows * height, THUMBNAIL_COLUMNS * width, 3), np.uint8)
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                y, x = divmod(i, THUMBNAIL_COLUMNS)
+                sheet[y * height:(y + 1) * height, x * width:(x + 1) * width] = frame[:height, :width]
+        data = b"P6\n%d %d\n255\n" % (sheet.shape[1], sheet.shape[0]) + sheet.tobytes()
         
-        # Start updating
-        self.update_time_display()
-    
-    def restore_audio(self):
-        # Restore audio to previous state
-        if not self.is_muted:
-            self.player.audio_set_mute(False)
-    
-    def skip_forward(self):
-        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
-            current_time = self.player.get_time()
-            self.player.set_time(current_time + 15000)  # Skip forward 15 seconds
-    
-    def skip_forward_long(self):
-        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
-            current_time = self.player.get_time()
-            self.player.set_time(current_time + 45000)  # Skip forward 45 seconds
-    
-    def skip_backward(self):
-        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
-            current_time = self.player.get_time()
-            # Make sure we don't go below 0
-            new_time = max(0, current_time - 15000)  # Skip backward 15 seconds
-            self.player.set_time(new_time)
-    
-
-    
-    def toggle_fullscreen(self):
-        if not self.is_fullscreen:
-            self.original_geometry = self.root.geometry()
-            self.root.attributes('-fullscreen', True)
-            # Keep control panel visible in fullscreen mode
-            self.is_fullscreen = True
-        else:
-            self.exit_fullscreen()
-    
-    def exit_fullscreen(self):
-        if self.is_fullscreen:
-            self.root.attributes('-fullscreen', False)
-            self.root.geometry(self.original_geometry)
-            self.is_fullscreen = False
-    
-    def toggle_play(self):
-        state = self.player.get_state()
-        if state == vlc.State.Ended:
-            # Video has ended, restart from beginning
-            self.player.stop()
-            self.root.after(100, lambda: self.player.play())
-        elif self.player.is_playing():
-            self.player.pause()
-        else:
-            self.player.play()
-    
-    def toggle_repeat(self):
-        """Toggle repeat mode on/off"""
-        self.is_repeat = not self.is_repeat
-        self.repeat_button.config(text=f"Repeat: {'On' if self.is_repeat else 'Off'}")
-    
-    def toggle_auto_play(self):
-        """Toggle auto play mode on/off"""
-        self.is_auto_play = not self.is_auto_play
-        self.auto_play_button.config(text=f"Auto: {'On' if self.is_auto_play else 'Off'}")
-    
-    def toggle_random(self):
-        """Toggle random mode on/off"""
-        self.is_random = not self.is_random
-        self.random_button.config(text=f"Random: {'On' if self.is_random else 'Off'}")
-    
-    def random_video(self):
-        """Jump to a random video"""
-        if not self.video_files or len(self.video_files) <= 1:
+        name = key + '.ppm'
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total += len(data) - self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            evicted = []
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                old_name, size = self.entries.popitem(last=False)
+                self.total -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old_name))
+            except OSError:
+                pass
+        return path
+
+
+class Library:
+    """Columnar model of the videos in the opened folder, one row per video
+
+    Folder prefixes are interned and stored once, file names are packed into
+    a single buffer, and size, mtime, duration and resolution are NumPy
+    columns, so a row costs well under a hundred bytes instead of a Python
+    string, a dict entry and a metadata dict per path. Rows are never
+    reused: a removed file is only marked gone and a renamed one gets its
+    new name appended, so a row number stays valid for as long as the
+    library lives.
+
+    Paths are found again through a sorted column of 32-bit hashes (rows
+    added since the last sort sit in a small dict); candidates are checked
+    against the real path, so collisions and stale hashes of renamed rows
+    do no harm. Unknown numbers are stored as -1 (NaN for mtime) and never
+    match a filter.
+    """
+    COLUMNS = (
+        ('dir', np.int32), ('name_start', np.uint32), ('name_len', np.uint16), ('hash', np.uint32),
+        ('alive', np.bool_), ('size', np.int64), ('mtime', np.float64), ('duration', np.int32),
+        ('width', np.int16), ('height', np.int16), ('codec', np.int16),
+    )
+    UNKNOWN = {'size': -1, 'mtime': np.nan, 'duration': -1, 'width': -1, 'height': -1, 'codec': -1}
+    # Columns a query can filter or sort on
+    NUMERIC = ('size', 'mtime', 'duration', 'width', 'height')
+    # Probe results past what their column holds are clamped, a broken file can report anything
+    CLAMPED = ('duration', 'width', 'height')
+    
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self._versions = collections.Counter()  # column -> changes so far, for the sort cache
+        self.columns = {name: np.empty(capacity, dtype) for name, dtype in self.COLUMNS}
+        self.dirs = []  # dir id -> folder path with its trailing separator
+        self.dir_ids = {}
+        self.codecs = []  # codec id -> fourcc string
+        self.codec_ids = {}
+        self._names = bytearray()
+        self._sorted_hash = np.empty(0, np.uint32)
+        self._sorted_rows = np.empty(0, np.int32)
+        self._recent = {}  # hash(path) -> row, rows not in the sorted index yet
+        self._sort_cache = {}  # column -> (version, row count, rows ascending with unknown last, number known)
+    
+    def __len__(self):
+        return self.count
+    
+    def column(self, name):
+        """View of a column trimmed to the rows in use"""
+        return self.columns[name][:self.count]
+    
+    def _grow(self, needed):
+        capacity = len(self.columns['dir'])
+        if needed <= capacity:
             return
+        # Grow by half rather than doubling, the slack is paid for in every column
+        capacity = max(needed, capacity + capacity // 2)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+    
+    def trim(self):
+        """Drop the columns' spare capacity and sort waiting rows into the hash index
+
+        Meant for when a scan is done: at a million videos the slack and the
+        dict of recent rows are about a fifth of the library's memory.
+        """
+        for name, column in self.columns.items():
+            if len(column) > self.count:
+                self.columns[name] = column[:self.count].copy()
+        if self._recent:
+            self._reindex()
+    
+    def _check_names(self, added, longest):
+        """Raise OverflowError before name_start or name_len would wrap around"""
+        if len(self._names) + added > np.iinfo(np.uint32).max:
+            raise OverflowError("File names of the library exceed 4 GiB")
+        if longest > np.iinfo(np.uint16).max:
+            raise OverflowError("File name longer than 64 KiB")
+    
+    @staticmethod
+    def _intern(table, ids, value):
+        id_ = ids.get(value)
+        if id_ is None:
+            id_ = ids[value] = len(table)
+            table.append(value)
+        return id_
+    
+    def _reindex(self):
+        hashes = self.column('hash')
+        self._sorted_rows = np.argsort(hashes).astype(np.int32)
+        self._sorted_hash = hashes[self._sorted_rows]
+        self._recent = {}
+    
+    def path(self, row):
+        columns = self.columns
+        start = int(columns['name_start'][row])
+        return self.dirs[columns['dir'][row]] + os.fsdecode(bytes(self._names[start:start + int(columns['name_len'][row])]))
+    
+    def _find(self, path, h):
+        row = self._recent.get(h, -1)
+        if row >= 0 and self.path(row) == path:
+            return row
+        # A numpy scalar, a plain int would make searchsorted cast the whole column
+        h32 = np.uint32(h & 0xFFFFFFFF)
+        i = int(np.searchsorted(self._sorted_hash, h32))
+        while i < len(self._sorted_hash) and self._sorted_hash[i] == h32:
+            row = int(self._sorted_rows[i])
+            if self.path(row) == path:
+                return row
+            i += 1
+        return -1
+    
+    def row_of(self, path):
+        """Row holding path (alive or not), -1 if it was never added"""
+        return self._find(path, hash(path))
+    
+    def add(self, paths):
+        """Rows for paths, adding the new ones and reviving ones that were gone"""
+        paths = list(paths)
+        hashes = [hash(path) for path in paths]
+        # One vectorised search finds the few paths that may be in the sorted index already
+        maybe_sorted = np.zeros(len(paths), np.bool_)
+        if len(self._sorted_hash) and paths:
+            h32 = (np.array(hashes, np.int64) & 0xFFFFFFFF).astype(np.uint32)
+            found = np.minimum(np.searchsorted(self._sorted_hash, h32), len(self._sorted_hash) - 1)
+            maybe_sorted = self._sorted_hash[found] == h32
         
-        import random
-        
-        # Get a random index that's different from current
-        available_indices = [i for i in range(len(self.video_files)) if i != self.current_index]
-        if available_indices:
-            self.current_index = random.choice(available_indices)
-            self.play_current_video()
-    
-    def toggle_mute(self):
-        self.is_muted = not self.is_muted
-        self.player.audio_set_mute(self.is_muted)
-        self.mute_button.config(text="Unmute" if self.is_muted else "Mute")
-    
-    def set_volume(self, value):
-        volume = int(value)
-        self.player.audio_set_volume(volume)
-        self.previous_volume = volume
-    
-    def next_video(self):
-        if not self.video_files:
+        rows = []
+        new = {}  # path -> row, added in this call
+        alive = self.columns['alive']
+        recent = self._recent
+        for path, h, check in zip(paths, hashes, maybe_sorted.tolist()):
+            row = new.get(path, -1)
+            if row < 0 and (check or h in recent):
+                row = self._find(path, h)
+                if row >= 0:
+                    alive[row] = True
+            if row < 0:
+                row = new[path] = self.count + len(new)
+                if recent.setdefault(h, row) != row:
+                    # Another path with the same hash is waiting, sort both into the index
+                    self._append(new)
+                    new = {}
+                    self._reindex()
+                    recent = self._recent
+                    recent[h] = row
+            rows.append(row)
+        self._append(new)
+        if len(self._recent) > max(65536, self.count // 8):
+            self._reindex()
+        return rows
+    
+    def _append(self, new):
+        """Fill in the columns of rows add() handed out, all at once"""
+        if not new:
             return
-        
-        if self.is_random:
-            self.random_video()
+        start, count = self.count, len(new)
+        end = start + count
+        self._grow(end)
+        dirs = []
+        names = []
+        dir_ids = self.dir_ids
+        last_prefix, last_id = None, -1
+        for path in new:
+            cut = path.rfind(os.sep) + 1
+            prefix = path[:cut]
+            if prefix != last_prefix:
+                last_prefix, last_id = prefix, self._intern(self.dirs, dir_ids, prefix)
+            dirs.append(last_id)
+            names.append(os.fsencode(path[cut:]))
+        lengths = np.fromiter(map(len, names), np.int64, count)
+        try:
+            self._check_names(int(lengths.sum()), int(lengths.max()))
+        except OverflowError:
+            # add() has already handed these rows out
+            for path, row in new.items():
+                if self._recent.get(hash(path)) == row:
+                    del self._recent[hash(path)]
+            raise
+        columns = self.columns
+        columns['dir'][start:end] = dirs
+        columns['name_start'][start:end] = len(self._names) + np.cumsum(lengths) - lengths
+        columns['name_len'][start:end] = lengths
+        columns['hash'][start:end] = (np.fromiter(map(hash, new), np.int64, count) & 0xFFFFFFFF)
+        columns['alive'][start:end] = True
+        for name, value in self.UNKNOWN.items():
+            columns[name][start:end] = value
+        self._names += b''.join(names)
+        self.count = end
+    
+    def discard(self, path):
+        """Mark path as gone, returns its row or -1"""
+        row = self.row_of(path)
+        if row >= 0:
+            self.columns['alive'][row] = False
+        return row
+    
+    def discard_files(self, paths):
+        """Mark many paths as gone at once, returns their rows (-1 for unknown ones)"""
+        rows = np.fromiter(map(self.row_of, paths), np.int64)
+        self.columns['alive'][rows[rows >= 0]] = False
+        return rows
+    
+    def rename(self, old, new):
+        """Give the row of old the name new, returns the row or -1 if old is not known"""
+        row = self.row_of(old)
+        if row < 0 or old == new:
+            return row
+        self.discard(new)
+        cut = new.rfind(os.sep) + 1
+        encoded = os.fsencode(new[cut:])
+        self._check_names(len(encoded), len(encoded))
+        columns = self.columns
+        columns['dir'][row] = self._intern(self.dirs, self.dir_ids, new[:cut])
+        columns['name_start'][row] = len(self._names)
+        columns['name_len'][row] = len(encoded)
+        columns['hash'][row] = hash(new) & 0xFFFFFFFF
+        self._names += encoded
+        if self._recent.setdefault(hash(new), row) != row:
+            self._reindex()
+        return row
+    
+    def set_stats(self, rows, sizes, mtimes):
+        self.columns['size'][rows] = sizes
+        self.columns['mtime'][rows] = mtimes
+        self._versions.update(('size', 'mtime'))
+    
+    def set_metadata(self, row, info):
+        columns = self.columns
+        for name in self.CLAMPED:
+            value = info[name]
+            # 0 means unknown for a resolution, not for a duration
+            known = value is not None if name == 'duration' else bool(value)
+            columns[name][row] = min(value, np.iinfo(columns[name].dtype).max) if known and value >= 0 else -1
+        codec = -1
+        if info['codec']:
+            if info['codec'] not in self.codec_ids and len(self.codecs) > np.iinfo(np.int16).max:
+                raise OverflowError("Too many distinct codecs")
+            codec = self._intern(self.codecs, self.codec_ids, info['codec'])
+        columns['codec'][row] = codec
+        self._versions.update(('duration', 'width', 'height'))
+    
+    def metadata(self, row):
+        """Probe result for row in the prober's dict form, None if not probed yet"""
+        columns = self.columns
+        duration = int(columns['duration'][row])
+        width, height, codec = int(columns['width'][row]), int(columns['height'][row]), int(columns['codec'][row])
+        if duration == -1 and width < 0:
+            return None
+        return {'duration': duration, 'width': width if width >= 0 else None,
+                'height': height if height >= 0 else None, 'codec': self.codecs[codec] if codec >= 0 else None}
+    
+    def describe(self, row):
+        """Everything known about row as a dict, None where unknown"""
+        columns = self.columns
+        size, mtime = int(columns['size'][row]), float(columns['mtime'][row])
+        info = self.metadata(row) or {'duration': -1, 'width': None, 'height': None, 'codec': None}
+        return {
+            'path': self.path(row),
+            'size': size if size >= 0 else None,
+            'mtime': mtime if mtime == mtime else None,
+            'duration': info['duration'] / 1000 if info['duration'] >= 0 else None,
+            'width': info['width'], 'height': info['height'], 'codec': info['codec'],
+        }
+    
+    @staticmethod
+    def _unknown(values):
+        return np.isnan(values) if values.dtype.kind == 'f' else values < 0
+    
+    def sorted_rows(self, column):
+        """All rows ascending by column with the unknown ones last, and how many are known
+
+        The argsort is cached until the column changes or rows are added,
+        so repeated queries over most of the library only pay for a mask.
+        """
+        version = self._versions[column]
+        cached = self._sort_cache.get(column)
+        if cached and cached[:2] == (version, self.count):
+            return cached[2:]
+        values = self.column(column)
+        order = np.argsort(values)
+        unknown = self._unknown(values)[order]
+        order = np.concatenate((order[~unknown], order[unknown]))
+        known = len(order) - int(unknown.sum())
+        self._sort_cache[column] = (version, self.count, order, known)
+        return order, known
+    
+    def query(self, filters=(), sort=None, descending=False):
+        """Rows of the videos still there that pass every filter, in the order asked for
+
+        filters are (column, operator, value) with an operator from
+        QUERY_OPERATORS; without sort the rows stay in the order they were
+        added, unknown values sort last either way. Returns a NumPy array
+        of row numbers.
+        """
+        mask = self.column('alive').copy()
+        for column, op, value in filters:
+            values = self.column(column)
+            mask &= QUERY_OPERATORS[op](values, value)
+            if values.dtype.kind != 'f':
+                mask &= values >= 0
+        rows = np.flatnonzero(mask)
+        if not sort:
+            return rows
+        if len(rows) < self.count // 4:
+            # Few matches, sorting just those beats a full sort
+            keys = self.column(sort)[rows]
+            unknown = self._unknown(keys)
+            order = np.argsort(keys[~unknown])
+            if descending:
+                order = order[::-1]
+            return np.concatenate((rows[~unknown][order], rows[unknown]))
+        order, known = self.sorted_rows(sort)
+        if descending:
+            order = np.concatenate((order[known - 1::-1] if known else order[:0], order[known:]))
+        return order[mask[order]]
+
+
+def parse_query(text):
+    """Parse a filter like "size>1G duration<30 newest" into Library.query arguments
+
+    Terms are column, operator and value, e.g. size>=500M, duration<30
+    (seconds, or 90s, 5m, 1h), height>=1080 or age<7 (days), plus one of
+    the sort words newest, oldest, largest, smallest, longest, shortest,
+    or sort:column / sort:-column. Raises ValueError on anything else.
+    """
+    filters = []
+    sort, descending = None, False
+    for term in text.replace(',', ' ').lower().split():
+        if term in QUERY_SORTS:
+            sort, descending = QUERY_SORTS[term]
+            continue
+        if term.startswith('sort:'):
+            sort = term[5:].lstrip('-')
+            descending = term[5:].startswith('-')
+            if sort not in Library.NUMERIC:
+                raise ValueError(f"Cannot sort by {sort}")
+            continue
+        for op in ('>=', '<=', '>', '<', '='):
+            column, found, value = term.partition(op)
+            if found:
+                break
         else:
-            self.current_index = (self.current_index + 1) % len(self.video_files)
-            self.play_current_video()
+            raise ValueError(f"Not a filter: {term}")
+        try:
+            if column == 'size':
+                value = value.rstrip('b')
+                unit = QUERY_UNITS.get(value[-1:], 1)
+                number = float(value[:-1] if unit > 1 else value) * unit
+            elif column == 'duration':
+                scale = {'s': 1, 'm': 60, 'h': 3600}.get(value[-1:], None)
+                number = float(value[:-1] if scale else value) * (scale or 1) * 1000
+            elif column == 'age':
+                # Older than n days is an mtime before now - n days
+                column = 'mtime'
+                op = {'>': '<', '<': '>', '>=': '<=', '<=': '>='}.get(op, op)
+                number = time.time() - float(value) * 86400
+            elif column in ('width', 'height'):
+                number = float(value)
+            else:
+                raise ValueError(f"Unknown column {column}")
+        except (ValueError, IndexError):
+            raise ValueError(f"Bad value in {term}") from None
+        filters.append((column, op, number))
+    return filters, sort, descending
+
+
+class Playlist:
+    """Playback order over the rows of a Library, every navigation step O(1)
+
+    Rows sit in numbered slots that keep their number until the playlist
+    is compacted. Removing a video only marks its slot dead and unlinks it
+    from a doubly linked list of live slots, so removal and sequential
+    next/prev are O(1); a Fenwick tree over the live flags gives a slot's
+    position for the status bar in O(log n).
+
+    Shuffle order is a Fisher-Yates permutation generated lazily, one swap
+    per draw, so nothing is built up front and no video repeats until every
+    one has come up. Videos played in shuffle mode go on a history stack,
+    so back() really goes back. Dead slots are compacted away once they
+    outnumber the live ones, which also starts a new shuffle cycle.
+    """
+    COMPACT_MIN = 1024
+    
+    def __init__(self, library, paths=(), shuffle=False, seed=None):
+        self.library = library
+        self.shuffle = shuffle
+        self.random = random.Random(seed)
+        self._reset()
+        self.extend(paths)
+    
+    def _reset(self):
+        self.rows = array('i')  # slot -> library row, dead slots keep theirs until compaction
+        self._row_slot = array('i')  # library row -> its latest slot, -1 if never added
+        self.alive = bytearray()
+        self._next = array('i')
+        self._prev = array('i')
+        self._tree = array('i', [0])  # Fenwick tree over alive, 1-based
+        self.head = self.tail = -1
+        self.count = 0
+        self.dead = 0
+        self.current = -1
+        self.history = []  # slots played in shuffle mode
+        self.history_pos = -1
+        self._perm = {}  # lazy permutation: position -> slot, only where it is not the identity
+        self._drawn = 0  # positions below this have been drawn in the current cycle
+        self._pending = -1  # next shuffle pick, drawn early by peek_next()
+    
+    def __len__(self):
+        return self.count
+    
+    def __bool__(self):
+        return self.count > 0
+    
+    def __contains__(self, path):
+        return self.slot_of(path) >= 0
+    
+    def __getitem__(self, slot):
+        return self.library.path(self.rows[slot])
+    
+    def __iter__(self):
+        slot = self.head
+        while slot >= 0:
+            yield self[slot]
+            slot = self._next[slot]
+    
+    @property
+    def current_path(self):
+        return self[self.current] if self.current >= 0 else None
+    
+    def slot_of(self, path):
+        return self.slot_of_row(self.library.row_of(path))
+    
+    def slot_of_row(self, row):
+        """Live slot holding a library row, -1 if it is not in the playlist"""
+        if 0 <= row < len(self._row_slot):
+            slot = self._row_slot[row]
+            if slot >= 0 and self.alive[slot]:
+                return slot
+        return -1
     
-    def prev_video(self):
-        if not self.video_files:
+    def extend(self, paths):
+        """Append paths (ones already in the playlist are skipped)"""
+        self.extend_rows(self.library.add(paths))
+    
+    def extend_rows(self, rows):
+        """Append library rows (ones already in the playlist are skipped)"""
+        rows = np.asarray(rows, np.int32)
+        self._cover_library()
+        if self.count and len(rows):
+            slots = np.frombuffer(self._row_slot, np.int32)[rows]
+            alive = np.frombuffer(self.alive, np.uint8)
+            rows = rows[(slots < 0) | (alive[slots] == 0)]
+            del alive  # the arrays cannot grow while NumPy views them
+        if len(rows) > 1:
+            # Repeats keep their first position
+            _, first = np.unique(rows, return_index=True)
+            if len(first) < len(rows):
+                rows = rows[np.sort(first)]
+        self._append_rows(rows)
+    
+    def set_rows(self, rows):
+        """Replace the contents with library rows (no repeats) in the given order"""
+        self._reset()
+        self._cover_library()
+        self._append_rows(np.asarray(rows, np.int32))
+    
+    def _cover_library(self):
+        missing = self.library.count - len(self._row_slot)
+        if missing > 0:
+            self._row_slot.extend(array('i', [-1]) * missing)
+    
+    def _append_rows(self, rows):
+        """Link rows in after the tail, all slot arrays are extended with NumPy in one go"""
+        n = len(rows)
+        if not n:
             return
+        start = len(self.rows)
+        slots = np.arange(start, start + n, dtype=np.int32)
         
-        if self.is_random:
-            self.random_video()
+        # Fenwick node i covers slots (i - lowbit(i), i], only O(log n) of the
+        # new nodes reach back over old slots that may have been removed
+        index = slots.astype(np.int64) + 1
+        low = index - (index & -index)
+        tree = index - np.maximum(low, start)
+        if start:
+            before = self.position(start - 1)
+            for i in np.flatnonzero(low < start):
+                tree[i] += before - (self.position(int(low[i]) - 1) if low[i] else 0)
+        self._tree.frombytes(tree.astype(np.int32).tobytes())
+        
+        self.rows.frombytes(rows.tobytes())
+        self.alive += b'\x01' * n
+        following = slots + 1
+        following[-1] = -1
+        self._next.frombytes(following.tobytes())
+        preceding = slots - 1
+        preceding[0] = self.tail
+        self._prev.frombytes(preceding.tobytes())
+        if self.tail >= 0:
+            self._next[self.tail] = start
         else:
-            self.current_index = (self.current_index - 1) % len(self.video_files)
-            self.play_current_video()
+            self.head = start
+        self.tail = start + n - 1
+        row_slot = np.frombuffer(self._row_slot, np.int32)
+        row_slot[rows] = slots
+        del row_slot
+        self.count += n
     
-    def delete_video(self):
-        if not self.video_files or self.current_index < 0 or self.current_index >= len(self.video_files):
-            return
+    # Fenwick tree over the alive flags
+    
+    def _tree_add(self, slot, delta):
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+    
+    def position(self, slot):
+        """1-based position of a live slot among the live ones"""
+        i = slot + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+    
+    def select(self, position):
+        """Slot at a 1-based position, the last one if position is past the end"""
+        if self.count == 0:
+            return -1
+        position = max(1, min(position, self.count))
+        n = len(self._tree) - 1
+        slot = 0
+        step = 1 << n.bit_length()
+        while step:
+            if slot + step <= n and self._tree[slot + step] < position:
+                slot += step
+                position -= self._tree[slot]
+            step >>= 1
+        return slot
+    
+    # Navigation
+    
+    def jump(self, slot):
+        """Make slot the current video"""
+        if slot == self._pending:
+            self._pending = -1
+        self.current = slot
+        if self.shuffle:
+            # Like a browser, going somewhere new drops the forward history
+            del self.history[self.history_pos + 1:]
+            self.history.append(slot)
+            self.history_pos = len(self.history) - 1
+    
+    def set_shuffle(self, shuffle):
+        self.shuffle = shuffle
+        self._pending = -1
+        if shuffle and self.current >= 0:
+            self.jump(self.current)
+    
+    def set_history(self, slots, position):
+        """Replace the shuffle history (live slots) and the index of the current entry in it"""
+        self.history = list(slots)
+        self.history_pos = min(position, len(self.history) - 1)
+    
+    def _history_forward(self):
+        i = self.history_pos + 1
+        while i < len(self.history) and not self.alive[self.history[i]]:
+            i += 1
+        return i if i < len(self.history) else -1
+    
+    def peek_next(self):
+        """Slot advance() would move to, without moving"""
+        if self.count == 0:
+            return -1
+        if self.shuffle:
+            i = self._history_forward()
+            if i >= 0:
+                return self.history[i]
+            if self._pending < 0 or not self.alive[self._pending] or self._pending == self.current:
+                self._pending = self._draw()
+            return self._pending
+        if self.current < 0:
+            return self.head
+        slot = self._next[self.current]
+        return slot if slot >= 0 else self.head
+    
+    def advance(self):
+        """Move to the next video (sequential or shuffle order), returns its slot"""
+        if self.count == 0:
+            return -1
+        if self.shuffle:
+            i = self._history_forward()
+            if i >= 0:
+                self.history_pos = i
+                self.current = self.history[i]
+                return self.current
+        self.jump(self.peek_next())
+        return self.current
+    
+    def back(self):
+        """Move to the previous video: back through the history in shuffle mode"""
+        if self.count == 0:
+            return -1
+        if self.shuffle:
+            i = self.history_pos - 1
+            while i >= 0 and not self.alive[self.history[i]]:
+                i -= 1
+            if i >= 0:
+                self.history_pos = i
+                self.current = self.history[i]
+            return self.current
+        if self.current < 0:
+            self.current = self.tail
+        else:
+            slot = self._prev[self.current]
+            self.current = slot if slot >= 0 else self.tail
+        return self.current
+    
+    def _draw(self):
+        """Next slot of the lazy shuffle permutation, skipping dead slots and the current one"""
+        while True:
+            n = len(self.rows)
+            if self._drawn >= n:
+                # Every video has come up once, start a new cycle
+                self._perm = {}
+                self._drawn = 0
+            j = self._drawn
+            r = self.random.randrange(j, n)
+            picked = self._perm.get(r, r)
+            self._perm[r] = self._perm.pop(j, j)
+            self._drawn = j + 1
+            if self.alive[picked] and (picked != self.current or self.count == 1):
+                return picked
+    
+    # Changing the contents
+    
+    def remove(self, slot):
+        """Remove a slot, if it is the current one the next video becomes current
+
+        Returns the removed path, or None if the slot was not live.
+        """
+        if slot < 0 or slot >= len(self.rows) or not self.alive[slot]:
+            return None
+        path = self[slot]
+        was_current = slot == self.current
+        was_tail = slot == self.tail
         
-        # Get the current video file
-        video_path = self.video_files[self.current_index]
+        self.alive[slot] = 0
+        prev_slot, next_slot = self._prev[slot], self._next[slot]
+        if prev_slot >= 0:
+            self._next[prev_slot] = next_slot
+        else:
+            self.head = next_slot
+        if next_slot >= 0:
+            self._prev[next_slot] = prev_slot
+        else:
+            self.tail = prev_slot
+        self._tree_add(slot, -1)
+        self.count -= 1
+        self.dead += 1
+        if self._pending == slot:
+            self._pending = -1
         
-        # Stop playback
-        self.player.stop()
+        if was_current:
+            if self.count == 0:
+                self.current = -1
+            elif self.shuffle:
+                self.advance()
+            else:
+                # The removed slot still points at its old neighbours
+                self.current = prev_slot if was_tail else next_slot
+        
+        if self.dead > self.COMPACT_MIN and self.dead > self.count:
+            self.compact()
+        return path
+    
+    def restore(self, slot, path):
+        """Put back a path removed from slot, at its old position if that is still known
+
+        Returns the slot it ended up in.
+        """
+        if path in self:
+            return self.slot_of(path)
+        row = self.library.add([path])[0]
+        if not (0 <= slot < len(self.rows) and self.rows[slot] == row and not self.alive[slot]):
+            # Slot was compacted away, append it instead
+            self.extend_rows([row])
+            return self._row_slot[row]
+        before = self.position(slot - 1) if slot > 0 else 0
+        prev_slot = self.select(before) if before else -1
+        next_slot = self._next[prev_slot] if prev_slot >= 0 else self.head
+        self._prev[slot] = prev_slot
+        self._next[slot] = next_slot
+        if prev_slot >= 0:
+            self._next[prev_slot] = slot
+        else:
+            self.head = slot
+        if next_slot >= 0:
+            self._prev[next_slot] = slot
+        else:
+            self.tail = slot
+        self.alive[slot] = 1
+        self._row_slot[row] = slot
+        self._tree_add(slot, 1)
+        self.count += 1
+        self.dead -= 1
+        return slot
+    
+    def compact(self):
+        """Drop dead slots, renumbering the live ones (starts a new shuffle cycle)"""
+        mapping = array('i', [-1]) * len(self.rows)
+        live = array('i')
+        slot = self.head
+        while slot >= 0:
+            mapping[slot] = len(live)
+            live.append(self.rows[slot])
+            slot = self._next[slot]
+        current = self.current
+        history = self.history
+        history_pos = self.history_pos
         
+        self.set_rows(np.frombuffer(live, np.int32))
+        self.current = mapping[current] if current >= 0 else -1
+        for i, old in enumerate(history):
+            if mapping[old] >= 0:
+                self.history.append(mapping[old])
+                if i <= history_pos:
+                    self.history_pos = len(self.history) - 1
+    
+    def neighbours(self, slot, window):
+        """Paths around slot in playlist order, nearest first"""
+        result = [self[slot]] if slot >= 0 else []
+        after = before = slot
+        for _ in range(window):
+            if after >= 0:
+                after = self._next[after]
+                if after >= 0:
+                    result.append(self[after])
+            if before >= 0:
+                before = self._prev[before]
+                if before >= 0:
+                    result.append(self[before])
+        return result
+
+
+def load_library(roots, index=None, recursive=False):
+    """Library of the videos under the roots, with their sizes, mtimes and cached probe results
+
+    The roots are listed concurrently (see scan_roots). With an index only
+    changed folders are listed and only new files are stat'ed; without one
+    every file is. Files that were never probed keep an unknown duration
+    and resolution.
+    """
+    library = Library()
+    if index is None:
+        rows = library.add(scan_roots(roots, recursive=recursive))
+        stats = []
+        for row in rows:
+            try:
+                st = os.stat(library.path(row))
+            except OSError:
+                continue
+            stats.append((row, st.st_size, st.st_mtime))
+    else:
+        library.add(scan_roots(roots, index, recursive=recursive))
+        stats = []
+        for root in roots:
+            index.fill_missing_stats(root)
+            # The index covers the whole subtree, rows only exist for what the scan yielded
+            stats.extend((row, size, mtime if mtime is not None else np.nan)
+                         for row, size, mtime in ((library.row_of(path), size, mtime)
+                                                  for path, size, mtime in index.file_stats(root)) if row >= 0)
+            for path, info in index.file_metadata(root):
+                row = library.row_of(path)
+                if row >= 0:
+                    library.set_metadata(row, info)
+    if stats:
+        rows, sizes, mtimes = zip(*stats)
+        library.set_stats(np.array(rows, np.int64), np.array(sizes, np.int64), np.array(mtimes, np.float64))
+    library.trim()
+    return library
+
+
+# Command line, every command writes one JSON object per line to stdout
+def emit(record):
+    sys.stdout.write(json.dumps(record) + '\n')
+
+
+def open_index():
+    try:
+        return LibraryIndex()
+    except sqlite3.Error:
+        # Home not writable, go without the index
+        return None
+
+
+def command_scan(args, index):
+    """The videos in the folders as they are found, or with --query the matching ones and their columns"""
+    if not args.query:
+        for path in scan_roots(args.roots, index, recursive=args.recursive):
+            emit({'path': path})
+        return 0
+    library = load_library(args.roots, index, args.recursive)
+    for row in library.query(*args.query).tolist():
+        emit(library.describe(row))
+    return 0
+
+
+def command_stats(args, index):
+    """Totals over the folders, or over the videos matching --query"""
+    library = load_library(args.roots, index, args.recursive)
+    rows = library.query(*(args.query or ((), None, False)))
+    sizes = library.column('size')[rows]
+    durations = library.column('duration')[rows]
+    extensions = collections.Counter(os.path.splitext(library.path(row))[1].lower() for row in rows.tolist())
+    emit({
+        'videos': len(rows),
+        'size': int(sizes[sizes >= 0].sum()),
+        'duration': int(durations[durations >= 0].sum()) / 1000,
+        'unprobed': int((durations < 0).sum()),
+        'extensions': dict(extensions.most_common()),
+    })
+    return 0
+
+
+def command_dupes(args, index):
+    """One line per group of identical videos, most reclaimable space first"""
+    paths = scan_roots(args.roots, index, recursive=args.recursive)
+    for size, group in find_duplicates(paths, index):
+        emit({'size': size, 'paths': group, 'reclaimable': size * (len(group) - 1)})
+    return 0
+
+
+def command_apply(args, index):
+    """Carry out the journaled triage decisions, one line per file"""
+    journal = DecisionJournal(args.journal)
+    if not journal.load():
+        print(f"No journal at {args.journal}", file=sys.stderr)
+        return 1
+    pending = journal.pending()
+    if args.dry_run:
+        for path, action, target in pending:
+            emit({'path': path, 'action': action, 'target': target})
+        return 0
+    
+    failed = []
+    applied = []
+    
+    def on_result(decision, result, error):
+        path, action, target = decision
+        record = {'path': path, 'action': action, 'target': target}
+        if error is not None:
+            record['error'] = str(error)
+            failed.append(decision)
+        else:
+            if action == 'trash':
+                record['trashed'] = result.trashed
+            elif action == 'move':
+                record['destination'] = result
+            applied.append(path)
+        emit(record)
+    
+    apply_decisions(pending, on_result=on_result)
+    if index:
+        index.forget_files(applied)
+    # Keep only what still has to be done
+    if failed:
+        journal.rewrite(failed)
+    else:
+        journal.clear()
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    import argparse
+    parser = argparse.ArgumentParser(prog="video_sorter", description="Minimal video viewer and sorter. "
+                                     "Without a command the player window opens.")
+    parser.add_argument("--dupes", metavar="FOLDER", help="print duplicate videos in FOLDER and the space they take up, without opening a window")
+    parser.add_argument("--recursive", action="store_true", help="include subfolders (with --dupes)")
+    parser.add_argument("--seed", type=int, help="seed for the shuffle order, to get the same order every time")
+    parser.add_argument("--debug", action="store_true", help="print how long the window, libvlc and the first frame take to appear")
+    parser.add_argument("--metrics", metavar="FILE", help="collect switch, scan, file operation and Tk loop latencies and write them to FILE on exit "
+                        "(Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument("--control", metavar="SOCKET", nargs="?", const=CONTROL_SOCKET,
+                        help="let scripts drive the player with JSON-RPC lines on a Unix socket (default %(const)s)")
+    
+    def query(text):
         try:
-            # Delete the file
-            os.remove(video_path)
-            self.status_label.config(text=f"Deleted {os.path.basename(video_path)}")
-            
-            # Remove from our list
-            del self.video_files[self.current_index]
-            
-            # Move to next video or update UI
-            if self.video_files:
-                if self.current_index >= len(self.video_files):
-                    self.current_index = len(self.video_files) - 1
-                self.play_current_video()
-            else:
-                self.status_label.config(text="No videos left")
-                self.root.title("Video File Sorter")
-        except Exception as e:
-            self.status_label.config(text=f"Error: {str(e)}")
+            return parse_query(text)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from e
     
-    def on_close(self):
-        # Cancel any timers
-        if self.update_timer_id:
-            self.root.after_cancel(self.update_timer_id)
-            
-        # Clean up resources
-        self.player.stop()
-        self.root.destroy()
+    folder_options = argparse.ArgumentParser(add_help=False)
+    folder_options.add_argument("folders", metavar="FOLDER", nargs="*", help="folders to go through, listed at the same time")
+    folder_options.add_argument("-p", "--profile", help="also go through the folders of this library profile")
+    folder_options.add_argument("-r", "--recursive", action="store_true", help="include subfolders")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    scan = commands.add_parser("scan", parents=[folder_options], help="list the videos in the FOLDERs")
+    scan.add_argument("--query", type=query, help='only videos matching a filter like "size>1G duration<30 newest", with their sizes and durations')
+    scan.set_defaults(run=command_scan)
+    stats = commands.add_parser("stats", parents=[folder_options], help="count, total size and duration of the videos in the FOLDERs")
+    stats.add_argument("--query", type=query, help="only count the videos matching this filter")
+    stats.set_defaults(run=command_stats)
+    dupes = commands.add_parser("dupes", parents=[folder_options], help="groups of identical videos in the FOLDERs")
+    dupes.set_defaults(run=command_dupes)
+    apply = commands.add_parser("apply", help="carry out the decisions recorded in triage mode")
+    apply.add_argument("--journal", default=JOURNAL_FILE, help="journal file (default %(default)s)")
+    apply.add_argument("--dry-run", action="store_true", help="only list what would be done")
+    apply.set_defaults(run=command_apply)
+    args = parser.parse_args(argv)
+    
+    if args.command:
+        index = open_index()
+        if args.command != "apply":
+            args.roots = list(args.folders)
+            if args.profile:
+                roots = index.profile(args.profile) if index else None
+                if roots is None:
+                    parser.error(f"no library profile named {args.profile!r}")
+                args.roots += roots
+            if not args.roots:
+                parser.error("give at least one FOLDER or --profile")
+        try:
+            return args.run(args, index)
+        except BrokenPipeError:
+            # Reader went away (e.g. piped into head), stop quietly
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    if args.dupes:
+        paths = scan_video_files(args.dupes, recursive=args.recursive)
+        print_duplicate_report(find_duplicates(paths, open_index()))
+        return 0
+    # Only the player needs Tk and libvlc
+    import video_sorter_gui
+    video_sorter_gui.run(seed=args.seed, started=started if args.debug else None, metrics_path=args.metrics,
+                     control_path=args.control)
+    return 0
 
-# Main function to start the application
-def main():
-    root = tk.Tk()
-    app = VideoSorter(root)
-    root.mainloop()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+# Benchmarks for scanning, navigation, deletes and the folder history, no display or libvlc needed
+"""Time the hot paths of video_sorter over synthetic folders of 1k, 100k and 1M files
+
+    python video_sorter_bench.py                      # all sizes, results to bench-<time>.json
+    python video_sorter_bench.py --sizes 1000,100000 --compare bench-old.json
+    xvfb-run python video_sorter_bench.py --gui       # also drive the Tk window
+
+The folders are built once under --workdir and reused by later runs. HOME
+is pointed into the workdir, so the index, journal and trash used here
+never touch the real ones. With --gui the player window is driven through
+load_videos_from_folders, next_video, delete_video and so on, with a
+scripted stand-in for libvlc whose players "open" a file after
+--open-ms and report events from their own thread like libvlc does.
+A last run lists a set of roots spread over fake mounts, each folder
+listing delayed by --listing-ms, to time scan_roots against network shares.
+"""
+import os
+import sys
+import argparse
+import heapq
+import itertools
+import json
+import math
+import platform
+import queue
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import types
+
+# Files per synthetic folder, folders are nested two levels deep
+FILES_PER_DIR = 1000
+DIRS_PER_DIR = 32
+
+# Steps timed per navigation or delete benchmark
+NAV_STEPS = 100000
+DELETE_STEPS = 10000
+TRASH_STEPS = 200
+HISTORY_STEPS = 1000
+GUI_STEPS = 200
+
+# Roots, folders per root and files per folder of the tree spread over fake mounts
+MOUNT_ROOTS = 8
+MOUNT_DIRS = 32
+MOUNT_FILES = 20
+MOUNT_COUNTS = (1, 2, 4, 8)
+
+
+# Scripted stand-in for the vlc module
+
+class FakeEventManager:
+    def __init__(self, instance):
+        self.instance = instance
+        self.callbacks = {}
+    
+    def event_attach(self, event_type, callback, *args):
+        self.callbacks.setdefault(event_type, []).append((callback, args))
+    
+    def event_detach(self, event_type):
+        self.callbacks.pop(event_type, None)
+    
+    def fire(self, event_type, delay=0.0, **values):
+        """Deliver event_type after delay seconds on the instance's event thread"""
+        self.instance.schedule(delay, self._deliver, event_type, values)
+    
+    def _deliver(self, event_type, values):
+        event = types.SimpleNamespace(type=event_type, u=types.SimpleNamespace(**values))
+        for callback, args in list(self.callbacks.get(event_type, ())):
+            callback(event, *args)
+
+
+class FakeMedia:
+    def __init__(self, instance, mrl):
+        self.instance = instance
+        self.mrl = mrl
+        self.options = []
+        self.status = 0
+        self.events = FakeEventManager(instance)
+    
+    def event_manager(self):
+        return self.events
+    
+    def add_option(self, option):
+        self.options.append(option)
+    
+    def parse_with_options(self, flags, timeout):
+        def parsed():
+            self.status = FakeVlc.MediaParsedStatus.done
+            self.events._deliver(FakeVlc.EventType.MediaParsedChanged, {'new_status': self.status})
+        self.instance.schedule(self.instance.script['parse_ms'] / 1000, parsed)
+        return 0
+    
+    def parse_stop(self):
+        pass
+    
+    def get_parsed_status(self):
+        return self.status
+    
+    def get_duration(self):
+        return self.instance.script['length_ms']
+    
+    def tracks_get(self):
+        return []
+    
+    def release(self):
+        pass
+
+
+class FakeMediaPlayer:
+    """Plays nothing: opening takes open_ms, then Playing, LengthChanged and Vout are reported"""
+    def __init__(self, instance):
+        self.instance = instance
+        self.events = FakeEventManager(instance)
+        self.media = None
+        self.state = FakeVlc.State.NothingSpecial
+        self.time = 0
+        self.rate = 1.0
+        self.generation = 0  # Bumped by stop(), events of an older open are dropped
+    
+    def event_manager(self):
+        return self.events
+    
+    def set_media(self, media):
+        self.media = media
+    
+    def set_xwindow(self, window_id):
+        pass
+    
+    set_hwnd = set_nsobject = set_xwindow
+    
+    def play(self):
+        if self.state == FakeVlc.State.Paused:
+            self.state = FakeVlc.State.Playing
+            self.events.fire(FakeVlc.EventType.MediaPlayerPlaying)
+            return 0
+        if self.media is None:
+            return -1
+        generation = self.generation
+        paused = ':start-paused' in self.media.options
+        self.state = FakeVlc.State.Opening
+        
+        def opened():
+            if generation != self.generation:
+                return
+            self.state = FakeVlc.State.Paused if paused else FakeVlc.State.Playing
+            self.events._deliver(FakeVlc.EventType.MediaPlayerPaused if paused else FakeVlc.EventType.MediaPlayerPlaying, {})
+            self.events._deliver(FakeVlc.EventType.MediaPlayerLengthChanged, {'new_length': self.instance.script['length_ms']})
+            self.events._deliver(FakeVlc.EventType.MediaPlayerVout, {'new_count': 1})
+        
+        self.instance.schedule(self.instance.script['open_ms'] / 1000, opened)
+        return 0
+    
+    def stop(self):
+        self.generation += 1
+        self.state = FakeVlc.State.Stopped
+        self.time = 0
+    
+    def pause(self):
+        if self.state == FakeVlc.State.Playing:
+            self.set_pause(1)
+    
+    def set_pause(self, paused):
+        self.state = FakeVlc.State.Paused if paused else FakeVlc.State.Playing
+        self.events.fire(FakeVlc.EventType.MediaPlayerPaused if paused else FakeVlc.EventType.MediaPlayerPlaying)
+    
+    def get_state(self):
+        return self.state
+    
+    def is_playing(self):
+        return self.state == FakeVlc.State.Playing
+    
+    def get_time(self):
+        return self.time
+    
+    def set_time(self, ms):
+        self.time = ms
+    
+    def set_rate(self, rate):
+        self.rate = rate
+        return 0
+    
+    def audio_set_mute(self, muted):
+        pass
+    
+    def audio_set_volume(self, volume):
+        return 0
+
+
+class FakeInstance:
+    """Owns the event thread that delivers every player's and media's events, like libvlc's"""
+    def __init__(self, *args):
+        self.script = FakeVlc.script
+        self._timers = []
+        self._order = itertools.count()
+        self._wakeup = threading.Condition()
+        threading.Thread(target=self._run, name="fake-vlc-events", daemon=True).start()
+    
+    def schedule(self, delay, func, *args):
+        with self._wakeup:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._order), func, args))
+            self._wakeup.notify()
+    
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._timers or self._timers[0][0] > time.monotonic():
+                    self._wakeup.wait(self._timers[0][0] - time.monotonic() if self._timers else None)
+                due, order, func, args = heapq.heappop(self._timers)
+            func(*args)
+    
+    def media_new(self, mrl, *options):
+        return FakeMedia(self, mrl)
+    
+    def media_player_new(self):
+        return FakeMediaPlayer(self)
+
+
+class FakeVlc(types.ModuleType):
+    """The vlc module as far as video_sorter_gui uses it"""
+    script = {'open_ms': 0.0, 'parse_ms': 0.0, 'length_ms': 60000}
+    Instance = FakeInstance
+    EventType = types.SimpleNamespace(**{name: name for name in (
+        'MediaPlayerPlaying', 'MediaPlayerPaused', 'MediaPlayerEndReached', 'MediaPlayerEncounteredError',
+        'MediaPlayerVout', 'MediaPlayerLengthChanged', 'MediaPlayerTimeChanged', 'MediaParsedChanged')})
+    State = types.SimpleNamespace(NothingSpecial=0, Opening=1, Buffering=2, Playing=3, Paused=4,
+                                  Stopped=5, Ended=6, Error=7)
+    MediaParseFlag = types.SimpleNamespace(local=0, network=1)
+    MediaParsedStatus = types.SimpleNamespace(skipped=1, failed=2, timeout=3, done=4)
+    TrackType = types.SimpleNamespace(audio=0, video=1, ext=2)
+
+
+def install_fake_vlc(**script):
+    """Make `import vlc` return the stand-in, with script overriding open_ms etc."""
+    FakeVlc.script = dict(FakeVlc.script, **script)
+    sys.modules['vlc'] = FakeVlc('vlc')
+
+
+# Synthetic folders
+
+def build_tree(workdir, count):
+    """Folder with count empty video files, made once and reused"""
+    root = os.path.join(workdir, f"tree-{count}")
+    marker = os.path.join(root, ".complete")
+    if os.path.exists(marker):
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    extensions = ('.mp4', '.mkv', '.avi', '.webm')
+    for n in range(count):
+        dir_number, i = divmod(n, FILES_PER_DIR)
+        folder = os.path.join(root, f"d{dir_number // DIRS_PER_DIR:03d}", f"d{dir_number % DIRS_PER_DIR:03d}")
+        if i == 0:
+            os.makedirs(folder)
+            # A few files that are not videos, as in a real download folder
+            open(os.path.join(folder, "notes.txt"), 'w').close()
+        os.close(os.open(os.path.join(folder, f"video{n:07d}{extensions[n % len(extensions)]}"), os.O_CREAT | os.O_WRONLY))
+    open(marker, 'w').close()
+    return root
+
+
+def build_mount_tree(workdir):
+    """MOUNT_ROOTS roots of small folders, each root later reported as living on some fake mount"""
+    base = os.path.join(workdir, "mounts")
+    marker = os.path.join(base, ".complete")
+    roots = [os.path.join(base, f"root{r}") for r in range(MOUNT_ROOTS)]
+    if os.path.exists(marker):
+        return roots
+    shutil.rmtree(base, ignore_errors=True)
+    for root in roots:
+        for d in range(MOUNT_DIRS):
+            folder = os.path.join(root, f"d{d:03d}")
+            os.makedirs(folder)
+            for i in range(MOUNT_FILES):
+                os.close(os.open(os.path.join(folder, f"video{i:04d}.mp4"), os.O_CREAT | os.O_WRONLY))
+    open(marker, 'w').close()
+    return roots
+
+
+class DrainQueue:
+    """Stands in for the UiQueue: posted callbacks run on the thread calling run_until"""
+    def __init__(self):
+        self._queue = queue.Queue()
+    
+    def post(self, func, *args):
+        self._queue.put((func, args))
+    
+    def run_until(self, finished, timeout=3600):
+        deadline = time.monotonic() + timeout
+        while not finished():
+            func, args = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            func(*args)
+    
+    def drain(self):
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            func(*args)
+
+
+class Results:
+    def __init__(self):
+        self.records = []
+    
+    def add(self, bench, files, seconds, ops=1, **extra):
+        record = {'bench': bench, 'files': files, 'ops': ops, 'seconds': seconds,
+                  'per_op_us': seconds / ops * 1e6 if ops else None,
+                  'per_second': ops / seconds if seconds > 0 else None}
+        record.update(extra)
+        self.records.append(record)
+        print(f"  {bench:<22} {seconds * 1000:10.1f} ms  {record['per_op_us']:12.2f} us/op  ({ops} ops)", flush=True)
+
+
+# Core benchmarks, the code paths behind the Tk callbacks
+
+def bench_scan(vs, results, tree, files, workdir):
+    """Listing: plain scandir walk, the same split into roots listed concurrently, then the index cold and warm"""
+    started = time.perf_counter()
+    found = sum(1 for _ in vs.scan_video_files(tree, recursive=True))
+    results.add('scan.listing', files, time.perf_counter() - started, found)
+    roots = sorted(entry.path for entry in os.scandir(tree) if entry.is_dir())
+    started = time.perf_counter()
+    found = sum(1 for _ in vs.scan_roots(roots, recursive=True))
+    results.add('scan.roots', files, time.perf_counter() - started, found)
+    
+    db_path = os.path.join(workdir, f"index-{files}.db")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    index = vs.LibraryIndex(db_path)
+    started = time.perf_counter()
+    found = sum(1 for _ in index.scan(tree, recursive=True))
+    results.add('scan.index_cold', files, time.perf_counter() - started, found)
+    started = time.perf_counter()
+    index.fill_missing_stats(tree)
+    results.add('scan.stats_cold', files, time.perf_counter() - started, found)
+    started = time.perf_counter()
+    found = sum(1 for _ in index.scan(tree, recursive=True))
+    results.add('scan.index_warm', files, time.perf_counter() - started, found)
+    return index
+
+
+def bench_mounts(vs, results, roots, latency):
+    """Roots listed one after another, then concurrently with the roots spread over 1, 2, 4 and 8 fake mounts
+
+    Every folder listing is delayed by latency seconds, as on a network
+    share, so the numbers show how much of that wait scan_roots overlaps.
+    """
+    files = MOUNT_ROOTS * MOUNT_DIRS * MOUNT_FILES
+    list_folder, mount_of = vs.list_folder, vs.mount_of
+    
+    def slow_list_folder(path):
+        time.sleep(latency)
+        return list_folder(path)
+    
+    vs.list_folder = slow_list_folder
+    try:
+        started = time.perf_counter()
+        found = sum(sum(1 for _ in vs.scan_video_files(root, recursive=True)) for root in roots)
+        results.add('mounts.serial', files, time.perf_counter() - started, found)
+        for mounts in MOUNT_COUNTS:
+            devices = {os.path.normpath(root): n % mounts for n, root in enumerate(roots)}
+            vs.mount_of = devices.get
+            started = time.perf_counter()
+            found = sum(1 for _ in vs.scan_roots(roots, recursive=True))
+            results.add(f'mounts.{mounts}', files, time.perf_counter() - started, found)
+    finally:
+        vs.list_folder, vs.mount_of = list_folder, mount_of
+
+
+def bench_load(vs, results, tree, files, index):
+    """What load_videos_from_folders does: background scan, batches into the playlist, stats after"""
+    library = vs.Library()
+    playlist = vs.Playlist(library)
+    ui_queue = DrainQueue()
+    first_play = []
+    listed = []
+    
+    def on_batch(paths):
+        playlist.extend(paths)
+        if playlist.current < 0:
+            playlist.advance()
+            first_play.append(time.perf_counter())
+    
+    def on_stats(stats):
+        rows = [library.row_of(path) for path, size, mtime in stats]
+        known = [i for i, row in enumerate(rows) if row >= 0]
+        library.set_stats([rows[i] for i in known], [stats[i][1] for i in known],
+                          [stats[i][2] if stats[i][2] is not None else float('nan') for i in known])
+    
+    def on_done():
+        library.trim()
+        listed.append(time.perf_counter())
+    
+    scanner = vs.FolderScanner(ui_queue, [tree], on_batch, on_done,
+                               index=index, on_stats=on_stats, recursive=True)
+    started = time.perf_counter()
+    scanner.start()
+    ui_queue.run_until(lambda: listed)
+    scanner.thread.join()
+    ui_queue.drain()
+    finished = time.perf_counter()
+    results.add('load.first_play', files, first_play[0] - started)
+    results.add('load.listed', files, listed[0] - started, len(playlist))
+    results.add('load.with_stats', files, finished - started, len(playlist))
+    return library, playlist
+
+
+def bench_navigation(vs, results, files, library, playlist):
+    """next/prev in order and in shuffle mode, per step"""
+    steps = min(NAV_STEPS, files * 2)
+    for name, shuffle, step in (('nav.next', False, playlist.advance), ('nav.prev', False, playlist.back),
+                                ('nav.random', True, playlist.advance), ('nav.random_back', True, playlist.back)):
+        playlist.set_shuffle(shuffle)
+        started = time.perf_counter()
+        for _ in range(steps):
+            step()
+        results.add(name, files, time.perf_counter() - started, steps)
+    playlist.set_shuffle(False)
+    
+    # Playing position for the status bar after every step
+    started = time.perf_counter()
+    for _ in range(steps):
+        playlist.position(playlist.advance())
+    results.add('nav.next_with_position', files, time.perf_counter() - started, steps)
+    
+    # Library queries that become the playlist order
+    filters, sort, descending = vs.parse_query("size>=0 newest")
+    started = time.perf_counter()
+    rows = library.query(filters, sort, descending)
+    results.add('query.filter_sort', files, time.perf_counter() - started, len(rows))
+
+
+def bench_delete(vs, results, tree, files, library, playlist, index):
+    """delete_video on the Tk thread: drop from the playlist, and from the library and index once gone"""
+    steps = min(DELETE_STEPS, files // 2)
+    rng = random.Random(1)
+    picks = [playlist.select(rng.randint(1, len(playlist))) for _ in range(steps)]
+    started = time.perf_counter()
+    removed = []
+    for slot in picks:
+        if playlist.alive[slot]:
+            playlist.jump(slot)
+        path = playlist.remove(slot)
+        if path is not None:
+            removed.append((slot, path))
+    results.add('delete.playlist', files, time.perf_counter() - started, steps)
+    
+    started = time.perf_counter()
+    for _, path in removed[:1000]:
+        library.discard(path)
+        index.forget_file(path)
+    results.add('delete.forget', files, time.perf_counter() - started, min(len(removed), 1000))
+    
+    # Undo puts them all back where they were
+    started = time.perf_counter()
+    for slot, path in reversed(removed):
+        playlist.restore(slot, path)
+    results.add('delete.undo', files, time.perf_counter() - started, len(removed))
+    
+    # The background part: into the trash and back out again, so the folder stays intact
+    paths = [path for slot, path in removed[:TRASH_STEPS]]
+    started = time.perf_counter()
+    trashed = [vs.move_to_trash(path) for path in paths]
+    results.add('delete.trash', files, time.perf_counter() - started, len(paths))
+    for item in trashed:
+        vs.restore_from_trash(item)
+
+
+def bench_history(vs, results, files, index, workdir):
+    """Library profiles: recording opened folders, reading the list and checking it for the dialog"""
+    folders = [os.path.join(workdir, f"history-{i}") for i in range(20)]
+    for folder in folders[:10]:
+        os.makedirs(folder, exist_ok=True)
+    started = time.perf_counter()
+    for i in range(HISTORY_STEPS):
+        folder = folders[i % len(folders)]
+        index.save_profile(folder, [folder])
+    results.add('history.add', files, time.perf_counter() - started, HISTORY_STEPS)
+    started = time.perf_counter()
+    for _ in range(HISTORY_STEPS):
+        recent = [root for name, roots in index.profiles() for root in roots]
+    results.add('history.list', files, time.perf_counter() - started, HISTORY_STEPS)
+    started = time.perf_counter()
+    for _ in range(HISTORY_STEPS // 10):
+        vs.check_paths_exist(recent)
+    results.add('history.check', files, time.perf_counter() - started, HISTORY_STEPS // 10)
+
+
+# The Tk window with the fake libvlc
+
+def pump(root, until, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not until():
+        if time.monotonic() > deadline:
+            raise TimeoutError("window did not get there in time")
+        root.update()
+
+
+def bench_gui(results, tree, files):
+    """Drive VideoSorter's own callbacks, timing each until the player reports Playing"""
+    import tkinter as tk
+    import video_sorter_gui
+    root = tk.Tk()
+    app = video_sorter_gui.VideoSorter(root)
+    started = time.perf_counter()
+    pump(root, lambda: app.player is not None)
+    results.add('gui.vlc_ready', files, time.perf_counter() - started)
+    
+    def playing():
+        return app.playlist.current >= 0 and not app.awaiting_playback
+    
+    # The synthetic folders keep their videos in subfolders
+    if not app.is_recursive:
+        app.toggle_recursive()
+    started = time.perf_counter()
+    app.load_videos_from_folders([tree])
+    pump(root, playing)
+    results.add('gui.first_play', files, time.perf_counter() - started)
+    pump(root, lambda: app.scanner is None, timeout=3600)
+    results.add('gui.load', files, time.perf_counter() - started, len(app.playlist))
+    
+    steps = min(GUI_STEPS, len(app.playlist) // 4)
+    for name, action in (('gui.next_video', app.next_video), ('gui.prev_video', app.prev_video),
+                         ('gui.random_video', app.next_video), ('gui.delete_video', app.delete_video)):
+        if name == 'gui.random_video':
+            app.toggle_random()
+        started = time.perf_counter()
+        for _ in range(steps):
+            action()
+            pump(root, playing)
+        results.add(name, files, time.perf_counter() - started, steps)
+    pump(root, lambda: app.file_ops.pending == 0, timeout=600)
+    
+    # Put the deleted files back for the next run
+    while app.undo_stack:
+        app.undo_delete()
+    pump(root, lambda: app.file_ops.pending == 0, timeout=600)
+    
+    started = time.perf_counter()
+    for i in range(HISTORY_STEPS // 10):
+        folder = tree if i % 2 else os.path.dirname(tree)
+        app.remember_profile(folder, [folder])
+    results.add('gui.remember_profile', files, time.perf_counter() - started, HISTORY_STEPS // 10)
+    app.on_close()
+
+
+# Reporting
+
+def print_scaling(records):
+    """Per-op time for every benchmark across the sizes, with the growth exponent between them"""
+    sizes = sorted({record['files'] for record in records})
+    by_bench = {}
+    for record in records:
+        by_bench.setdefault(record['bench'], {})[record['files']] = record['per_op_us']
+    print(f"\n{'us per op':<24}" + "".join(f"{size:>12}" for size in sizes) + "    growth")
+    for bench, timings in by_bench.items():
+        row = "".join(f"{timings[size]:12.2f}" if size in timings else f"{'':>12}" for size in sizes)
+        points = [(size, timings[size]) for size in sizes if timings.get(size)]
+        growth = ""
+        if len(points) > 1:
+            # 0 is flat per op, 1 means each op gets linearly slower with the folder size
+            (n0, t0), (n1, t1) = points[0], points[-1]
+            growth = f"n^{(math.log(t1) - math.log(t0)) / (math.log(n1) - math.log(n0)):.2f}"
+        print(f"{bench:<24}{row}    {growth}")
+
+
+def compare(records, baseline_path, threshold):
+    """Print benchmarks that got slower than in baseline_path by more than threshold, returns how many"""
+    with open(baseline_path) as f:
+        baseline = {(r['bench'], r['files']): r['per_op_us'] for r in json.load(f)['results']}
+    slower = 0
+    print(f"\nCompared with {baseline_path}:")
+    for record in records:
+        old = baseline.get((record['bench'], record['files']))
+        if not old or not record['per_op_us']:
+            continue
+        ratio = record['per_op_us'] / old
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            slower += 1
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"  {record['bench']:<24}{record['files']:>10}  {ratio:6.2f}x{flag}")
+    return slower
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark video_sorter over synthetic folders")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="folder sizes to run (default %(default)s)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "video_sorter_bench"),
+                        help="where the folders are built and kept between runs (default %(default)s)")
+    parser.add_argument("--output", help="results file (default bench-<date>-<time>.json in the workdir)")
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--gui", action="store_true", help="also drive the Tk window (needs a display)")
+    parser.add_argument("--open-ms", type=float, default=5.0, help="time the fake libvlc takes to open a file")
+    parser.add_argument("--listing-ms", type=float, default=10.0,
+                        help="delay added to each folder listing in the fake mount benchmark")
+    args = parser.parse_args(argv)
+    
+    os.makedirs(args.workdir, exist_ok=True)
+    # Index, journal, session and trash all live under HOME, keep them away from the real ones
+    home = os.path.join(args.workdir, "home")
+    os.makedirs(home, exist_ok=True)
+    os.environ['HOME'] = home
+    os.environ.pop('XDG_DATA_HOME', None)
+    install_fake_vlc(open_ms=args.open_ms)
+    import video_sorter as vs
+    
+    results = Results()
+    for files in [int(size) for size in args.sizes.split(',')]:
+        print(f"{files} files", flush=True)
+        started = time.perf_counter()
+        tree = build_tree(args.workdir, files)
+        print(f"  {'(folder ready)':<22} {(time.perf_counter() - started) * 1000:10.1f} ms", flush=True)
+        index = bench_scan(vs, results, tree, files, args.workdir)
+        library, playlist = bench_load(vs, results, tree, files, index)
+        bench_navigation(vs, results, files, library, playlist)
+        bench_delete(vs, results, tree, files, library, playlist, index)
+        bench_history(vs, results, files, index, args.workdir)
+        if args.gui:
+            bench_gui(results, tree, files)
+    
+    print(f"{MOUNT_ROOTS} roots on fake mounts, {args.listing_ms:g} ms per listing", flush=True)
+    bench_mounts(vs, results, build_mount_tree(args.workdir), args.listing_ms / 1000)
+    
+    print_scaling(results.records)
+    # Not the current directory, which is usually the checkout
+    output = args.output or os.path.join(args.workdir, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    with open(output, 'w') as f:
+        json.dump({
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'fake_vlc': FakeVlc.script,
+            'results': results.records,
+        }, f, indent=1)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        return 1 if compare(results.records, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
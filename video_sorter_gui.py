@@ -0,0 +1,2808 @@
+#!/usr/bin/env python3
+# Tk and libvlc front end, the library, playlist and file operations live in video_sorter
+import os
+import sys
+import collections
+import functools
+import heapq
+import queue
+import sqlite3
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+import numpy as np
+import time
+from video_sorter import (
+    PROGRESS_INTERVAL, LibraryIndex, FolderScanner, FolderWatcher, check_paths_exist,
+    format_size, find_duplicates, find_similar, video_signature, move_file, prefetch_ranges, DecisionJournal, apply_decisions, FileOperations,
+    Library, parse_query, Playlist, Metrics, StepTimer, ThumbnailCache, ControlServer,
+    THUMBNAIL_POSITIONS, THUMBNAIL_FRAME_SIZE, SIMILAR_POSITIONS, SIMILAR_FRAME_SIZE,
+)
+
+# libvlc is imported by VideoSorter.start_vlc once the window is up
+vlc = None
+
+# Where Tk cannot watch a pipe, the Tk thread looks for posted callbacks this often
+UI_QUEUE_POLL_MS = 15
+
+# Background metadata probing
+PROBE_WORKERS = 2
+PROBE_TIMEOUT_MS = 5000
+PROBE_FOCUS_WINDOW = 25  # files either side of the current one probed first
+
+# Last session, resumed on launch
+SESSION_SAVE_INTERVAL = 10.0  # seconds between saves while switching videos
+SESSION_HISTORY = 1000  # shuffle history entries kept
+STALL_CHECK_MS = 100  # Tk loop heartbeat while metrics are collected
+METRICS_OVERLAY_MS = 1000  # refresh of the metrics overlay
+THUMBNAIL_WORKERS = 2  # contact sheets made at the same time, one libvlc player each
+THUMBNAIL_TIMEOUT = 10.0  # seconds a file may take for all its frames
+THUMBNAIL_STALE_ENTRIES = 1024  # outdated queue entries of re-wanted paths tolerated before they are dropped
+GRAB_SEEK_TOLERANCE_MS = 500  # how far before the target a frame may be and still count as the seek's
+GRID_TILE_WIDTH = 200
+GRID_TILE_HEIGHT = 128
+GRID_REFRESH_MS = 500  # how often an open grid looks for playlist changes
+SKIM_POSITIONS = (0.1, 0.3, 0.5, 0.7, 0.9)  # fractions of a video skim mode plays a burst at
+SKIM_BURST_MS = 1500  # wall clock time per burst, at the skim rate
+SKIM_RATES = (1.0, 1.5, 2.0, 3.0, 4.0)
+SKIM_DEFAULT_RATE = 2.0
+SKIM_RATE_WINDOW = 20  # files the files-per-minute readout is averaged over
+
+
+class UiQueue:
+    """Hands callbacks from worker threads over to the Tk thread
+
+    Tk widgets must only be touched from the thread running mainloop, so
+    workers post() a callback and the Tk thread is woken up to run
+    everything queued so far in one go. On Unix the wake-up is a byte
+    written to a pipe that Tk watches, which never blocks the worker; other
+    platforms poll the queue from the Tk thread every UI_QUEUE_POLL_MS.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.metrics = None  # Times each drain when set
+        self._queue = queue.Queue()
+        self._wakeup_pending = threading.Event()
+        self._read_fd = self._write_fd = None
+        if os.name == 'posix' and hasattr(root.tk, 'createfilehandler'):
+            self._read_fd, self._write_fd = os.pipe()
+            os.set_blocking(self._read_fd, False)
+            os.set_blocking(self._write_fd, False)
+            root.tk.createfilehandler(self._read_fd, tk.READABLE, lambda fd, mask: self.drain())
+        else:
+            self.root.after(UI_QUEUE_POLL_MS, self._poll)
+    
+    def post(self, func, *args):
+        """Queue func(*args) to run on the Tk thread (safe from any thread)"""
+        self._queue.put((func, args))
+        # Only one wake-up in flight, bursts of posts share it
+        if not self._wakeup_pending.is_set():
+            self._wakeup_pending.set()
+            self._wake()
+    
+    def _wake(self):
+        if self._write_fd is None:
+            # Picked up by the next _poll
+            return
+        try:
+            os.write(self._write_fd, b'x')
+        except (BlockingIOError, OSError):
+            # Pipe full (a wake-up is pending anyway) or closed
+            pass
+    
+    def _poll(self):
+        if not self._queue.empty():
+            self.drain()
+        try:
+            self.root.after(UI_QUEUE_POLL_MS, self._poll)
+        except tk.TclError:
+            # Window is gone
+            pass
+    
+    def drain(self):
+        """Run all queued callbacks (Tk thread only)"""
+        if self._read_fd is not None:
+            try:
+                os.read(self._read_fd, 4096)
+            except (BlockingIOError, OSError):
+                pass
+        self._wakeup_pending.clear()
+        started = time.perf_counter() if self.metrics else 0.0
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        if self.metrics:
+            self.metrics.observe('ui_queue_drain_seconds', time.perf_counter() - started)
+
+
+class MetadataProber:
+    """Bounded pool of threads that parse files with libvlc to learn their metadata
+
+    Files next to the one being played are probed first (see focus()), the
+    rest of the folder after that. Each result is stored in the LibraryIndex,
+    so a file is only parsed once, and handed to on_result(path, info) on the
+    Tk thread. reset() drops all queued work when the folder changes.
+    """
+    def __init__(self, instance, ui_queue, index, on_result, workers=PROBE_WORKERS, timeout_ms=PROBE_TIMEOUT_MS):
+        self.instance = instance
+        self.ui_queue = ui_queue
+        self.index = index
+        self.on_result = on_result
+        self.timeout_ms = timeout_ms
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = 0  # tie breaker, keeps submission order within a priority
+        self._focus_seq = 0
+        self._generation = 0
+        self._seen = set()  # hashes of paths queued, in progress or done in this generation
+        self._closed = False
+        self._threads = [threading.Thread(target=self._worker, name=f"probe-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+    
+    def _push(self, priority, path):
+        # Caller holds self._cond
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, path))
+    
+    def submit(self, paths):
+        """Queue paths for probing behind anything focused"""
+        with self._cond:
+            for path in paths:
+                if hash(path) not in self._seen:
+                    self._push((0, 0), path)
+            self._cond.notify_all()
+    
+    def focus(self, paths):
+        """Probe paths before anything else, in the order given (nearest first)"""
+        with self._cond:
+            self._focus_seq += 1
+            for distance, path in enumerate(paths):
+                if hash(path) not in self._seen:
+                    # Newer focus wins over older ones, then distance from the current file
+                    self._push((-self._focus_seq, distance), path)
+            self._cond.notify_all()
+    
+    def reset(self):
+        """Drop queued work, results of probes still running are discarded"""
+        with self._cond:
+            self._generation += 1
+            self._heap = []
+            self._seen = set()
+    
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._heap = []
+            self._cond.notify_all()
+    
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    # Skip stale duplicates left behind by an earlier focus
+                    while self._heap and hash(self._heap[0][2]) in self._seen:
+                        heapq.heappop(self._heap)
+                    if self._heap:
+                        break
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = heapq.heappop(self._heap)[2]
+                self._seen.add(hash(path))
+                generation = self._generation
+            
+            try:
+                info = self.index.get_metadata(path)
+                if info is None:
+                    info = self.probe(path)
+                    # A file deleted meanwhile must not come back into the index
+                    if info is not None and os.path.exists(path):
+                        self.index.set_metadata(path, info)
+            except sqlite3.Error:
+                info = None
+            if info is not None:
+                self.ui_queue.post(self._deliver, generation, path, info)
+    
+    def _deliver(self, generation, path, info):
+        # Runs on the Tk thread, results for a previous folder are dropped
+        if generation == self._generation:
+            self.on_result(path, info)
+    
+    def probe(self, path):
+        """Parse path with libvlc, returns an info dict or None on timeout"""
+        media = self.instance.media_new(path)
+        parsed = threading.Event()
+        events = media.event_manager()
+        events.event_attach(vlc.EventType.MediaParsedChanged, lambda e: parsed.set())
+        try:
+            if media.parse_with_options(vlc.MediaParseFlag.local, self.timeout_ms) == -1:
+                return {'duration': -1, 'width': None, 'height': None, 'codec': None}
+            # libvlc enforces the timeout itself, the extra second is only a safety net
+            if not parsed.wait(self.timeout_ms / 1000 + 1):
+                media.parse_stop()
+                return None
+            status = media.get_parsed_status()
+            if status == vlc.MediaParsedStatus.timeout:
+                return None
+            info = {'duration': -1, 'width': None, 'height': None, 'codec': None}
+            if status != vlc.MediaParsedStatus.done:
+                return info
+            info['duration'] = max(media.get_duration(), -1)
+            for track in media.tracks_get() or ():
+                if track.type == vlc.TrackType.video:
+                    info['width'] = track.video.contents.width
+                    info['height'] = track.video.contents.height
+                    info['codec'] = track.codec.to_bytes(4, 'little').decode('ascii', 'replace').strip()
+                    break
+            return info
+        finally:
+            events.event_detach(vlc.EventType.MediaParsedChanged)
+            media.release()
+
+
+class FrameGrabber:
+    """Decodes frames of videos into NumPy arrays through libvlc video callbacks
+
+    libvlc scales every frame to width x height and writes it into our own
+    buffer, so no window or video output is involved. One player, reused
+    for every file; not thread safe, each worker needs its own.
+    """
+    def __init__(self, instance, width, height, timeout=THUMBNAIL_TIMEOUT):
+        self.instance = instance
+        self.timeout = timeout
+        self.buffer = np.zeros((height, width, 4), np.uint8)  # RV32: blue, green, red, padding
+        self.frame = None  # Copy of the last frame shown, RGB
+        self.length = -1  # Duration in ms of the last video grabbed, -1 if unknown
+        self.frames_shown = 0
+        self.shown = threading.Condition()
+        self.player = instance.media_player_new()
+        # libvlc keeps raw pointers to these, they must live as long as the player
+        self._callbacks = (vlc.CallbackDecorators.VideoLockCb(self._lock),
+                           vlc.CallbackDecorators.VideoUnlockCb(self._unlock),
+                           vlc.CallbackDecorators.VideoDisplayCb(self._display))
+        self.player.video_set_callbacks(*self._callbacks, None)
+        self.player.video_set_format("RV32", width, height, width * 4)
+    
+    # The callbacks run on a libvlc decoder thread
+    
+    def _lock(self, opaque, planes):
+        planes[0] = self.buffer.ctypes.data
+        return None
+    
+    def _unlock(self, opaque, picture, planes):
+        pass
+    
+    def _display(self, opaque, picture):
+        with self.shown:
+            self.frame = self.buffer[:, :, 2::-1].copy()
+            self.frames_shown += 1
+            self.shown.notify_all()
+    
+    def _wait_frames(self, count, deadline):
+        """Wait until count frames have been shown, returns the last one or None at the deadline"""
+        with self.shown:
+            while self.frames_shown < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.shown.wait(remaining)
+            return self.frame
+    
+    def _wait_seek(self, seen, target, deadline):
+        """Wait for a frame after the seek to target ms, frames from before it are skipped"""
+        while True:
+            frame = self._wait_frames(seen + 1, deadline)
+            if frame is None or self.player.get_time() >= target - GRAB_SEEK_TOLERANCE_MS:
+                return frame
+            with self.shown:
+                seen = self.frames_shown
+    
+    def grab(self, path, positions):
+        """Frames (height x width x 3 RGB arrays) at positions, given as fractions of the length
+
+        The player is paused after the first frame and every seek is waited
+        out, so a frame still on its way from before the seek is not taken.
+        A frame is None if it was not decoded within the timeout.
+        """
+        media = self.instance.media_new(path)
+        media.add_option(':no-audio')
+        self.player.set_media(media)
+        with self.shown:
+            self.frames_shown = 0
+        deadline = time.monotonic() + self.timeout
+        frames = []
+        try:
+            self.length = -1
+            self.player.play()
+            if self._wait_frames(1, deadline) is None:
+                return [None] * len(positions)
+            self.length = self.player.get_length()
+            if self.length <= 0:
+                return [None] * len(positions)
+            # Paused, the player shows one frame per seek
+            self.player.set_pause(1)
+            for position in positions:
+                target = int(position * self.length)
+                with self.shown:
+                    seen = self.frames_shown
+                self.player.set_time(target)
+                frames.append(self._wait_seek(seen, target, deadline))
+        finally:
+            self.player.stop()
+            media.release()
+        return frames
+    
+    def release(self):
+        self.player.release()
+
+
+class ThumbnailGenerator:
+    """Pool of threads making contact sheets with libvlc, most recently wanted first
+
+    want(paths) puts paths ahead of everything asked for earlier (the grid
+    passes the tiles on screen, then the next screenful), so scrolling
+    away from a page leaves its unfinished tiles for later. Sheets already
+    in the ThumbnailCache are handed back without decoding anything.
+    on_result(path, sheet) runs on the Tk thread, sheet is None if no frame
+    could be taken.
+    """
+    def __init__(self, instance, ui_queue, cache, on_result, workers=THUMBNAIL_WORKERS):
+        self.instance = instance
+        self.ui_queue = ui_queue
+        self.cache = cache
+        self.on_result = on_result
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._want_seq = 0
+        self._queued = {}  # path -> sequence number of its latest heap entry, older ones are stale
+        self._taken = set()  # paths a worker is on right now
+        self._closed = False
+        self._threads = [threading.Thread(target=self._worker, name=f"thumbnails-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+    
+    def want(self, paths):
+        """Make sheets for paths before anything else, in the order given"""
+        with self._cond:
+            self._want_seq += 1
+            for distance, path in enumerate(paths):
+                if path not in self._taken:
+                    self._seq += 1
+                    self._queued[path] = self._seq
+                    heapq.heappush(self._heap, ((-self._want_seq, distance), self._seq, path))
+            if len(self._heap) > 2 * len(self._queued) + THUMBNAIL_STALE_ENTRIES:
+                # Scrolling back and forth wants the same paths over and over
+                self._heap = [entry for entry in self._heap if self._queued.get(entry[2]) == entry[1]]
+                heapq.heapify(self._heap)
+            self._cond.notify_all()
+    
+    def reset(self):
+        """Drop queued work, e.g. because another folder was opened"""
+        with self._cond:
+            self._heap = []
+            self._queued = {}
+    
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._heap = []
+            self._cond.notify_all()
+    
+    def _worker(self):
+        grabber = None
+        while True:
+            with self._cond:
+                while not self._closed:
+                    # Skip entries of paths wanted again since
+                    while self._heap and self._queued.get(self._heap[0][2]) != self._heap[0][1]:
+                        heapq.heappop(self._heap)
+                    if self._heap:
+                        break
+                    self._cond.wait()
+                if self._closed:
+                    break
+                path = heapq.heappop(self._heap)[2]
+                del self._queued[path]
+                self._taken.add(path)
+            
+            sheet = None
+            try:
+                key = self.cache.key(path)
+                sheet = self.cache.get(key)
+                if sheet is None:
+                    if grabber is None:
+                        grabber = FrameGrabber(self.instance, *THUMBNAIL_FRAME_SIZE)
+                    frames = grabber.grab(path, THUMBNAIL_POSITIONS)
+                    if any(frame is not None for frame in frames):
+                        sheet = self.cache.put(key, frames)
+            except OSError:
+                pass
+            with self._cond:
+                self._taken.discard(path)
+            self.ui_queue.post(self.on_result, path, sheet)
+        if grabber is not None:
+            grabber.release()
+
+
+class ThumbnailGrid:
+    """Window showing the playlist as contact sheet tiles
+
+    Only the rows on screen exist as canvas items, scrolling draws them
+    again from the playlist, so a folder of 100k videos scrolls as smoothly
+    as a small one. Click selects (Ctrl toggles, Shift extends), Delete,
+    Shift+Delete and the number keys act on the whole selection, and a
+    double click plays the video in the main window.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Video File Sorter - Grid")
+        self.window.geometry("860x600")
+        self.status = tk.Label(self.window, anchor=tk.W)
+        self.status.pack(fill=tk.X, side=tk.BOTTOM)
+        self.scrollbar = tk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(fill=tk.Y, side=tk.RIGHT)
+        self.canvas = tk.Canvas(self.window, bg="#202020", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.top_row = 0
+        self.columns = 1
+        self.rows_visible = 1  # Including the partly visible last row
+        self.shown = None  # Paths of the tiles drawn last time
+        self.images = {}  # path -> PhotoImage of a tile on screen
+        self.sheets = {}  # path -> contact sheet file, None if none could be made
+        self.selected = set()  # paths
+        self.anchor = None  # Position of the last click, start of a Shift+click range
+        
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<Button-1>", lambda e: self.on_click(e, toggle=False, extend=False))
+        self.canvas.bind("<Control-Button-1>", lambda e: self.on_click(e, toggle=True, extend=False))
+        self.canvas.bind("<Shift-Button-1>", lambda e: self.on_click(e, toggle=False, extend=True))
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_rows(-1 if e.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_rows(-1))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_rows(1))
+        self.window.bind("<Up>", lambda e: self.scroll_rows(-1))
+        self.window.bind("<Down>", lambda e: self.scroll_rows(1))
+        self.window.bind("<Prior>", lambda e: self.scroll_rows(-max(1, self.rows_visible - 1)))
+        self.window.bind("<Next>", lambda e: self.scroll_rows(max(1, self.rows_visible - 1)))
+        self.window.bind("<Home>", lambda e: self.scroll_rows(-len(self.app.playlist)))
+        self.window.bind("<End>", lambda e: self.scroll_rows(len(self.app.playlist)))
+        self.window.bind("<Control-a>", lambda e: self.select_all())
+        self.window.bind("<Delete>", lambda e: self.delete_selected())
+        self.window.bind("<Shift-Delete>", lambda e: self.delete_selected(permanent=True))
+        self.window.bind("<Escape>", lambda e: self.close())
+        for slot in range(1, 10):
+            self.window.bind(str(slot), lambda e, slot=slot: self.move_selected(slot))
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.canvas.focus_set()
+        self.refresh()
+    
+    def close(self):
+        self.window.destroy()
+        self.app.grid = None
+    
+    def on_resize(self, event):
+        self.columns = max(1, event.width // GRID_TILE_WIDTH)
+        self.rows_visible = event.height // GRID_TILE_HEIGHT + 1
+        self.draw(force=True)
+    
+    def refresh(self):
+        """Pick up playlist changes (scans, deletes, filters), cheap if nothing changed"""
+        if self.app.grid is not self:
+            return
+        self.draw()
+        self.window.after(GRID_REFRESH_MS, self.refresh)
+    
+    def total_rows(self):
+        return -(-len(self.app.playlist) // self.columns)
+    
+    def paths_at(self, first, last):
+        """Paths at 0-based playlist positions first to last (exclusive)"""
+        playlist = self.app.playlist
+        last = min(last, len(playlist))
+        return [playlist[playlist.select(position + 1)] for position in range(first, last)]
+    
+    def scroll_rows(self, rows):
+        self.top_row += rows
+        self.draw()
+    
+    def on_scrollbar(self, command, value, units=None):
+        if command == 'moveto':
+            self.top_row = int(float(value) * self.total_rows())
+        elif units == 'pages':
+            self.top_row += int(value) * max(1, self.rows_visible - 1)
+        else:
+            self.top_row += int(value)
+        self.draw()
+    
+    def draw(self, force=False):
+        """Draw the rows on screen, the rest of the playlist has no widgets at all"""
+        total_rows = self.total_rows()
+        full_rows = max(1, self.rows_visible - 1)
+        self.top_row = max(0, min(self.top_row, total_rows - full_rows))
+        first = self.top_row * self.columns
+        paths = self.paths_at(first, first + self.rows_visible * self.columns)
+        if total_rows:
+            self.scrollbar.set(self.top_row / total_rows, min(1.0, (self.top_row + full_rows) / total_rows))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.status.config(text=f"{len(self.app.playlist)} videos, {len(self.selected)} selected"
+                                " - Delete, Shift+Delete or 1-9 act on the selection")
+        if paths == self.shown and not force:
+            return
+        self.shown = paths
+        
+        # Keep the images of tiles still on screen, drop the others
+        images = {}
+        self.canvas.delete('all')
+        for i, path in enumerate(paths):
+            row, column = divmod(i, self.columns)
+            x, y = column * GRID_TILE_WIDTH, row * GRID_TILE_HEIGHT
+            if path in self.selected:
+                self.canvas.create_rectangle(x + 1, y + 1, x + GRID_TILE_WIDTH - 1, y + GRID_TILE_HEIGHT - 1,
+                                             outline="#4a90e2", width=3)
+            image = self.images.get(path) or self.load_image(path)
+            if image:
+                images[path] = image
+                self.canvas.create_image(x + 4, y + 4, image=image, anchor=tk.NW)
+            else:
+                width, height = THUMBNAIL_FRAME_SIZE
+                self.canvas.create_rectangle(x + 4, y + 4, x + 4 + 2 * width, y + 4 + 2 * height,
+                                             fill="#303030", outline="")
+            self.canvas.create_text(x + 4, y + GRID_TILE_HEIGHT - 16, anchor=tk.NW, fill="#e0e0e0",
+                                    text=os.path.basename(path)[:30])
+        self.images = images
+        
+        # Tiles on screen first, then the next screenful so scrolling down finds them ready
+        upcoming = self.paths_at(first + len(paths), first + 2 * len(paths))
+        wanted = [path for path in paths + upcoming if path not in self.sheets]
+        if wanted and self.app.thumbnails:
+            self.app.thumbnails.want(wanted)
+    
+    def load_image(self, path):
+        sheet = self.sheets.get(path)
+        if not sheet:
+            return None
+        try:
+            return tk.PhotoImage(file=sheet)
+        except tk.TclError:
+            return None
+    
+    def on_thumbnail(self, path, sheet):
+        self.sheets[path] = sheet
+        if self.shown and path in self.shown:
+            self.images.pop(path, None)
+            self.draw(force=True)
+    
+    def position_at(self, event):
+        """0-based playlist position of the tile under the mouse, or -1"""
+        column = event.x // GRID_TILE_WIDTH
+        position = (self.top_row + event.y // GRID_TILE_HEIGHT) * self.columns + column
+        if column >= self.columns or position >= len(self.app.playlist):
+            return -1
+        return position
+    
+    def on_click(self, event, toggle, extend):
+        self.canvas.focus_set()
+        position = self.position_at(event)
+        if position < 0:
+            return
+        if extend and self.anchor is not None:
+            first, last = sorted((self.anchor, position))
+            self.selected.update(self.paths_at(first, last + 1))
+        else:
+            path = self.paths_at(position, position + 1)[0]
+            if not toggle:
+                self.selected.clear()
+            self.selected ^= {path}
+            self.anchor = position
+        self.draw(force=True)
+    
+    def on_double_click(self, event):
+        position = self.position_at(event)
+        if position >= 0:
+            playlist = self.app.playlist
+            playlist.jump(playlist.select(position + 1))
+            self.app.play_current_video()
+    
+    def select_all(self):
+        self.selected = set(self.app.playlist)
+        self.draw(force=True)
+    
+    def take_selection(self):
+        """Selected paths in playlist order, clearing the selection"""
+        playlist = self.app.playlist
+        paths = sorted((path for path in self.selected if path in playlist),
+                       key=lambda path: playlist.position(playlist.slot_of(path)))
+        self.selected.clear()
+        self.anchor = None
+        return paths
+    
+    def delete_selected(self, permanent=False):
+        paths = self.take_selection()
+        if paths:
+            self.app.delete_videos(paths, permanent=permanent)
+            self.draw(force=True)
+    
+    def move_selected(self, slot):
+        paths = self.take_selection()
+        if paths:
+            self.app.move_videos(paths, slot)
+            self.draw(force=True)
+
+
+class VideoSorter:
+    def __init__(self, root, seed=None, started=None, metrics_path=None, control_path=None):
+        self.root = root
+        self.root.title("Video File Sorter")
+        self.root.geometry("800x600")
+        
+        # Startup timings are printed when started (a perf_counter value) is given
+        self.started = started
+        
+        # Latency histograms, only collected with --metrics or while the overlay ('i') is shown
+        self.metrics = Metrics() if metrics_path else None
+        self.metrics_path = metrics_path
+        self.metrics_overlay = None
+        
+        # Scripts drive the player through this socket with --control
+        self.control = None
+        self.defer_playback = False  # Set while a burst of control commands runs
+        self.playback_pending = False  # A deferred switch still has to start its video
+        
+        # VLC instance and players, created in the background by start_vlc so
+        # the window does not wait for libvlc. The second player keeps the
+        # likely next video opened and paused, ready to swap in
+        self.instance = None
+        self.player = None
+        self.standby_player = None
+        self.preroll_path = None  # Video loaded in the standby player
+        self.preroll_ready = False  # Standby player has reached its first frame
+        self.standby_busy = False  # Standby player is being stopped in the background
+        self.awaiting_playback = False  # A switch or restart is waiting for the Playing event
+        self.switch_started = None
+        self.switch_kind = None  # 'cold' or 'preroll', labels the switch metrics
+        self.frame_pending = None  # Switch start, until the new video's first frame is shown
+        self.switch_times = collections.deque(maxlen=100)  # Recent switch latencies in ms
+        self.is_fullscreen = False
+        self.is_muted = False
+        self.previous_volume = 70  # Default volume
+        self.is_repeat = False  # Repeat mode flag
+        self.is_auto_play = False  # Auto play mode flag
+        self.is_random = False  # Random mode flag
+        self.shuffle_seed = seed  # Fixed seed makes the shuffle order repeatable
+        self.is_recursive = False  # Scan subfolders too
+        self.is_triage = False  # Decisions are journaled instead of carried out
+        self.is_skimming = False  # Short bursts at SKIM_POSITIONS of each video, then the next one
+        self.skim_rate = SKIM_DEFAULT_RATE
+        self.skim_step = 0  # Index into SKIM_POSITIONS of the burst playing
+        self.skim_timer = None  # after() id of the end of the burst
+        self.skim_prefetched = None  # Last video whose skim points were read ahead
+        self.skim_finished = collections.deque(maxlen=SKIM_RATE_WINDOW)  # monotonic times files were done
+        self.resume_path = None  # Video to jump to once the scan finds it (journal or session recovery)
+        self.resume_position = None  # 0-based playlist position to fall back on if it is gone
+        self.resume_time = None  # (path, ms) to seek to once that video plays
+        self.resume_order = None  # Saved playlist order, applied when the scan is done
+        self.resume_history = None  # (paths, position) of the saved shuffle history
+        self.session_saved = 0.0
+        self.journal = DecisionJournal()
+        
+        # Results from worker threads are handed to the Tk thread through this
+        self.ui_queue = UiQueue(root)
+        
+        # Create a frame for embedding the video
+        self.video_frame = tk.Frame(root, bg="black")
+        self.video_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # One surface per player stacked on top of each other, the active one is raised
+        self.video_surfaces = []
+        for _ in range(2):
+            surface = tk.Frame(self.video_frame, bg="black")
+            surface.place(relx=0, rely=0, relwidth=1, relheight=1)
+            self.video_surfaces.append(surface)
+        self.active_surface = 0
+        self.video_surfaces[self.active_surface].tkraise()
+        
+        # Playback position as last reported by VLC, drives the time display
+        self.current_time = 0
+        self.current_length = 0
+        self.last_reported_second = {}  # player -> last second forwarded to the Tk thread
+        
+        # Control panel at the bottom
+        self.control_panel = tk.Frame(root, height=80)  # Increased height for 3 rows
+        self.control_panel.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        # Create buttons - first row (playback controls)
+        button_frame1 = tk.Frame(self.control_panel)
+        button_frame1.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
+        
+        self.play_pause_button = tk.Button(button_frame1, text="Play/Pause", command=self.toggle_play)
+        self.play_pause_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.replay_button = tk.Button(button_frame1, text="Replay", command=self.replay_video)
+        self.replay_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.skip_back_button = tk.Button(button_frame1, text="<< 15s", command=self.skip_backward)
+        self.skip_back_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.skip_forward_button = tk.Button(button_frame1, text="15s >>", command=self.skip_forward)
+        self.skip_forward_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.skip_forward_long_button = tk.Button(button_frame1, text="45s >>", command=self.skip_forward_long)
+        self.skip_forward_long_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Second row (navigation and mode buttons)
+        button_frame2 = tk.Frame(self.control_panel)
+        button_frame2.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
+        
+        self.prev_button = tk.Button(button_frame2, text="Previous", command=self.prev_video)
+        self.prev_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.next_button = tk.Button(button_frame2, text="Next", command=self.next_video)
+        self.next_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.repeat_button = tk.Button(button_frame2, text="Repeat: Off", command=self.toggle_repeat)
+        self.repeat_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.auto_play_button = tk.Button(button_frame2, text="Auto: Off", command=self.toggle_auto_play)
+        self.auto_play_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.random_button = tk.Button(button_frame2, text="Random: Off", command=self.toggle_random)
+        self.random_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.duplicates_button = tk.Button(button_frame2, text="Duplicates", command=self.find_duplicates)
+        self.duplicates_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.similar_button = tk.Button(button_frame2, text="Similar", command=self.find_similar_videos)
+        self.similar_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.filter_button = tk.Button(button_frame2, text="Filter", command=self.filter_videos)
+        self.filter_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.grid_button = tk.Button(button_frame2, text="Grid", command=self.open_grid)
+        self.grid_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Third row (file operations and system buttons)
+        button_frame3 = tk.Frame(self.control_panel)
+        button_frame3.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
+        
+        self.delete_button = tk.Button(button_frame3, text="Delete", command=self.delete_video)
+        self.delete_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.undo_button = tk.Button(button_frame3, text="Undo", command=self.undo_delete)
+        self.undo_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.fullscreen_button = tk.Button(button_frame3, text="Fullscreen", command=self.toggle_fullscreen)
+        self.fullscreen_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Add folder selection button
+        self.select_folder_button = tk.Button(button_frame3, text="Select Folder", command=self.select_folder)
+        self.select_folder_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.recursive_button = tk.Button(button_frame3, text="Subfolders: Off", command=self.toggle_recursive)
+        self.recursive_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.triage_button = tk.Button(button_frame3, text="Triage: Off", command=self.toggle_triage)
+        self.triage_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.skim_button = tk.Button(button_frame3, text="Skim: Off", command=self.toggle_skim)
+        self.skim_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.apply_button = tk.Button(button_frame3, text="Apply", command=self.apply_triage)
+        self.apply_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Add exit button
+        self.exit_button = tk.Button(button_frame3, text="Exit", command=self.on_close, bg="#ffcccc")
+        self.exit_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Fourth row with volume controls
+        volume_frame = tk.Frame(self.control_panel)
+        volume_frame.pack(fill=tk.X, side=tk.TOP, padx=5, pady=2)
+        
+        self.mute_button = tk.Button(volume_frame, text="Mute", command=self.toggle_mute, width=5)
+        self.mute_button.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        volume_label = tk.Label(volume_frame, text="Volume:")
+        volume_label.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        self.volume_scale = tk.Scale(volume_frame, from_=0, to=100, orient=tk.HORIZONTAL, 
+                                     command=self.set_volume, length=200)
+        self.volume_scale.set(70)  # Default volume level
+        self.volume_scale.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Add timer label in volume frame
+        self.time_label = tk.Label(volume_frame, text="00:00 / 00:00", 
+                                  fg="black", bg="#dddddd", padx=5, pady=2,
+                                  font=("Arial", 10), relief=tk.GROOVE)
+        self.time_label.pack(side=tk.LEFT, padx=10, pady=2)
+        
+        # Progress of moves into the number key buckets
+        self.bucket_label = tk.Label(volume_frame, text="")
+        self.bucket_label.pack(side=tk.LEFT, padx=5, pady=2)
+        
+        # Status label
+        self.status_label = tk.Label(volume_frame, text="No folder selected")
+        self.status_label.pack(side=tk.RIGHT, padx=10, pady=2)
+        
+        # Videos of the folder, and the order they are played in
+        self.library = Library()
+        self.playlist = Playlist(self.library, seed=seed)
+        self.query_text = ""  # Filter/sort the playlist came from
+        self.current_roots = []  # Folders of the library being played
+        self.profile_name = None  # Library profile they came from
+        self.scanner = None  # Background folder scan in progress
+        self.watchers = []  # Follow files being added to or removed from each root
+        self.duplicate_group_of = {}  # path -> (group number, group count) while reviewing duplicates
+        self.scan_started = None  # perf_counter value of the scan in progress, for the metrics
+        
+        # Library index (also holds the library profiles)
+        try:
+            self.index = LibraryIndex()
+        except sqlite3.Error:
+            # Home not writable, keep a temporary index for this session (an in-memory
+            # database would be a separate empty one for every thread's connection)
+            self.index = LibraryIndex.temporary()
+        self.history_file = os.path.expanduser("~/.video_sorter_history")
+        self.profiles = self.load_profiles()  # (name, roots), most recently opened first
+        
+        # Deletes run in the background, trashed files can be restored with undo
+        self.file_ops = FileOperations(self.ui_queue, name="file-ops", metrics=self.metrics)
+        self.undo_stack = []  # (TrashedFile, playlist slot it had)
+        
+        # Moves into the buckets get their own worker so big copies never hold up deletes
+        self.mover = FileOperations(self.ui_queue, name="mover", metrics=self.metrics)
+        self.buckets = self.load_buckets()  # slot -> destination folder
+        self.bucket_queued = collections.Counter()  # slot -> moves not finished yet
+        self.bucket_progress = {}  # slot -> readout of the move in progress
+        
+        # Probes durations etc. in the background, needs libvlc so it starts with it
+        self.prober = None
+        
+        # Contact sheets for the grid view, made by libvlc too
+        try:
+            self.thumbnail_cache = ThumbnailCache()
+        except OSError:
+            self.thumbnail_cache = None
+        self.thumbnails = None
+        self.grid = None
+        
+        # Bind the window close event
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Set up key bindings
+        self.root.bind("<space>", lambda e: self.toggle_play())
+        self.root.bind("r", lambda e: self.replay_video())
+        self.root.bind("l", lambda e: self.toggle_repeat())  # 'l' for loop
+        self.root.bind("a", lambda e: self.toggle_auto_play())  # 'a' for auto
+        self.root.bind("s", lambda e: self.toggle_random())  # 's' for shuffle
+        self.root.bind("t", lambda e: self.toggle_triage())  # 't' for triage
+        self.root.bind("f", lambda e: self.filter_videos())  # 'f' for filter
+        self.root.bind("g", lambda e: self.open_grid())  # 'g' for grid
+        self.root.bind("k", lambda e: self.toggle_skim())  # 'k' for skim
+        self.root.bind("[", lambda e: self.change_skim_rate(-1))
+        self.root.bind("]", lambda e: self.change_skim_rate(1))
+        self.root.bind("<Delete>", lambda e: self.delete_video())
+        self.root.bind("<Shift-Delete>", lambda e: self.delete_video(permanent=True))
+        self.root.bind("<Control-z>", lambda e: self.undo_delete())
+        self.root.bind("<Right>", lambda e: self.skip_forward())
+        self.root.bind("<Left>", lambda e: self.skip_backward())
+        self.root.bind("<Up>", lambda e: self.next_video())
+        self.root.bind("<Down>", lambda e: self.prev_video())
+        self.root.bind("<F11>", lambda e: self.toggle_fullscreen())
+        self.root.bind("<Escape>", lambda e: self.exit_fullscreen())
+        self.root.bind("m", lambda e: self.toggle_mute())
+        self.root.bind("i", lambda e: self.toggle_metrics_overlay())  # 'i' for info
+        
+        # Number keys move the current video into a bucket, Ctrl+number picks the bucket folder
+        for slot in range(1, 10):
+            self.root.bind(str(slot), lambda e, slot=slot: self.move_to_bucket(slot))
+            self.root.bind(f"<Control-Key-{slot}>", lambda e, slot=slot: self.choose_bucket(slot))
+        
+        # libvlc loads while the window is drawn, then the last session is picked up
+        self.root.bind("<Map>", self.on_first_map)
+        self.start_vlc()
+        self.root.after_idle(self.resume)
+        if self.metrics:
+            self.start_metrics()
+        if control_path:
+            self.start_control(control_path)
+    
+    def log_startup(self, stage):
+        """Print how long after launch stage was reached (--debug)"""
+        if self.started is not None:
+            print(f"startup: {stage} after {(time.perf_counter() - self.started) * 1000:.0f} ms", file=sys.stderr)
+    
+    def on_first_map(self, event):
+        if event.widget is self.root:
+            self.root.unbind("<Map>")
+            self.log_startup("window shown")
+    
+    def start_metrics(self):
+        """Hook the workers up to self.metrics and start timing the Tk loop"""
+        self.ui_queue.metrics = self.metrics
+        self.file_ops.metrics = self.mover.metrics = self.metrics
+        self.check_stall(time.perf_counter() + STALL_CHECK_MS / 1000)
+    
+    def check_stall(self, expected):
+        """Heartbeat: how late it runs is how long the Tk loop was blocked"""
+        now = time.perf_counter()
+        self.metrics.observe('tk_stall_seconds', max(0.0, now - expected))
+        self.root.after(STALL_CHECK_MS, self.check_stall, now + STALL_CHECK_MS / 1000)
+    
+    def toggle_metrics_overlay(self):
+        """Show or hide the latency figures over the video, collecting them from now on"""
+        if self.metrics_overlay:
+            self.metrics_overlay.destroy()
+            self.metrics_overlay = None
+            return
+        if self.metrics is None:
+            self.metrics = Metrics()
+            self.start_metrics()
+        self.metrics_overlay = tk.Label(self.video_frame, justify=tk.LEFT, anchor=tk.NW,
+                                        fg="#e0e0e0", bg="#202020", font=("Courier", 9))
+        self.metrics_overlay.place(x=5, y=5)
+        self.update_metrics_overlay()
+    
+    def update_metrics_overlay(self):
+        if not self.metrics_overlay:
+            return
+        
+        def ms(name, q, **labels):
+            value = self.metrics.quantile(name, q, **labels)
+            if value is None:
+                return "     -"
+            return f"{value * 1000:6.1f}" if value != float('inf') else "   inf"
+        
+        lines = []
+        for label, name, labels in (("switch", 'switch_seconds', {}),
+                                    ("  cold", 'switch_seconds', {'kind': 'cold'}),
+                                    ("  preroll", 'switch_seconds', {'kind': 'preroll'}),
+                                    ("first frame", 'first_frame_seconds', {}),
+                                    ("event delay", 'event_delay_seconds', {}),
+                                    ("tk stall", 'tk_stall_seconds', {}),
+                                    ("file op", 'file_op_seconds', {})):
+            lines.append(f"{label:<12} p50 {ms(name, 0.5, **labels)} ms  p95 {ms(name, 0.95, **labels)} ms")
+        for step in ('stop', 'media', 'attach', 'play', 'swap'):
+            if self.metrics.quantile('switch_step_seconds', 0.95, step=step) is not None:
+                lines.append(f"  {step:<10} p95 {ms('switch_step_seconds', 0.95, step=step)} ms")
+        lines.append(f"queued ops   {self.file_ops.pending} delete, {self.mover.pending} move")
+        rate = self.metrics.gauges.get(('scan_files_per_second', ()))
+        if rate is not None:
+            lines.append(f"last scan    {rate:.0f} files/s")
+        self.metrics_overlay.config(text="\n".join(lines))
+        self.metrics_overlay.lift()
+        self.root.after(METRICS_OVERLAY_MS, self.update_metrics_overlay)
+    
+    def start_vlc(self):
+        """Import libvlc and create the players on a background thread"""
+        def load():
+            global vlc
+            try:
+                import vlc
+                # Reduced verbosity
+                instance = vlc.Instance('--quiet', '--no-xlib')
+                players = (instance.media_player_new(), instance.media_player_new())
+            except Exception as e:
+                message = f"Cannot start VLC: {e}"
+                self.ui_queue.post(lambda: self.status_label.config(text=message))
+                return
+            self.ui_queue.post(self.on_vlc_ready, instance, players)
+        
+        threading.Thread(target=load, name="vlc-init", daemon=True).start()
+    
+    def on_vlc_ready(self, instance, players):
+        """libvlc is loaded, start whatever was waiting for it"""
+        self.instance = instance
+        self.player, self.standby_player = players
+        self.log_startup("libvlc ready")
+        
+        # Both players report state changes through VLC events instead of being polled
+        self.attach_player_events(self.player)
+        self.attach_player_events(self.standby_player)
+        self.player.audio_set_volume(self.volume_scale.get())
+        
+        # Probe durations etc. in the background without playing anything
+        self.prober = MetadataProber(self.instance, self.ui_queue, self.index, self.on_metadata)
+        if self.playlist:
+            self.prober.submit(list(self.playlist))
+        if self.thumbnail_cache:
+            self.thumbnails = ThumbnailGenerator(self.instance, self.ui_queue, self.thumbnail_cache, self.on_thumbnail)
+            if self.grid:
+                self.grid.draw(force=True)
+        if self.playlist.current >= 0:
+            self.play_current_video()
+    
+    def resume(self):
+        """Pick up a triage session that did not get applied, or else the last session"""
+        if not self.offer_resume():
+            self.resume_session()
+    
+    def save_session(self, final=False):
+        """Remember the folder, playlist, video and settings for the next launch
+
+        The playlist order is only written when final (on exit), listing a
+        big filtered playlist is too slow to do while switching videos.
+        """
+        if not self.current_roots:
+            return
+        path = self.playlist.current_path
+        history = [self.playlist[slot] for slot in self.playlist.history[-SESSION_HISTORY:]]
+        history_pos = self.playlist.history_pos - max(0, len(self.playlist.history) - SESSION_HISTORY)
+        state = {
+            'roots': self.current_roots,
+            'profile': self.profile_name,
+            'recursive': self.is_recursive,
+            'query': self.query_text,
+            'path': path,
+            'position': self.playlist.position(self.playlist.current) - 1 if path else None,
+            'time': self.current_time if path and not self.awaiting_playback else 0,
+            'volume': self.volume_scale.get(),
+            'muted': self.is_muted,
+            'repeat': self.is_repeat,
+            'auto_play': self.is_auto_play,
+            'random': self.is_random,
+            'seed': self.shuffle_seed,
+            'history': history,
+            'history_pos': history_pos,
+        }
+        try:
+            self.index.set_setting('session', state)
+            if final:
+                # The scan order of a single folder comes back by itself. A filtered or
+                # sorted one has to be kept, and so does one from several folders, whose
+                # paths are interleaved in the order the folders answered
+                keep = self.query_text or len(self.current_roots) > 1
+                self.index.set_setting('session_order', {
+                    'roots': self.current_roots, 'query': self.query_text,
+                    'paths': list(self.playlist) if keep else None,
+                })
+        except sqlite3.Error:
+            return
+        self.session_saved = time.monotonic()
+    
+    def resume_session(self):
+        """Reopen the folders of the last session and carry on playing where it stopped"""
+        try:
+            state = self.index.get_setting('session')
+            order = self.index.get_setting('session_order')
+        except (sqlite3.Error, ValueError):
+            return
+        if not state:
+            return
+        # Sessions saved before libraries had several roots only have 'folder'
+        roots = state.get('roots') or ([state['folder']] if state.get('folder') else [])
+        reachable = check_paths_exist(roots, timeout=0.5)
+        # A share that is slow to answer still gets scanned, on its own threads
+        roots = [root for root in roots if reachable[root] is not False]
+        if not roots:
+            return
+        self.volume_scale.set(state.get('volume', 70))
+        if state.get('muted') != self.is_muted:
+            self.toggle_mute()
+        if state.get('repeat') != self.is_repeat:
+            self.toggle_repeat()
+        if state.get('auto_play') != self.is_auto_play:
+            self.toggle_auto_play()
+        if state.get('recursive') != self.is_recursive:
+            self.toggle_recursive()
+        if self.shuffle_seed is None:
+            self.shuffle_seed = state.get('seed')
+        if state.get('random') != self.is_random:
+            self.toggle_random()
+        self.load_videos_from_folders(roots, state.get('profile'))
+        self.resume_path = state.get('path')
+        self.resume_position = state.get('position')
+        if self.resume_path and state.get('time'):
+            self.resume_time = (self.resume_path, state['time'])
+        if order and order['paths'] and (order.get('roots') or [order.get('folder')], order['query']) == (roots, state.get('query')):
+            self.resume_order = (order['query'], order['paths'])
+        if state.get('history'):
+            self.resume_history = (state['history'], state.get('history_pos', -1))
+    
+    def apply_resumed_order(self):
+        """Once the scan is done, put back the saved playlist order and shuffle history"""
+        current = self.playlist.current_path
+        if self.resume_order:
+            query_text, order = self.resume_order
+            rows = [self.library.row_of(path) for path in order]
+            rows = [row for row in rows if self.playlist.slot_of_row(row) >= 0]
+            if rows and not query_text:
+                # Only the order was kept, videos that are new since come after the others
+                kept = set(rows)
+                rows += [row for row in (self.library.row_of(path) for path in self.playlist) if row not in kept]
+            if rows:
+                self.query_text = query_text
+                self.playlist = Playlist(self.library, shuffle=self.is_random, seed=self.shuffle_seed)
+                self.playlist.set_rows(rows)
+                slot = self.playlist.slot_of(current) if current else -1
+                self.playlist.jump(slot if slot >= 0 else self.playlist.head)
+                if slot < 0:
+                    self.play_current_video()
+        if self.resume_history:
+            paths, position = self.resume_history
+            slots = []
+            for i, path in enumerate(paths):
+                slot = self.playlist.slot_of(path)
+                if slot >= 0:
+                    slots.append(slot)
+                elif i <= position:
+                    position -= 1
+            if self.playlist.current >= 0 and self.playlist.current not in slots[position:position + 1]:
+                # Carry on from the current video
+                slots.append(self.playlist.current)
+                position = len(slots) - 1
+            self.playlist.set_history(slots, position)
+        self.resume_order = self.resume_history = None
+        self.preroll_next()
+    
+    def load_buckets(self):
+        """Load the bucket folders from the index"""
+        try:
+            return self.index.get_buckets()
+        except sqlite3.Error:
+            return {}
+    
+    def choose_bucket(self, slot):
+        """Ask for the folder bound to number key slot, returns it or None"""
+        folder_path = filedialog.askdirectory(
+            title=f"Folder for key {slot}",
+            initialdir=self.buckets.get(slot),
+            mustexist=True
+        )
+        if not folder_path:
+            return None
+        self.buckets[slot] = folder_path
+        try:
+            self.index.set_bucket(slot, folder_path)
+        except sqlite3.Error:
+            pass
+        self.status_label.config(text=f"Key {slot} moves to {folder_path}")
+        return folder_path
+    
+    def load_profiles(self):
+        """Load the library profiles from the index"""
+        try:
+            # Pick up history written by older versions
+            self.index.import_history_file(self.history_file)
+            return self.index.profiles()
+        except (OSError, sqlite3.Error):
+            return []
+    
+    def remember_profile(self, name, roots):
+        """Save a profile, moving it to the top of the list"""
+        try:
+            self.index.save_profile(name, roots)
+        except sqlite3.Error:
+            pass
+        self.profiles = self.load_profiles()
+    
+    def open_profile(self, name, roots, rescan=False):
+        """Play the videos of a library profile, rescan lists every folder again"""
+        self.remember_profile(name, roots)
+        if rescan:
+            try:
+                for root in roots:
+                    self.index.invalidate(root)
+            except sqlite3.Error:
+                pass
+        self.load_videos_from_folders(roots, name)
+    
+    def select_folder(self):
+        # Create a popup menu for library selection
+        if self.profiles:
+            # Create a simple dialog with the profiles
+            choice_window = tk.Toplevel(self.root)
+            choice_window.title("Select Library")
+            choice_window.geometry("500x300")
+            choice_window.transient(self.root)
+            choice_window.grab_set()
+            
+            tk.Label(choice_window, text="Libraries and recent folders:", font=("Arial", 12, "bold")).pack(pady=5)
+            
+            # Create listbox for the profiles
+            listbox_frame = tk.Frame(choice_window)
+            listbox_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+            
+            scrollbar = tk.Scrollbar(listbox_frame)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            
+            listbox = tk.Listbox(listbox_frame, yscrollcommand=scrollbar.set)
+            listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scrollbar.config(command=listbox.yview)
+            
+            # Populate listbox with the profiles, their folders are checked in the
+            # background so a stalled network mount cannot hang the dialog
+            profiles = list(self.profiles)
+            for name, roots in profiles:
+                listbox.insert(tk.END, name if roots == [name] else f"{name}  ({len(roots)} folders)")
+            
+            def show_results(results):
+                if not choice_window.winfo_exists():
+                    return
+                # Hide profiles none of whose folders exist, grey out the ones with a folder that is missing or did not answer
+                for i in reversed(range(len(profiles))):
+                    answers = [results[root] for root in profiles[i][1]]
+                    if not any(answer is not False for answer in answers):
+                        listbox.delete(i)
+                        del profiles[i]
+                    elif not all(answers):
+                        listbox.itemconfig(i, fg="grey")
+            
+            roots = list({root for name, roots in profiles for root in roots})
+            threading.Thread(target=lambda: self.ui_queue.post(show_results, check_paths_exist(roots)),
+                             name="history-check", daemon=True).start()
+            
+            # Button frame
+            button_frame = tk.Frame(choice_window)
+            button_frame.pack(fill=tk.X, padx=10, pady=5)
+            
+            def use_selected(rescan=False):
+                selection = listbox.curselection()
+                if selection:
+                    name, roots = profiles[selection[0]]
+                    choice_window.destroy()
+                    self.open_profile(name, roots, rescan)
+            
+            def forget_selected():
+                selection = listbox.curselection()
+                if selection:
+                    name, roots = profiles.pop(selection[0])
+                    listbox.delete(selection[0])
+                    try:
+                        self.index.forget_profile(name)
+                    except sqlite3.Error:
+                        pass
+                    self.profiles = self.load_profiles()
+            
+            def new_profile():
+                choice_window.destroy()
+                self.create_profile()
+            
+            def browse_new():
+                choice_window.destroy()
+                self.browse_for_folder()
+            
+            tk.Button(button_frame, text="Open", command=use_selected).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="Rescan", command=lambda: use_selected(rescan=True)).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="Forget", command=forget_selected).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="New Library", command=new_profile).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="Browse Folder", command=browse_new).pack(side=tk.LEFT, padx=5)
+            tk.Button(button_frame, text="Cancel", command=choice_window.destroy).pack(side=tk.RIGHT, padx=5)
+            
+            # Double-click to select
+            listbox.bind("<Double-Button-1>", lambda e: use_selected())
+            
+        else:
+            # No profiles, go straight to browser
+            self.browse_for_folder()
+    
+    def initial_dir(self):
+        # Last used folder if it is reachable, else its parent
+        initial_dir = self.profiles[0][1][0] if self.profiles else None
+        if initial_dir and not check_paths_exist([initial_dir], timeout=0.5)[initial_dir]:
+            initial_dir = os.path.dirname(initial_dir)
+        return initial_dir
+    
+    def browse_for_folder(self):
+        folder_path = filedialog.askdirectory(
+            title="Select Folder Containing Videos",
+            initialdir=self.initial_dir(),
+            mustexist=True
+        )
+        
+        if folder_path:
+            self.open_profile(folder_path, [folder_path])
+    
+    def create_profile(self):
+        """Name a new library and pick its folders one after the other"""
+        name = simpledialog.askstring("New Library", "Name of the library:", parent=self.root)
+        if not name:
+            return
+        roots = []
+        initial_dir = self.initial_dir()
+        while True:
+            folder_path = filedialog.askdirectory(
+                title=f"Add a folder to {name} ({len(roots)} so far, Cancel when done)",
+                initialdir=initial_dir,
+                mustexist=True
+            )
+            if not folder_path:
+                break
+            if folder_path not in roots:
+                roots.append(folder_path)
+            initial_dir = os.path.dirname(folder_path)
+        if roots:
+            self.open_profile(name, roots)
+    
+    def load_videos_from_folders(self, roots, profile_name=None):
+        """Start a background scan of the roots, playback begins with the first match from any of them"""
+        # Abandon any scan that is still running for the previous library
+        if self.scanner:
+            self.scanner.cancel()
+        for watcher in self.watchers:
+            watcher.cancel()
+        
+        if self.player is not None:
+            self.player.stop()
+            self.prober.reset()
+            self.drop_preroll()
+        if self.thumbnails:
+            self.thumbnails.reset()
+        self.resume_path = self.resume_position = self.resume_time = None
+        self.resume_order = self.resume_history = None
+        # Slots of the old playlist mean nothing in the new one
+        self.undo_stack = []
+        self.library = Library()
+        self.playlist = Playlist(self.library, shuffle=self.is_random, seed=self.shuffle_seed)
+        self.query_text = ""
+        self.duplicate_group_of = {}
+        self.current_roots = list(roots)
+        self.profile_name = profile_name
+        self.status_label.config(text="Scanning..." if len(roots) == 1 else f"Scanning {len(roots)} folders...")
+        self.scan_started = time.perf_counter()
+        if self.is_triage:
+            self.journal.open_folder(self.current_roots, self.is_recursive)
+        
+        # Watch first so nothing that changes during the scan is missed
+        self.watchers = [FolderWatcher(self.ui_queue, root, self.on_folder_changes,
+                                       index=self.index, recursive=self.is_recursive) for root in roots]
+        for watcher in self.watchers:
+            watcher.start()
+        self.scanner = FolderScanner(self.ui_queue, self.current_roots,
+                                     on_batch=self.on_scan_batch, on_done=self.on_scan_done,
+                                     on_stats=self.on_scan_stats, index=self.index,
+                                     recursive=self.is_recursive)
+        self.scanner.start()
+    
+    def on_scan_batch(self, paths):
+        """Append newly found videos, starting playback on the first one"""
+        if self.metrics:
+            if not self.playlist:
+                self.metrics.observe('scan_seconds', time.perf_counter() - self.scan_started, stage='first')
+            self.metrics.count('scan_files_total', len(paths))
+        self.playlist.extend(paths)
+        if self.prober:
+            self.prober.submit(paths)
+        if self.resume_path and self.resume_path in paths:
+            # Back where the interrupted session left off
+            self.playlist.jump(self.playlist.slot_of(self.resume_path))
+            self.resume_path = None
+            self.play_current_video()
+        elif self.playlist.current < 0:
+            self.playlist.advance()
+            self.play_current_video()
+        else:
+            self.status_label.config(text=self.playing_status() + " (scanning...)")
+            # The first batch may have had nothing to preroll yet
+            if self.preroll_path is None and not self.awaiting_playback:
+                self.preroll_next()
+    
+    def on_folder_changes(self, changes):
+        """Apply files added, removed or renamed in the folder by other programs"""
+        current = self.playlist.current
+        was_empty = not self.playlist
+        bucket_dirs = set(self.buckets.values())
+        added = []
+        changed = False
+        
+        def add(path):
+            # Nothing new joins a duplicate review, and videos moved into a bucket are sorted already
+            if self.duplicate_group_of or os.path.dirname(path) in bucket_dirs or path in self.playlist:
+                return
+            self.playlist.extend([path])
+            added.append(path)
+        
+        def remove(path):
+            nonlocal changed
+            if self.playlist.remove(self.playlist.slot_of(path)) is not None:
+                changed = True
+            self.library.discard(path)
+        
+        for change in changes:
+            op, path = change[0], change[1]
+            if op == 'add':
+                add(path)
+            elif op == 'remove':
+                remove(path)
+            elif op == 'rename':
+                new_path = change[2]
+                if new_path in self.playlist:
+                    # Renamed over another video, which is gone now
+                    remove(new_path)
+                # Playlist holds library rows, so the video keeps its place
+                row = self.library.rename(path, new_path)
+                if self.playlist.slot_of_row(row) < 0:
+                    add(new_path)
+                else:
+                    changed = True
+                if self.preroll_path == path:
+                    self.preroll_path = new_path
+            elif op == 'remove_dir':
+                prefix = path + os.sep
+                for gone in [p for p in self.playlist if p.startswith(prefix)]:
+                    remove(gone)
+            elif op == 'sync':
+                for gone in [p for p in self.playlist if p not in path]:
+                    remove(gone)
+                for new_path in sorted(path):
+                    add(new_path)
+        
+        # Our own deletes and moves show up here too, after the playlist already has them
+        if not added and not changed:
+            return
+        if self.prober:
+            self.prober.submit(added)
+        if not self.playlist:
+            if self.player is not None:
+                self.player.stop()
+            self.root.title("Video File Sorter")
+            if not self.scanner:
+                self.status_label.config(text="No video files left in folder")
+        elif was_empty:
+            self.playlist.advance()
+            self.play_current_video()
+        elif self.playlist.current != current:
+            # The video that was playing is gone
+            self.play_current_video()
+        else:
+            self.status_label.config(text=self.playing_status())
+            # The next video may have changed
+            self.preroll_next()
+    
+    def open_grid(self):
+        """Show the playlist as a grid of contact sheets"""
+        if self.grid:
+            self.grid.window.lift()
+            return
+        self.grid = ThumbnailGrid(self)
+    
+    def on_thumbnail(self, path, sheet):
+        if self.grid:
+            self.grid.on_thumbnail(path, sheet)
+    
+    def on_metadata(self, path, info):
+        """Probe result for path arrived"""
+        row = self.library.row_of(path)
+        if row >= 0:
+            self.library.set_metadata(row, info)
+    
+    def on_scan_stats(self, stats):
+        """Sizes and mtimes of the scanned videos arrived from the index"""
+        rows = np.fromiter((self.library.row_of(path) for path, size, mtime in stats), np.int64, len(stats))
+        known = rows >= 0
+        sizes = np.array([size for path, size, mtime in stats], np.int64)
+        mtimes = np.array([mtime for path, size, mtime in stats], np.float64)
+        self.library.set_stats(rows[known], sizes[known], mtimes[known])
+    
+    def on_scan_done(self):
+        self.scanner = None
+        self.library.trim()
+        if self.metrics:
+            elapsed = time.perf_counter() - self.scan_started
+            self.metrics.observe('scan_seconds', elapsed, stage='listed')
+            self.metrics.set_gauge('scan_files_per_second', len(self.playlist) / max(elapsed, 1e-6))
+        # The saved order first, the recorded position is a position in it
+        if self.resume_order or self.resume_history:
+            self.apply_resumed_order()
+        if self.resume_path:
+            # Resumed video is gone, fall back to the recorded position
+            self.resume_path = None
+            if self.resume_position is not None and self.playlist:
+                self.playlist.jump(self.playlist.select(self.resume_position + 1))
+                self.play_current_video()
+        self.resume_position = None
+        self.publish('scan', count=len(self.playlist))
+        if not self.playlist:
+            self.status_label.config(text="No video files found in folder")
+            return
+        self.status_label.config(text=self.playing_status())
+    
+    def play_current_video(self):
+        video_path = self.playlist.current_path
+        if video_path is None:
+            return
+        if self.defer_playback:
+            # Only the video the last command of the burst lands on gets played
+            self.playback_pending = True
+            return
+        self.publish('video', **self.current_video())
+        
+        # Update the window title with the filename
+        filename = os.path.basename(video_path)
+        self.root.title(f"Video File Sorter - {filename}")
+        
+        if self.is_triage:
+            self.journal.record_position(self.playlist.position(self.playlist.current) - 1, video_path)
+        if self.is_skimming:
+            # Bursts start again from the first point once the new video plays
+            self.cancel_skim_burst()
+            self.skim_step = 0
+        if time.monotonic() - self.session_saved >= SESSION_SAVE_INTERVAL:
+            self.save_session()
+        
+        if self.player is None:
+            # on_vlc_ready comes back here
+            self.status_label.config(text=self.playing_status() + " (starting VLC...)")
+            return
+        
+        # Probe the neighbours first, they are the likely next picks
+        self.prober.focus(self.playlist.neighbours(self.playlist.current, PROBE_FOCUS_WINDOW))
+        
+        self.awaiting_playback = True
+        self.switch_started = self.frame_pending = time.perf_counter()
+        self.current_time = 0
+        self.current_length = 0
+        steps = StepTimer(self.metrics, 'switch_step_seconds')
+        
+        if video_path == self.preroll_path and self.preroll_ready and not self.standby_busy:
+            # Already opened and paused on its first frame, just swap players
+            self.switch_kind = 'preroll'
+            self.swap_to_standby()
+            steps.mark('swap')
+            if self.metrics:
+                # Its first frame is on screen as soon as its surface is raised
+                self.metrics.observe('first_frame_seconds', time.perf_counter() - self.frame_pending, kind='preroll')
+            self.frame_pending = None
+        else:
+            self.switch_kind = 'cold'
+            # Stop any current playback and mute before loading new video to prevent audio artifacts
+            self.player.audio_set_mute(True)
+            self.player.stop()
+            steps.mark('stop')
+            
+            # Create a new media with options
+            media = self.instance.media_new(str(video_path))
+            steps.mark('media')
+            
+            # Set media to player
+            self.player.set_media(media)
+            self.attach_player(self.player, self.video_surfaces[self.active_surface])
+            steps.mark('attach')
+            
+            # Set volume to match the scale
+            self.player.audio_set_volume(self.volume_scale.get())
+            
+            # Start playing, on_player_event restores audio once it is under way
+            self.player.play()
+            steps.mark('play')
+        # Either player may still have the rate of an earlier mode
+        self.player.set_rate(self.skim_rate if self.is_skimming else 1.0)
+        if self.metrics:
+            self.metrics.count('switches_total', kind=self.switch_kind)
+        
+        self.update_time_display()
+        
+        # Update status
+        self.status_label.config(text=self.playing_status())
+    
+    def playing_status(self):
+        """Status text for the current video, with its triage decision if there is one"""
+        path = self.playlist.current_path
+        position = self.playlist.position(self.playlist.current) if path else 0
+        text = f"Playing {position}/{len(self.playlist)}"
+        if self.is_skimming:
+            text += f" - skim {self.skim_rate:g}x"
+            if len(self.skim_finished) >= 2:
+                minutes = (self.skim_finished[-1] - self.skim_finished[0]) / 60
+                text += f", {(len(self.skim_finished) - 1) / max(minutes, 1e-6):.1f} files/min"
+        if path in self.duplicate_group_of:
+            group, groups = self.duplicate_group_of[path]
+            text += f" - duplicate group {group}/{groups}"
+        if self.query_text:
+            text += f" [{self.query_text}]"
+        if self.is_triage and path:
+            decision = self.journal.decisions.get(path)
+            if decision:
+                action, target = decision
+                text += f" [{action}{' to ' + os.path.basename(target) if target else ''}]"
+            counts = self.journal.counts()
+            text += f" - triage: {counts['trash'] + counts['delete']} delete, {counts['move']} move, {counts['keep']} keep"
+        return text
+    
+    def attach_player_events(self, player):
+        """Forward the VLC events we care about to the Tk thread"""
+        events = player.event_manager()
+        forwarded = (vlc.EventType.MediaPlayerPlaying, vlc.EventType.MediaPlayerPaused,
+                     vlc.EventType.MediaPlayerEndReached, vlc.EventType.MediaPlayerEncounteredError,
+                     vlc.EventType.MediaPlayerVout)
+        for event_type in forwarded:
+            events.event_attach(event_type, self.on_vlc_event, player)
+        events.event_attach(vlc.EventType.MediaPlayerLengthChanged, self.on_vlc_length, player)
+        events.event_attach(vlc.EventType.MediaPlayerTimeChanged, self.on_vlc_time, player)
+    
+    # The on_vlc_* callbacks run on a VLC thread: never call back into
+    # libvlc or Tk from them, only hand the event over to the Tk thread
+    
+    def on_vlc_event(self, event, player):
+        self.ui_queue.post(self.on_player_event, player, event.type, time.perf_counter())
+    
+    def on_vlc_length(self, event, player):
+        self.last_reported_second[player] = None
+        self.ui_queue.post(self.on_player_length, player, event.u.new_length)
+    
+    def on_vlc_time(self, event, player):
+        # The display shows whole seconds, so only wake the Tk thread when that changes
+        second = event.u.new_time // 1000
+        if self.last_reported_second.get(player) != second:
+            self.last_reported_second[player] = second
+            self.ui_queue.post(self.on_player_time, player, event.u.new_time)
+    
+    def on_player_event(self, player, event_type, timestamp):
+        """Playing/Paused/EndReached/EncounteredError from either player (Tk thread)"""
+        if player is self.standby_player:
+            self.on_standby_event(event_type)
+            return
+        if player is not self.player:
+            return
+        if self.metrics:
+            self.metrics.observe('event_delay_seconds', time.perf_counter() - timestamp)
+        if self.control:
+            state = {vlc.EventType.MediaPlayerPlaying: 'playing', vlc.EventType.MediaPlayerPaused: 'paused',
+                     vlc.EventType.MediaPlayerEndReached: 'ended',
+                     vlc.EventType.MediaPlayerEncounteredError: 'error'}.get(event_type)
+            if state:
+                self.publish('state', state=state, path=self.playlist.current_path)
+        
+        if event_type == vlc.EventType.MediaPlayerPlaying:
+            # Events from before the latest switch belong to the previous video
+            if self.awaiting_playback and (self.switch_started is None or timestamp >= self.switch_started):
+                self.awaiting_playback = False
+                self.record_switch_time(timestamp)
+                if self.resume_time and self.resume_time[0] == self.playlist.current_path:
+                    # Carry on where the last session stopped
+                    self.player.set_time(self.resume_time[1])
+                    self.resume_time = None
+                # Restore audio state after a short delay
+                self.root.after(50, self.restore_audio)
+                if self.is_skimming:
+                    self.start_skim()
+                # Get the next video ready while this one plays
+                self.preroll_next()
+        elif event_type == vlc.EventType.MediaPlayerPaused:
+            if self.awaiting_playback:
+                # Media opened with :start-paused (a prerolled one being restarted), carry on
+                self.player.play()
+        elif event_type == vlc.EventType.MediaPlayerVout:
+            if self.metrics and self.frame_pending is not None and timestamp >= self.frame_pending:
+                self.metrics.observe('first_frame_seconds', timestamp - self.frame_pending, kind='cold')
+                self.frame_pending = None
+            if self.started is not None:
+                self.log_startup("first frame")
+                self.started = None
+        elif event_type == vlc.EventType.MediaPlayerEndReached:
+            self.on_video_ended()
+        elif event_type == vlc.EventType.MediaPlayerEncounteredError:
+            self.awaiting_playback = False
+            self.switch_started = None
+            if self.playlist.current_path:
+                self.status_label.config(text=f"Cannot play {os.path.basename(self.playlist.current_path)}")
+            if self.is_auto_play:
+                self.next_video()
+    
+    def on_player_length(self, player, length):
+        if player is self.player:
+            self.current_length = length
+            self.update_time_display()
+    
+    def on_player_time(self, player, current):
+        if player is self.player:
+            self.current_time = current
+            self.update_time_display()
+            self.publish('time', time=current, length=self.current_length)
+    
+    def on_standby_event(self, event_type):
+        """Track the prerolled video reaching its first frame"""
+        if self.preroll_path is None or self.preroll_ready:
+            return
+        if event_type == vlc.EventType.MediaPlayerPlaying:
+            # start-paused was not honoured, hold it ourselves
+            self.standby_player.set_pause(1)
+            self.preroll_ready = True
+        elif event_type == vlc.EventType.MediaPlayerPaused:
+            self.preroll_ready = True
+        elif event_type == vlc.EventType.MediaPlayerEncounteredError:
+            self.preroll_path = None
+    
+    def attach_player(self, player, surface):
+        """Render player into the given surface frame"""
+        # On Linux, you need to give the ID of the window to embed the video
+        if sys.platform.startswith('linux'):
+            player.set_xwindow(surface.winfo_id())
+        elif sys.platform == "win32":
+            player.set_hwnd(surface.winfo_id())
+        elif sys.platform == "darwin":
+            player.set_nsobject(surface.winfo_id())
+    
+    def swap_to_standby(self):
+        """Make the prerolled standby player the active one"""
+        previous = self.player
+        self.player, self.standby_player = self.standby_player, previous
+        self.active_surface = 1 - self.active_surface
+        self.video_surfaces[self.active_surface].tkraise()
+        if self.metrics_overlay:
+            self.metrics_overlay.lift()
+        self.preroll_path = None
+        self.preroll_ready = False
+        
+        self.player.audio_set_mute(True)
+        self.player.audio_set_volume(self.volume_scale.get())
+        # Resume from the first frame it is paused on
+        self.player.play()
+        
+        # The old player becomes the standby once it has stopped
+        self.recycle_standby()
+    
+    def recycle_standby(self):
+        """Stop the standby player off the Tk thread, then preroll into it again"""
+        player = self.standby_player
+        self.standby_busy = True
+        
+        def stop():
+            player.audio_set_mute(True)
+            player.stop()
+            self.ui_queue.post(self.on_standby_stopped)
+        
+        threading.Thread(target=stop, name="standby-stop", daemon=True).start()
+    
+    def on_standby_stopped(self):
+        self.standby_busy = False
+        if self.player.get_state() == vlc.State.Playing:
+            self.preroll_next()
+    
+    def drop_preroll(self):
+        """Forget the prerolled video, e.g. because the playlist was replaced"""
+        if self.preroll_path is not None and not self.standby_busy:
+            self.preroll_path = None
+            self.preroll_ready = False
+            self.recycle_standby()
+    
+    def preroll_next(self):
+        """Open the likely next video in the standby player, paused on its first frame"""
+        if self.player is None or self.standby_busy or len(self.playlist) < 2:
+            return
+        # In shuffle mode this draws the next pick early so it can be prerolled
+        slot = self.playlist.peek_next()
+        if slot < 0 or slot == self.playlist.current:
+            return
+        path = self.playlist[slot]
+        if path == self.preroll_path:
+            return
+        if self.preroll_path is not None:
+            # Wrong video prerolled (order changed), comes back here once stopped
+            self.drop_preroll()
+            return
+        
+        media = self.instance.media_new(str(path))
+        # Open, decode the first frame and hold there without playing any audio
+        media.add_option(':start-paused')
+        if self.is_skimming:
+            # Hold at the first skim point instead, if the duration is known already
+            row = self.library.row_of(path)
+            duration = self.library.column('duration')[row] if row >= 0 else -1
+            if duration > 0:
+                media.add_option(f':start-time={duration * SKIM_POSITIONS[0] / 1000:.2f}')
+            self.prefetch_skim_points(path)
+        self.standby_player.set_media(media)
+        self.attach_player(self.standby_player, self.video_surfaces[1 - self.active_surface])
+        self.standby_player.audio_set_mute(True)
+        self.standby_player.play()
+        self.preroll_path = path
+        self.preroll_ready = False
+    
+    def record_switch_time(self, timestamp):
+        """Measure how long the last switch took to reach playback"""
+        if self.switch_started is None:
+            return
+        elapsed_ms = (timestamp - self.switch_started) * 1000
+        self.switch_started = None
+        if self.metrics:
+            self.metrics.observe('switch_seconds', elapsed_ms / 1000, kind=self.switch_kind)
+        self.switch_times.append(elapsed_ms)
+        average = sum(self.switch_times) / len(self.switch_times)
+        self.status_label.config(text=self.playing_status() + f" - switch {elapsed_ms:.0f} ms (avg {average:.0f} ms)")
+    
+    def replay_video(self):
+        """Restart the current video from the beginning"""
+        if self.playlist.current_path is None or self.player is None:
+            return
+        
+        # Stop the player and start again from the beginning, a media that was
+        # prerolled with :start-paused is resumed from on_player_event
+        self.player.stop()
+        self.awaiting_playback = True
+        self.player.play()
+    
+    def format_time(self, ms):
+        """Format milliseconds to MM:SS format"""
+        seconds = ms // 1000
+        minutes = seconds // 60
+        seconds %= 60
+        return f"{minutes:02d}:{seconds:02d}"
+    
+    def update_time_display(self):
+        """Update the time display"""
+        if self.current_length > 0:
+            self.time_label.config(text=f"{self.format_time(self.current_time)} / {self.format_time(self.current_length)}")
+        else:
+            self.time_label.config(text="00:00 / 00:00")
+    
+    def on_video_ended(self):
+        """Video ended, check what to do next"""
+        if self.is_skimming:
+            # Shorter than the bursts add up to
+            self.finish_skimmed_video()
+        elif self.is_repeat:
+            # Repeat current video
+            self.replay_video()
+        elif self.is_auto_play:
+            # Move to next video automatically
+            self.next_video()
+        else:
+            # Show the full length rather than the last reported second
+            self.current_time = self.current_length
+            self.update_time_display()
+    
+    def restore_audio(self):
+        # Restore audio to previous state
+        if not self.is_muted:
+            self.player.audio_set_mute(False)
+    
+    def skip_forward(self):
+        if self.player is None:
+            return
+        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
+            current_time = self.player.get_time()
+            self.player.set_time(current_time + 15000)  # Skip forward 15 seconds
+    
+    def skip_forward_long(self):
+        if self.player is None:
+            return
+        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
+            current_time = self.player.get_time()
+            self.player.set_time(current_time + 45000)  # Skip forward 45 seconds
+    
+    def skip_backward(self):
+        if self.player is None:
+            return
+        if self.player.is_playing() or self.player.get_state() == vlc.State.Paused:
+            current_time = self.player.get_time()
+            # Make sure we don't go below 0
+            new_time = max(0, current_time - 15000)  # Skip backward 15 seconds
+            self.player.set_time(new_time)
+    
+
+    
+    def toggle_fullscreen(self):
+        if not self.is_fullscreen:
+            self.original_geometry = self.root.geometry()
+            self.root.attributes('-fullscreen', True)
+            # Keep control panel visible in fullscreen mode
+            self.is_fullscreen = True
+        else:
+            self.exit_fullscreen()
+    
+    def exit_fullscreen(self):
+        if self.is_fullscreen:
+            self.root.attributes('-fullscreen', False)
+            self.root.geometry(self.original_geometry)
+            self.is_fullscreen = False
+    
+    def toggle_play(self):
+        if self.player is None:
+            return
+        state = self.player.get_state()
+        if state == vlc.State.Ended:
+            # Video has ended, restart from beginning
+            self.player.stop()
+            self.awaiting_playback = True
+            self.player.play()
+        elif self.player.is_playing():
+            self.player.pause()
+            # A paused skim waits for the user, the burst carries on when unpaused
+            self.cancel_skim_burst()
+        else:
+            self.player.play()
+            if self.is_skimming and self.skim_timer is None and not self.awaiting_playback:
+                self.skim_timer = self.root.after(SKIM_BURST_MS, self.next_skim_burst)
+    
+    def toggle_repeat(self):
+        """Toggle repeat mode on/off"""
+        self.is_repeat = not self.is_repeat
+        self.repeat_button.config(text=f"Repeat: {'On' if self.is_repeat else 'Off'}")
+    
+    def toggle_auto_play(self):
+        """Toggle auto play mode on/off"""
+        self.is_auto_play = not self.is_auto_play
+        self.auto_play_button.config(text=f"Auto: {'On' if self.is_auto_play else 'Off'}")
+    
+    def toggle_random(self):
+        """Toggle random mode on/off"""
+        self.is_random = not self.is_random
+        self.random_button.config(text=f"Random: {'On' if self.is_random else 'Off'}")
+        self.playlist.set_shuffle(self.is_random)
+        # The likely next video has changed
+        if self.playlist:
+            self.preroll_next()
+    
+    def toggle_skim(self):
+        """Skim mode: short bursts through each video at a faster rate, then on to the next"""
+        self.is_skimming = not self.is_skimming
+        self.skim_button.config(text=f"Skim: {'On' if self.is_skimming else 'Off'}")
+        self.skim_finished.clear()
+        self.drop_preroll()  # Prerolled without (or with) the skim start point
+        if self.player is None or self.playlist.current_path is None:
+            return
+        if self.is_skimming:
+            self.skim_step = 0
+            self.start_skim()
+        else:
+            self.cancel_skim_burst()
+            for player in (self.player, self.standby_player):
+                player.set_rate(1.0)
+        self.status_label.config(text=self.playing_status())
+    
+    def change_skim_rate(self, step):
+        """Next faster (step 1) or slower (step -1) skim rate"""
+        rates = SKIM_RATES
+        i = min(range(len(rates)), key=lambda i: abs(rates[i] - self.skim_rate))
+        self.skim_rate = rates[max(0, min(len(rates) - 1, i + step))]
+        if self.is_skimming and self.player is not None:
+            self.player.set_rate(self.skim_rate)
+        self.status_label.config(text=self.playing_status())
+    
+    def start_skim(self):
+        """The current video is playing, jump to its first skim point"""
+        self.player.set_rate(self.skim_rate)
+        # A video prerolled with :start-time is there already
+        if abs(self.player.get_position() - SKIM_POSITIONS[0]) > 0.02:
+            self.player.set_position(SKIM_POSITIONS[0])
+        self.prefetch_skim_points(self.playlist.current_path)
+        self.cancel_skim_burst()
+        self.skim_timer = self.root.after(SKIM_BURST_MS, self.next_skim_burst)
+    
+    def prefetch_skim_points(self, path):
+        """Read the data at the later skim points of path in the background"""
+        if path != self.skim_prefetched:
+            self.skim_prefetched = path
+            threading.Thread(target=prefetch_ranges, args=(path, SKIM_POSITIONS[1:]),
+                             name="skim-prefetch", daemon=True).start()
+    
+    def next_skim_burst(self):
+        self.skim_timer = None
+        self.skim_step += 1
+        if self.skim_step >= len(SKIM_POSITIONS):
+            self.finish_skimmed_video()
+            return
+        self.player.set_position(SKIM_POSITIONS[self.skim_step])
+        self.skim_timer = self.root.after(SKIM_BURST_MS, self.next_skim_burst)
+    
+    def cancel_skim_burst(self):
+        if self.skim_timer is not None:
+            self.root.after_cancel(self.skim_timer)
+            self.skim_timer = None
+    
+    def finish_skimmed_video(self):
+        """All bursts played, count the file and move on"""
+        self.skim_finished.append(time.monotonic())
+        self.next_video()
+    
+    def toggle_recursive(self):
+        """Toggle scanning of subfolders on/off (applies to the next folder load)"""
+        self.is_recursive = not self.is_recursive
+        self.recursive_button.config(text=f"Subfolders: {'On' if self.is_recursive else 'Off'}")
+    
+    def toggle_mute(self):
+        self.is_muted = not self.is_muted
+        if self.player is not None:
+            self.player.audio_set_mute(self.is_muted)
+        self.mute_button.config(text="Unmute" if self.is_muted else "Mute")
+    
+    def set_volume(self, value):
+        volume = int(value)
+        if self.player is not None:
+            self.player.audio_set_volume(volume)
+        self.previous_volume = volume
+    
+    def next_video(self):
+        if not self.playlist:
+            return
+        
+        self.triage_keep_current()
+        # In shuffle mode this is the pick that was drawn (and prerolled) in advance
+        self.playlist.advance()
+        self.play_current_video()
+    
+    def prev_video(self):
+        if not self.playlist:
+            return
+        
+        self.triage_keep_current()
+        # In shuffle mode this goes back through the videos actually played
+        previous = self.playlist.current
+        if self.playlist.back() == previous:
+            return
+        self.play_current_video()
+    
+    def find_duplicates(self):
+        """Look for identical files in the current list in the background, then review them"""
+        if not self.playlist:
+            return
+        if self.scanner:
+            self.status_label.config(text="Wait for the scan to finish first")
+            return
+        paths = list(self.playlist)
+        self.status_label.config(text="Finding duplicates...")
+        progress = self.progress_reporter("Finding duplicates")
+        
+        def show_error(error):
+            self.status_label.config(text=f"Error: {str(error)}")
+        
+        def run():
+            try:
+                groups = find_duplicates(paths, self.index, progress=progress)
+            except Exception as e:
+                self.ui_queue.post(show_error, e)
+                return
+            self.ui_queue.post(self.review_duplicates, groups)
+        
+        threading.Thread(target=run, name="duplicates", daemon=True).start()
+    
+    def find_similar_videos(self):
+        """Look for re-encoded or rescaled copies in the current list in the background, then review them"""
+        if not self.playlist:
+            return
+        if self.scanner:
+            self.status_label.config(text="Wait for the scan to finish first")
+            return
+        if self.instance is None:
+            self.status_label.config(text="Wait for VLC to start first")
+            return
+        paths = list(self.playlist)
+        self.status_label.config(text="Finding similar videos...")
+        progress = self.progress_reporter("Finding similar videos")
+        grabbers = []
+        local = threading.local()
+        
+        def sign(path):
+            # Runs on a find_similar pool thread, each one decodes with its own player
+            grabber = getattr(local, 'grabber', None)
+            if grabber is None:
+                grabber = local.grabber = FrameGrabber(self.instance, *SIMILAR_FRAME_SIZE)
+                grabbers.append(grabber)
+            frames = grabber.grab(path, SIMILAR_POSITIONS)
+            if any(frame is None for frame in frames):
+                return None
+            return video_signature(frames), grabber.length
+        
+        def show_error(error):
+            self.status_label.config(text=f"Error: {str(error)}")
+        
+        def run():
+            try:
+                groups = find_similar(paths, sign, self.index, progress=progress)
+            except Exception as e:
+                self.ui_queue.post(show_error, e)
+                return
+            finally:
+                for grabber in grabbers:
+                    grabber.release()
+            self.ui_queue.post(self.review_similar, groups)
+        
+        threading.Thread(target=run, name="similar", daemon=True).start()
+    
+    def progress_reporter(self, text):
+        """progress(stage, done, total) for a worker thread, shown in the status bar now and then"""
+        last_report = 0.0
+        
+        def show_progress(stage, done, total):
+            self.status_label.config(text=f"{text}: {stage} {done}/{total}")
+        
+        def progress(stage, done, total):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or done == total:
+                last_report = now
+                self.ui_queue.post(show_progress, stage, done, total)
+        
+        return progress
+    
+    def review_duplicates(self, groups):
+        """Replace the playlist with the duplicate groups, one after the other"""
+        if not groups:
+            self.status_label.config(text="No duplicates found")
+            return
+        reclaimable = sum(size * (len(paths) - 1) for size, paths in groups)
+        self.review_groups([paths for size, paths in groups])
+        self.status_label.config(text=f"{len(groups)} duplicate groups, {format_size(reclaimable)} reclaimable")
+    
+    def review_similar(self, groups):
+        """Replace the playlist with the groups of similar videos, biggest file of each first"""
+        if not groups:
+            self.status_label.config(text="No similar videos found")
+            return
+        reclaimable = sum(size for size, paths in groups)
+        self.review_groups([paths for size, paths in groups])
+        self.status_label.config(text=f"{len(groups)} groups of similar videos, "
+                                      f"{format_size(reclaimable)} reclaimable by keeping the biggest")
+    
+    def review_groups(self, groups):
+        """Play groups of paths one after the other, Delete removes the copies not wanted"""
+        self.drop_preroll()
+        self.playlist = Playlist(self.library, (path for paths in groups for path in paths),
+                                 shuffle=self.is_random, seed=self.shuffle_seed)
+        self.query_text = ""
+        self.duplicate_group_of = {path: (number, len(groups))
+                                   for number, paths in enumerate(groups, 1) for path in paths}
+        self.playlist.jump(self.playlist.head)
+        self.play_current_video()
+    
+    def filter_videos(self):
+        """Ask for a filter and sort order, the matching videos become the playlist"""
+        if self.scanner:
+            self.status_label.config(text="Wait for the scan to finish first")
+            return
+        text = simpledialog.askstring("Filter", "e.g. size>1G duration<30 newest\n"
+                                      "(size, duration, width, height, age in days; empty shows all)",
+                                      initialvalue=self.query_text, parent=self.root)
+        if text is None:
+            return
+        try:
+            self.apply_query(text)
+        except ValueError as e:
+            self.status_label.config(text=f"Error: {str(e)}")
+    
+    def apply_query(self, text):
+        """Make the videos matching a filter and sort order the playlist, returns how many match
+
+        Raises ValueError for a query that does not parse or while the
+        folders are still being scanned. Without a match the playlist stays
+        as it is.
+        """
+        if self.scanner:
+            raise ValueError("Wait for the scan to finish first")
+        filters, sort, descending = parse_query(text)
+        started = time.perf_counter()
+        rows = self.library.query(filters, sort, descending)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not len(rows):
+            self.status_label.config(text="No videos match")
+            return 0
+        
+        self.drop_preroll()
+        self.duplicate_group_of = {}
+        self.query_text = text.strip()
+        self.playlist = Playlist(self.library, shuffle=self.is_random, seed=self.shuffle_seed)
+        self.playlist.set_rows(rows)
+        self.playlist.advance()
+        self.play_current_video()
+        self.status_label.config(text=self.playing_status() + f" - {len(rows)} match ({elapsed_ms:.0f} ms)")
+        return len(rows)
+    
+    def toggle_triage(self):
+        """Toggle triage mode: Delete, number keys and next/prev only record decisions"""
+        self.is_triage = not self.is_triage
+        self.triage_button.config(text=f"Triage: {'On' if self.is_triage else 'Off'}")
+        if self.is_triage and self.current_roots and self.journal.roots != self.current_roots:
+            self.journal.open_folder(self.current_roots, self.is_recursive)
+        if self.playlist:
+            self.status_label.config(text=self.playing_status())
+    
+    def triage_keep_current(self):
+        """Leaving a video in triage mode without a decision keeps it"""
+        path = self.playlist.current_path
+        if self.is_triage and path:
+            if path not in self.journal.decisions:
+                self.journal.decide(path, 'keep')
+    
+    def triage_decide(self, action, target=None):
+        """Record a decision for the current video and move on"""
+        if self.playlist.current_path is None:
+            return
+        self.journal.decide(self.playlist.current_path, action, target)
+        self.publish('decision', path=self.playlist.current_path, action=action, target=target)
+        self.next_video()
+    
+    def offer_resume(self):
+        """Offer to resume a triage session whose decisions were never applied
+
+        Returns True if its folder is being opened again.
+        """
+        try:
+            if not self.journal.load():
+                return False
+        except OSError:
+            return False
+        pending = self.journal.pending()
+        if not pending and not self.journal.position:
+            return False
+        roots = self.journal.roots or []
+        if not messagebox.askyesno("Resume triage",
+                                   f"An unfinished triage session has {len(pending)} pending changes"
+                                   f"{' in ' + ', '.join(roots) if roots else ''}.\n\nResume it?"):
+            self.journal.discard()
+            return False
+        if not self.is_triage:
+            self.toggle_triage()
+        # A hung network share must not block startup, one that is only slow may still come up
+        reachable = check_paths_exist(roots, timeout=0.5)
+        if all(found is False for found in reachable.values()):
+            return False
+        if self.is_recursive != self.journal.recursive:
+            self.toggle_recursive()
+        # Back into the profile these folders came from, a single folder is its own
+        name = next((name for name, profile_roots in self.profiles if profile_roots == roots),
+                    roots[0] if len(roots) == 1 else None)
+        if name:
+            self.open_profile(name, roots)
+        else:
+            self.load_videos_from_folders(roots)
+        if self.journal.position:
+            self.resume_position, self.resume_path = self.journal.position
+        return True
+    
+    def apply_triage(self):
+        """Carry out all journaled decisions in one background batch"""
+        pending = self.journal.pending()
+        if not pending:
+            self.status_label.config(text="No triage decisions to apply")
+            return
+        counts = self.journal.counts()
+        if not messagebox.askyesno("Apply triage",
+                                   f"Delete {counts['trash'] + counts['delete']} and move {counts['move']} files?"):
+            return
+        self.status_label.config(text=f"Applying {len(pending)} changes...")
+        
+        def show_progress(done, total):
+            self.status_label.config(text=f"Applying {done}/{total}...")
+        
+        def progress(done, total):
+            # Runs on the mover thread
+            if done % 50 == 0 or done == total:
+                self.ui_queue.post(show_progress, done, total)
+        
+        playlist = self.playlist
+        index = self.index
+        
+        def apply(pending, progress, cancel):
+            # Runs on the mover thread, so forgetting thousands of files does not hold up the window
+            results = apply_decisions(pending, progress, None, cancel)
+            index.forget_files([path for (path, action, target), result, error in results if error is None])
+            return results
+        
+        def done(results):
+            applied = set()
+            failed = []
+            for (path, action, target), result, error in results:
+                if error is None:
+                    applied.add(path)
+                    if action == 'trash' and playlist is self.playlist:
+                        self.undo_stack.append((result, self.playlist.slot_of(path)))
+                else:
+                    failed.append((path, action, target))
+            self.remove_from_list(applied)
+            self.library.discard_files(applied)
+            # Keep only what still has to be done
+            if failed:
+                self.journal.rewrite(failed)
+            else:
+                self.journal.clear()
+            text = f"Applied {len(applied)} changes"
+            if failed:
+                text += f", {len(failed)} failed (still pending)"
+            self.status_label.config(text=text)
+        
+        def failed(error):
+            self.status_label.config(text=f"Error: {str(error)}")
+        
+        self.mover.submit(apply, pending, progress, self.mover.cancel, on_done=done, on_error=failed)
+    
+    def remove_from_list(self, paths):
+        """Drop paths from the playlist, keeping the current video if it stays"""
+        if not paths:
+            return
+        current = self.playlist.current_path
+        for path in paths:
+            self.playlist.remove(self.playlist.slot_of(path))
+        if not self.playlist:
+            if self.player is not None:
+                self.player.stop()
+            self.root.title("Video File Sorter")
+        elif current in paths:
+            self.play_current_video()
+    
+    def take_current_video(self):
+        """Remove the current video from the list and play the next one
+
+        Returns (path, slot) so the caller can put it back if the file
+        operation fails, or None if there is nothing playing.
+        """
+        slot = self.playlist.current
+        if slot < 0:
+            return None
+        
+        # Remove from our list, the playlist moves on to the next video
+        video_path = self.playlist.remove(slot)
+        
+        # Play the next video or update UI
+        if self.playlist:
+            self.play_current_video()
+        else:
+            # Stop playback
+            if self.player is not None:
+                self.player.stop()
+            self.root.title("Video File Sorter")
+        return video_path, slot
+    
+    def take_videos(self, paths):
+        """Remove paths from the list, playing the next video if the current one went
+
+        Returns [(path, slot)] so return_to_list can put back any whose file
+        operation fails.
+        """
+        current = self.playlist.current_path
+        taken = []
+        for path in paths:
+            slot = self.playlist.slot_of(path)
+            if slot >= 0:
+                self.playlist.remove(slot)
+                taken.append((path, slot))
+        if any(path == current for path, slot in taken):
+            if self.playlist:
+                self.play_current_video()
+            else:
+                if self.player is not None:
+                    self.player.stop()
+                self.root.title("Video File Sorter")
+        return taken
+    
+    def return_to_list(self, video_path, slot):
+        """Put a video back that take_current_video removed"""
+        self.playlist.restore(slot, video_path)
+    
+    def delete_video(self, permanent=False):
+        """Move the current video to the trash (or delete it) and play the next one
+
+        The next video starts straight away, the file itself is removed by
+        the background file worker. In triage mode it is only recorded.
+        """
+        if self.is_triage:
+            self.triage_decide('delete' if permanent else 'trash')
+            return
+        taken = self.take_current_video()
+        if not taken:
+            return
+        self.queue_delete(*taken, permanent)
+    
+    def delete_videos(self, paths, permanent=False):
+        """Trash (or delete) several videos at once, e.g. the ones selected in the grid"""
+        if self.is_triage:
+            for path in paths:
+                self.journal.decide(path, 'delete' if permanent else 'trash')
+            self.status_label.config(text=self.playing_status())
+            return
+        for video_path, slot in self.take_videos(paths):
+            self.queue_delete(video_path, slot, permanent)
+    
+    def queue_delete(self, video_path, slot, permanent):
+        """Hand a video taken off the list to the file worker"""
+        name = os.path.basename(video_path)
+        playlist = self.playlist
+        
+        def done(result):
+            self.index.forget_file(video_path)
+            self.library.discard(video_path)
+            self.publish('file', op='delete' if permanent else 'trash', path=video_path)
+            if permanent:
+                self.show_file_status(f"Deleted {name}")
+            else:
+                if playlist is self.playlist:
+                    self.undo_stack.append((result, slot))
+                self.show_file_status(f"Moved {name} to trash (Ctrl+Z to undo)")
+        
+        def failed(error):
+            # The file is still there, put it back in the list
+            self.return_to_list(video_path, slot)
+            self.publish('file', op='delete' if permanent else 'trash', path=video_path, error=str(error))
+            self.show_file_status(f"Error: {str(error)}")
+        
+        if permanent:
+            self.file_ops.delete(video_path, on_done=done, on_error=failed)
+        else:
+            self.file_ops.trash(video_path, on_done=done, on_error=failed)
+    
+    def move_to_bucket(self, slot):
+        """Move the current video into bucket slot and play the next one"""
+        dest_dir = self.buckets.get(slot) or self.choose_bucket(slot)
+        if not dest_dir:
+            return
+        if self.is_triage:
+            self.triage_decide('move', dest_dir)
+            return
+        taken = self.take_current_video()
+        if not taken:
+            return
+        self.queue_move(*taken, slot, dest_dir)
+    
+    def move_videos(self, paths, slot):
+        """Move several videos into bucket slot at once, e.g. the ones selected in the grid"""
+        dest_dir = self.buckets.get(slot) or self.choose_bucket(slot)
+        if not dest_dir:
+            return
+        if self.is_triage:
+            for path in paths:
+                self.journal.decide(path, 'move', dest_dir)
+            self.status_label.config(text=self.playing_status())
+            return
+        for video_path, playlist_slot in self.take_videos(paths):
+            self.queue_move(video_path, playlist_slot, slot, dest_dir)
+    
+    def queue_move(self, video_path, playlist_slot, slot, dest_dir):
+        """Hand a video taken off the list to the mover"""
+        name = os.path.basename(video_path)
+        self.bucket_queued[slot] += 1
+        self.update_bucket_label()
+        
+        started = None
+        last_report = 0.0
+        
+        def progress(copied, total):
+            # Runs on the mover thread, throttled before waking the UI
+            nonlocal started, last_report
+            now = time.monotonic()
+            if started is None:
+                # First chunk, the copy itself started one chunk ago
+                started = now - 1e-3
+            if now - last_report < PROGRESS_INTERVAL and copied < total:
+                return
+            last_report = now
+            rate = copied / max(now - started, 1e-6) / (1024 * 1024)
+            percent = copied * 100 // total if total else 100
+            self.ui_queue.post(self.set_bucket_progress, slot, f"{percent}% {rate:.0f} MB/s")
+        
+        def finished():
+            self.bucket_queued[slot] -= 1
+            self.bucket_progress.pop(slot, None)
+            self.update_bucket_label()
+        
+        def done(dest):
+            finished()
+            self.index.forget_file(video_path)
+            self.library.discard(video_path)
+            self.publish('file', op='move', path=video_path, destination=dest)
+            self.status_label.config(text=f"Moved {name} to {os.path.basename(dest_dir)}")
+        
+        def failed(error):
+            finished()
+            self.return_to_list(video_path, playlist_slot)
+            self.publish('file', op='move', path=video_path, error=str(error))
+            self.status_label.config(text=f"Error: {str(error)}")
+        
+        self.mover.submit(move_file, video_path, dest_dir, progress, self.mover.cancel, on_done=done, on_error=failed)
+    
+    def set_bucket_progress(self, slot, text):
+        if self.bucket_queued[slot] > 0:
+            self.bucket_progress[slot] = text
+            self.update_bucket_label()
+    
+    def update_bucket_label(self):
+        """Show queued moves per bucket and the progress of the one being copied"""
+        parts = []
+        for slot in sorted(self.bucket_queued):
+            queued = self.bucket_queued[slot]
+            if queued <= 0:
+                continue
+            text = f"[{slot}] {queued} queued"
+            if slot in self.bucket_progress:
+                text += f", {self.bucket_progress[slot]}"
+            parts.append(text)
+        self.bucket_label.config(text="  ".join(parts))
+    
+    def undo_delete(self):
+        """Restore the most recently trashed video and play it"""
+        if self.is_triage:
+            # Take back the last decision instead
+            path = self.journal.undo()
+            if path in self.playlist:
+                self.playlist.jump(self.playlist.slot_of(path))
+                self.play_current_video()
+            return
+        if not self.undo_stack:
+            self.status_label.config(text="Nothing to undo")
+            return
+        trashed, slot = self.undo_stack.pop()
+        
+        def done(result):
+            # Back at the position it had in the list
+            self.playlist.jump(self.playlist.restore(slot, trashed.original))
+            self.play_current_video()
+            self.publish('file', op='restore', path=trashed.original)
+            self.show_file_status(f"Restored {os.path.basename(trashed.original)}")
+        
+        def failed(error):
+            self.publish('file', op='restore', path=trashed.original, error=str(error))
+            self.show_file_status(f"Error: {str(error)}")
+        
+        self.file_ops.restore(trashed, on_done=done, on_error=failed)
+    
+    def show_file_status(self, text):
+        """Status message for a finished file operation, with what is still queued"""
+        if self.file_ops.pending:
+            text += f" ({self.file_ops.pending} pending)"
+        if not self.playlist:
+            text += " - No videos left"
+        self.status_label.config(text=text)
+    
+    # Control socket (--control), the commands run on the Tk thread
+    
+    def start_control(self, path):
+        """Serve the commands of control_commands on a Unix socket at path"""
+        server = ControlServer(self.ui_queue, self.control_commands(), path,
+                               on_turn_start=self.begin_control_turn, on_turn_end=self.end_control_turn)
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Cannot listen on {path}: {e}", file=sys.stderr)
+            return
+        self.control = server
+    
+    def publish(self, event, **data):
+        """Push an event to the scripts subscribed to it"""
+        if self.control:
+            self.control.publish(event, **data)
+    
+    def begin_control_turn(self):
+        self.defer_playback = True
+    
+    def end_control_turn(self):
+        self.defer_playback = False
+        self.flush_playback()
+    
+    def flush_playback(self):
+        """Start the video that deferred commands switched to, before anything touches the player"""
+        if self.playback_pending:
+            self.playback_pending = False
+            defer, self.defer_playback = self.defer_playback, False
+            self.play_current_video()
+            self.defer_playback = defer
+    
+    def current_video(self):
+        path = self.playlist.current_path
+        return {'path': path, 'position': self.playlist.position(self.playlist.current) if path else 0,
+                'count': len(self.playlist)}
+    
+    def control_commands(self):
+        """Method name -> function for the control socket, results are sent back as JSON"""
+        def then_current(action, flush=False):
+            # Navigation and file commands answer with where the playlist is now,
+            # flush for the ones that act on the video playing
+            @functools.wraps(action)
+            def command(*args, **kwargs):
+                if flush:
+                    self.flush_playback()
+                action(*args, **kwargs)
+                return self.current_video()
+            return command
+        
+        return {
+            'status': self.control_status,
+            'next': then_current(self.next_video),
+            'prev': then_current(self.prev_video),
+            'goto': self.control_goto,
+            'replay': then_current(self.replay_video, flush=True),
+            'play': lambda: self.control_play(True),
+            'pause': lambda: self.control_play(False),
+            'toggle_play': lambda: self.control_play(None),
+            'seek': self.control_seek,
+            'volume': self.control_volume,
+            'delete': self.control_delete,
+            'move': self.control_move,
+            'undo': then_current(self.undo_delete),
+            'set': self.control_set,
+            'open': self.control_open,
+            'filter': lambda query="": {'count': self.apply_query(query)},
+            'playlist': self.control_playlist,
+        }
+    
+    def control_status(self):
+        if self.player is None:
+            state = 'starting'
+        elif self.awaiting_playback or self.playback_pending:
+            state = 'opening'
+        elif self.player.get_state() == vlc.State.Ended:
+            state = 'ended'
+        else:
+            state = 'playing' if self.player.is_playing() else 'paused'
+        status = self.current_video()
+        status.update({
+            'state': state,
+            'time': self.current_time,
+            'length': self.current_length,
+            'volume': self.volume_scale.get(),
+            'muted': self.is_muted,
+            'repeat': self.is_repeat,
+            'auto_play': self.is_auto_play,
+            'random': self.is_random,
+            'skim': self.is_skimming,
+            'skim_rate': self.skim_rate,
+            'triage': self.is_triage,
+            'decisions': dict(self.journal.counts()),
+            'recursive': self.is_recursive,
+            'roots': self.current_roots,
+            'profile': self.profile_name,
+            'scanning': self.scanner is not None,
+            'query': self.query_text,
+            'file_ops_pending': self.file_ops.pending + self.mover.pending,
+        })
+        return status
+    
+    def control_goto(self, position=None, path=None):
+        """Play the video at a 1-based playlist position, or the one at path"""
+        slot = self.playlist.slot_of(path) if path is not None else self.playlist.select(int(position or 1))
+        if slot < 0:
+            raise ValueError(f"Not in the playlist: {path}")
+        self.triage_keep_current()
+        self.playlist.jump(slot)
+        self.play_current_video()
+        return self.current_video()
+    
+    def control_play(self, playing):
+        """Play (True), pause (False) or toggle (None)"""
+        self.flush_playback()
+        if self.player is None:
+            raise ValueError("VLC is not ready yet")
+        if playing is None or playing != bool(self.player.is_playing()):
+            self.toggle_play()
+        return self.control_status()['state']
+    
+    def control_seek(self, time_ms=None, delta_ms=None, fraction=None):
+        """Jump to time_ms, by delta_ms or to a fraction of the current video"""
+        self.flush_playback()
+        path = self.playlist.current_path
+        if self.player is None or path is None:
+            raise ValueError("Nothing is playing")
+        if fraction is not None:
+            self.player.set_position(min(max(float(fraction), 0.0), 1.0))
+            return {'fraction': fraction}
+        if time_ms is None:
+            time_ms = self.current_time + int(delta_ms or 0)
+        time_ms = max(0, int(time_ms))
+        if self.awaiting_playback:
+            # Not open yet, on_player_event seeks once it plays
+            self.resume_time = (path, time_ms)
+        else:
+            self.player.set_time(time_ms)
+        self.current_time = time_ms
+        self.update_time_display()
+        return {'time': time_ms}
+    
+    def control_volume(self, level=None, muted=None):
+        if level is not None:
+            level = max(0, min(100, int(level)))
+            self.volume_scale.set(level)
+            self.set_volume(level)
+        if muted is not None and bool(muted) != self.is_muted:
+            self.toggle_mute()
+        return {'volume': self.volume_scale.get(), 'muted': self.is_muted}
+    
+    def control_delete(self, path=None, permanent=False):
+        """Trash (or delete) the current video, or the one at path"""
+        if path is None or path == self.playlist.current_path:
+            self.delete_video(permanent=bool(permanent))
+        elif path in self.playlist:
+            self.delete_videos([path], permanent=bool(permanent))
+        else:
+            raise ValueError(f"Not in the playlist: {path}")
+        return self.current_video()
+    
+    def control_move(self, slot, path=None):
+        """Move the current video, or the one at path, into bucket slot"""
+        slot = int(slot)
+        if not self.buckets.get(slot):
+            # Choosing the folder takes a dialog, scripts have to set it up beforehand
+            raise ValueError(f"Bucket {slot} has no folder")
+        if path is None or path == self.playlist.current_path:
+            self.move_to_bucket(slot)
+        elif path in self.playlist:
+            self.move_videos([path], slot)
+        else:
+            raise ValueError(f"Not in the playlist: {path}")
+        return self.current_video()
+    
+    def control_set(self, repeat=None, auto_play=None, random=None, skim=None, skim_rate=None,
+                    triage=None, recursive=None):
+        """Switch modes on or off, those left out stay as they are"""
+        self.flush_playback()
+        modes = ((repeat, self.is_repeat, self.toggle_repeat), (auto_play, self.is_auto_play, self.toggle_auto_play),
+                 (random, self.is_random, self.toggle_random), (skim, self.is_skimming, self.toggle_skim),
+                 (triage, self.is_triage, self.toggle_triage), (recursive, self.is_recursive, self.toggle_recursive))
+        for wanted, current, toggle in modes:
+            if wanted is not None and bool(wanted) != current:
+                toggle()
+        if skim_rate is not None:
+            if float(skim_rate) not in SKIM_RATES:
+                raise ValueError(f"skim_rate must be one of {', '.join(f'{rate:g}' for rate in SKIM_RATES)}")
+            self.skim_rate = float(skim_rate)
+            if self.is_skimming and self.player is not None:
+                self.player.set_rate(self.skim_rate)
+            self.status_label.config(text=self.playing_status())
+        status = self.control_status()
+        return {key: status[key] for key in ('repeat', 'auto_play', 'random', 'skim', 'skim_rate', 'triage', 'recursive')}
+    
+    def control_open(self, roots=None, profile=None, rescan=False):
+        """Open a library profile or a list of folders, playback starts with the first match"""
+        if profile is not None:
+            profile_roots = self.index.profile(profile)
+            if profile_roots is None:
+                raise ValueError(f"No library profile named {profile}")
+            self.open_profile(profile, roots or profile_roots, bool(rescan))
+        elif roots:
+            roots = [os.path.abspath(root) for root in roots]
+            if len(roots) == 1:
+                self.open_profile(roots[0], roots, bool(rescan))
+            else:
+                self.load_videos_from_folders(roots)
+        else:
+            raise ValueError("Give roots or profile")
+        return {'roots': self.current_roots, 'profile': self.profile_name}
+    
+    def control_playlist(self, start=0, count=100):
+        """Paths at playlist positions start+1 to start+count, in list order"""
+        start = max(0, int(start))
+        end = min(len(self.playlist), start + max(0, int(count)))
+        return [self.playlist[self.playlist.select(position)] for position in range(start + 1, end + 1)]
+    
+    def on_close(self):
+        # No more commands from scripts
+        if self.control:
+            self.control.close()
+        # Stop any folder scan still running
+        if self.scanner:
+            self.scanner.cancel()
+        for watcher in self.watchers:
+            watcher.cancel()
+        self.save_session(final=True)
+        if self.prober:
+            self.prober.shutdown()
+        if self.thumbnails:
+            self.thumbnails.shutdown()
+        self.journal.close()
+        
+        # Let queued deletes and moves finish
+        self.file_ops.shutdown()
+        self.mover.shutdown()
+            
+        # Clean up resources
+        if self.player is not None:
+            self.player.stop()
+            self.standby_player.stop()
+        if self.metrics_path:
+            try:
+                self.metrics.dump(self.metrics_path)
+            except OSError as e:
+                print(f"Cannot write metrics to {self.metrics_path}: {e}", file=sys.stderr)
+        self.root.destroy()
+
+
+def run(seed=None, started=None, metrics_path=None, control_path=None):
+    """Open the player window and run the Tk main loop
+
+    With started (a time.perf_counter() value) the time to the window, to
+    libvlc being ready and to the first frame are printed. With metrics_path
+    the latency histograms are written there on exit. With control_path
+    scripts can drive the player through a Unix socket there.
+    """
+    root = tk.Tk()
+    VideoSorter(root, seed=seed, started=started, metrics_path=metrics_path, control_path=control_path)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    run()